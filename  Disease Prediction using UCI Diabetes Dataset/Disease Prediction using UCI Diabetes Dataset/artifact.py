@@ -0,0 +1,128 @@
+"""
+Serialized scoring pipeline for the diabetes models.
+
+An artifact bundles everything needed to score a raw patient row the way the
+training data was prepared: the median imputation clean_data applied (blank
+cells in every feature, and zeros where zero means missing), the fitted
+StandardScaler and the fitted model. Preprocessing works on whole
+NumPy blocks, so score.py can apply it to one CSV chunk at a time.
+"""
+
+import datetime
+import platform
+
+import joblib
+import numpy as np
+import sklearn
+
+ARTIFACT_VERSION = 3
+
+
+class ScoringPipeline:
+    """
+    Median imputation, scaling and a fitted classifier, applied in training order.
+    Args:
+        features (list): Feature columns, in the order the scaler and model saw them.
+        medians (dict): Feature -> median that replaces missing values in that column; every feature needs one.
+        scaler: Fitted StandardScaler.
+        model: Fitted classifier with predict_proba.
+        metadata (dict): Free-form details (model name, metrics, ...), stored with the artifact.
+        zero_invalid (iterable): Features where a zero also counts as missing.
+    """
+
+    def __init__(self, features, medians, scaler, model, metadata=None, zero_invalid=()):
+        if not hasattr(model, 'predict_proba'):
+            raise ValueError(f"{type(model).__name__} cannot produce probabilities")
+        self.features = list(features)
+        missing = [col for col in self.features if col not in medians]
+        if missing:
+            raise ValueError(f"No imputation median for {', '.join(missing)}")
+        self.medians = dict(medians)
+        self.zero_invalid = [col for col in self.features if col in set(zero_invalid)]
+        self.scaler = scaler
+        self.model = model
+        self.metadata = dict(metadata or {})
+        # Imputation as two vectors aligned with the features, so a block is cleaned with one masked copy
+        self._impute_values = np.array([self.medians[col] for col in self.features], dtype=np.float64)
+        self._zero_invalid = np.array([col in self.zero_invalid for col in self.features])
+        # StandardScaler.transform as plain arithmetic, without its per-call validation and feature-name checks
+        self._offset = scaler.mean_ if scaler.with_mean else 0.0
+        self._scale = scaler.scale_ if scaler.with_std else 1.0
+
+    def transform(self, df):
+        """
+        Clean and scale a block of raw rows.
+        Args:
+            df (pd.DataFrame): Rows with at least the feature columns.
+        Returns:
+            np.ndarray: Scaled feature matrix.
+        """
+        missing = [col for col in self.features if col not in df.columns]
+        if missing:
+            raise ValueError(f"Missing feature columns: {', '.join(missing)}")
+        return self.transform_matrix(df[self.features].to_numpy(dtype=np.float64, copy=True))
+
+    def transform_matrix(self, X):
+        """
+        Clean and scale raw feature rows already laid out in self.features order.
+        Args:
+            X (np.ndarray): Float matrix, one row per patient; imputed in place.
+        Returns:
+            np.ndarray: Scaled feature matrix.
+        """
+        missing = np.isnan(X)
+        if self._zero_invalid.any():
+            missing |= (X == 0) & self._zero_invalid
+        np.copyto(X, self._impute_values, where=missing)
+        X -= self._offset
+        X /= self._scale
+        return X
+
+    def predict_proba(self, df):
+        """
+        Probability of diabetes (Outcome == 1) for each row.
+        Args:
+            df (pd.DataFrame): Raw rows.
+        Returns:
+            np.ndarray: One probability per row.
+        """
+        return self.model.predict_proba(self.transform(df))[:, 1]
+
+    def predict_proba_matrix(self, X):
+        """
+        Like predict_proba, for a raw float matrix in self.features order.
+        """
+        return self.predict_proba_scaled(self.transform_matrix(X))
+
+    def predict_proba_scaled(self, X):
+        """
+        Like predict_proba, for rows transform_matrix has already cleaned and scaled.
+        """
+        return self.model.predict_proba(X)[:, 1]
+
+
+def save_artifact(pipeline, path):
+    """
+    Write a ScoringPipeline to disk.
+    Args:
+        pipeline (ScoringPipeline): Pipeline to save.
+        path (str): Destination file.
+    """
+    pipeline.metadata.setdefault('created', datetime.datetime.now().isoformat(timespec='seconds'))
+    pipeline.metadata.setdefault('sklearn', sklearn.__version__)
+    pipeline.metadata.setdefault('python', platform.python_version())
+    joblib.dump({'version': ARTIFACT_VERSION, 'pipeline': pipeline}, path)
+
+
+def load_artifact(path):
+    """
+    Read a ScoringPipeline written by save_artifact.
+    Args:
+        path (str): Artifact file.
+    Returns:
+        ScoringPipeline: The pipeline.
+    """
+    artifact = joblib.load(path)
+    if not isinstance(artifact, dict) or artifact.get('version') != ARTIFACT_VERSION:
+        raise ValueError(f"{path} is not a version {ARTIFACT_VERSION} model artifact")
+    return artifact['pipeline']
@@ -0,0 +1,234 @@
+"""
+Loading and cleaning for the diabetes pipeline, in memory or a chunk at a time.
+
+The UCI columns fit in small types: the outcome in uint8, the measurements in
+float32 (they need NaN once zeros count as missing) and, once cleaned, counts
+and ages in int16, which more than halves a frame compared with pandas'
+64-bit defaults. Counts and ages are read as float32 too, so a blank cell
+loads as NaN instead of failing the read; clean_data fills the blanks and
+narrows them to int16. (pandas' nullable Int16 would also read blanks, but
+parses about three times slower.)
+
+scan_dataset handles files of any size in two passes over fixed-size chunks.
+The first accumulates exact per-column value counts, which give the
+imputation medians. The second cleans each chunk and accumulates the
+histograms, the correlation matrix and a seeded random sample of at most
+max_rows rows to model on. Peak memory is one chunk, the sample and the value
+counts, which hold one entry per distinct value (a few thousand for these
+columns, however many rows there are). With pyarrow installed the first pass
+also writes a Parquet copy of the CSV, which the second pass (and later runs
+on the same file) read by row group instead of parsing the text again.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+DTYPES = {
+    'Pregnancies': 'float32',
+    'Glucose': 'float32',
+    'BloodPressure': 'float32',
+    'SkinThickness': 'float32',
+    'Insulin': 'float32',
+    'BMI': 'float32',
+    'DiabetesPedigreeFunction': 'float32',
+    'Age': 'float32',
+    'Outcome': 'uint8',
+}
+FEATURE_COLUMNS = [col for col in DTYPES if col != 'Outcome']
+# In the UCI Diabetes dataset, zeros in these columns are invalid and should be treated as missing
+ZERO_INVALID_COLUMNS = ['Glucose', 'BloodPressure', 'SkinThickness', 'Insulin', 'BMI']
+# Zero is a valid value in the other features (a count, a score, an age); only blank cells are missing there
+BLANK_ONLY_COLUMNS = [col for col in FEATURE_COLUMNS if col not in ZERO_INVALID_COLUMNS]
+# Counts and ages, narrowed to int16 once their blanks are filled
+INTEGER_COLUMNS = ['Pregnancies', 'Age']
+DEFAULT_MAX_ROWS = 50000
+# Parquet metadata key recording which CSV contents a columnar copy was made from
+SOURCE_DIGEST_KEY = b'source_digest'
+
+
+def imputation_medians(df):
+    """
+    Median of the valid (non-zero) values of each column where zero means missing,
+    and the median that fills blank cells in every other feature (rounded to a whole number for counts and ages).
+    Args:
+        df (pd.DataFrame): The raw dataset.
+    Returns:
+        dict: Feature column -> median.
+    """
+    block = df[ZERO_INVALID_COLUMNS]
+    medians = {col: float(median) for col, median in block.where(block != 0).median().items()}
+    for col in BLANK_ONLY_COLUMNS:
+        median = float(df[col].median())
+        medians[col] = float(round(median)) if col in INTEGER_COLUMNS else median
+    return medians
+
+
+def clean_data(df, medians=None):
+    """
+    Clean the dataset by handling missing or zero values in certain columns.
+    All affected columns are imputed with one mask over the block, keeping float32 columns float32;
+    blank cells in the other features are filled too, and counts and ages narrowed to int16.
+    Args:
+        df (pd.DataFrame): The dataset.
+        medians (dict): Replacement per column; computed from df by imputation_medians if not given.
+    Returns:
+        pd.DataFrame: Cleaned dataset.
+    """
+    medians = medians or imputation_medians(df)
+    block = df[ZERO_INVALID_COLUMNS]
+    values = block.to_numpy(dtype=np.result_type(*block.dtypes, np.float32))
+    fill = np.array([medians[col] for col in ZERO_INVALID_COLUMNS], dtype=values.dtype)
+    df[ZERO_INVALID_COLUMNS] = np.where((values == 0) | np.isnan(values), fill, values)
+    for col in BLANK_ONLY_COLUMNS:
+        df[col] = df[col].fillna(medians[col])
+    for col in INTEGER_COLUMNS:
+        df[col] = df[col].astype('int16')
+    return df
+
+
+def iter_chunks(path, chunksize):
+    """
+    Read a CSV or Parquet file chunksize rows at a time, with the compact dtypes.
+    Args:
+        path (str): .csv or .parquet file.
+        chunksize (int): Rows per chunk.
+    Yields:
+        pd.DataFrame: Consecutive chunks, indexed by row number in the file.
+    """
+    if path.endswith('.parquet'):
+        start = 0
+        for batch in pq.ParquetFile(path, memory_map=True).iter_batches(batch_size=chunksize):
+            chunk = batch.to_pandas()
+            chunk.index = pd.RangeIndex(start, start + len(chunk))
+            start += len(chunk)
+            yield chunk
+    else:
+        yield from pd.read_csv(path, dtype=DTYPES, chunksize=chunksize)
+
+
+def median_from_counts(counts):
+    """
+    Exact median of the values a value-count Series describes.
+    Args:
+        counts (pd.Series): Value -> number of occurrences.
+    Returns:
+        float: Median, averaging the two middle values for an even count as pandas does.
+    """
+    counts = counts.sort_index()
+    cumulative = counts.to_numpy().cumsum()
+    n = int(cumulative[-1])
+    values = counts.index.to_numpy()
+    low = values[np.searchsorted(cumulative, (n - 1) // 2, side='right')]
+    high = values[np.searchsorted(cumulative, n // 2, side='right')]
+    return float((low + high) / 2)
+
+
+def _add_counts(totals, chunk):
+    for col in chunk.columns:
+        counts = chunk[col].value_counts(sort=False)
+        totals[col] = counts if col not in totals else totals[col].add(counts, fill_value=0)
+
+
+def _add_moments(moments, X):
+    # Mean and co-moment matrix merged chunk by chunk (Chan et al.), stable where raw sums of squares are not
+    n_b = len(X)
+    mean_b = X.mean(axis=0)
+    centered = X - mean_b
+    m2_b = centered.T @ centered
+    if moments is None:
+        return n_b, mean_b, m2_b
+    n_a, mean_a, m2_a = moments
+    n = n_a + n_b
+    delta = mean_b - mean_a
+    return n, mean_a + delta * n_b / n, m2_a + m2_b + np.outer(delta, delta) * n_a * n_b / n
+
+
+def _columnar_copy_current(columnar_path, digest):
+    if not os.path.exists(columnar_path):
+        return False
+    metadata = pq.read_schema(columnar_path).metadata or {}
+    return metadata.get(SOURCE_DIGEST_KEY) == digest.encode()
+
+
+def scan_dataset(path, chunksize, max_rows=DEFAULT_MAX_ROWS, bins=20, columnar_path=None, digest=None, seed=42):
+    """
+    Compute imputation medians and EDA statistics over a whole file, and sample it for modelling, a chunk at a time.
+    Args:
+        path (str): CSV in the diabetes.csv layout (or a Parquet copy of one).
+        chunksize (int): Rows read at a time.
+        max_rows (int): Largest sample kept; every row is kept when the file has no more than this.
+        bins (int): Histogram bins per column.
+        columnar_path (str): Where to keep a Parquet copy of a CSV, reused while digest matches; None for no copy.
+        digest (str): Content digest of path, recorded in the Parquet copy.
+        seed (int): Seed for the row sample.
+    Returns:
+        dict: 'rows', 'medians', cleaned 'sample' (in file order), and 'histograms', 'correlation' and
+            'outcome_counts' of the whole cleaned file, in the forms plots.PlotRenderer jobs take.
+    """
+    source, writer, tmp_path = path, None, None
+    if columnar_path and pq is None:
+        print("pyarrow is not installed; the second pass parses the CSV again")
+    elif columnar_path and digest and _columnar_copy_current(columnar_path, digest):
+        source = columnar_path
+        os.utime(columnar_path)  # recently used, as far as the stage cache's eviction is concerned
+
+    # Pass 1: raw value counts, for the medians (and a Parquet copy of the CSV on the way)
+    raw_counts = {}
+    rows = 0
+    try:
+        for chunk in iter_chunks(source, chunksize):
+            _add_counts(raw_counts, chunk)
+            rows += len(chunk)
+            if columnar_path and pq is not None and source == path:
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    tmp_path = columnar_path + '.tmp'
+                    schema = table.schema.with_metadata({SOURCE_DIGEST_KEY: (digest or '').encode()})
+                    writer = pq.ParquetWriter(tmp_path, schema)
+                writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+    if writer is not None:
+        os.replace(tmp_path, columnar_path)
+        source = columnar_path
+    medians = {col: median_from_counts(raw_counts[col].drop(0, errors='ignore')) for col in ZERO_INVALID_COLUMNS}
+    for col in BLANK_ONLY_COLUMNS:
+        median = median_from_counts(raw_counts[col])
+        medians[col] = float(round(median)) if col in INTEGER_COLUMNS else median
+
+    # Pass 2: clean, then accumulate cleaned value counts and moments and draw the sample
+    rate = min(1.0, max_rows / rows) if rows else 1.0
+    rng = np.random.default_rng(seed)
+    counts, moments, samples = {}, None, []
+    for chunk in iter_chunks(source, chunksize):
+        chunk = clean_data(chunk, medians)
+        _add_counts(counts, chunk)
+        moments = _add_moments(moments, chunk.to_numpy(dtype=np.float64))
+        samples.append(chunk if rate == 1.0 else chunk[rng.random(len(chunk)) < rate])
+    columns = list(counts)
+    _, _, m2 = moments
+    scale = np.sqrt(np.diag(m2))
+    outcome = counts['Outcome'].sort_index()
+    return {
+        'rows': rows,
+        'medians': medians,
+        'sample': pd.concat(samples),
+        # Histogramming each distinct value with its count bins exactly as the raw column would
+        'histograms': {col: _histogram(counts[col], bins) for col in columns},
+        'correlation': pd.DataFrame(m2 / np.outer(scale, scale), index=columns, columns=columns),
+        'outcome_counts': (outcome.index.to_numpy(), outcome.to_numpy().astype(np.int64)),
+    }
+
+
+def _histogram(counts, bins):
+    hist, edges = np.histogram(counts.index.to_numpy(), bins=bins, weights=counts.to_numpy())
+    return hist.astype(np.int64), edges
@@ -3,17 +3,31 @@ Diabetes Prediction using UCI Diabetes Dataset
 ------------------------------------------------
 This script loads, explores, cleans, and models the UCI Diabetes dataset.
 It performs EDA, scales features, trains multiple models, evaluates them,
-and tunes hyperparameters using GridSearchCV.
+and tunes hyperparameters: every model within a time and fit budget (see
+tuning.py), or Logistic Regression alone by exhaustive GridSearchCV with
+--tuning grid.
+
+Run with --jobs N to fit the models in parallel worker processes and spread
+the grid-search folds over N cores (-1 uses every core).
+Stage results are cached on disk (see pipeline_cache.py), so a rerun only
+recomputes the stages whose code, inputs or parameters changed; --force
+recomputes everything (or just the named stages). --save-model writes the
+tuned model with its preprocessing as an artifact for score.py.
+Plots are rendered in the background by plots.PlotRenderer's own worker
+processes (--plot-jobs) while the models train; --plots=minimal skips the
+slow pairplot and --no-plots skips them all.
+--chunksize ROWS streams a dataset of any size instead of loading it whole
+(see dataset.py); the models then train on a sample of at most --max-rows.
 
 Author: <Your Name>
 Date: <Today's Date>
 """
 
+import argparse
 import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
 from sklearn.model_selection import train_test_split, GridSearchCV
 from sklearn.preprocessing import StandardScaler
 from sklearn.linear_model import LogisticRegression
@@ -21,12 +35,20 @@ from sklearn.ensemble import RandomForestClassifier
 from sklearn.svm import SVC
 from sklearn.metrics import accuracy_score, confusion_matrix, classification_report
 
-# Set plot style
-sns.set(style="whitegrid")
+from artifact import ScoringPipeline, save_artifact
+from dataset import DEFAULT_MAX_ROWS, DTYPES, ZERO_INVALID_COLUMNS, clean_data, imputation_medians, scan_dataset
+from pipeline_cache import CACHE_DIR, DEFAULT_MAX_MB, StageCache, file_digest
+from plots import (DEFAULT_PLOT_JOBS, HISTOGRAM_BINS, PAIRPLOT_SAMPLE, PLOT_MODES, PlotRenderer,
+                   confusion_matrix_path, correlation_matrix, feature_histograms, plot_path, render_confusion_matrix,
+                   render_heatmap, render_histograms, render_outcome_counts, render_pairplot)
+from tuning import regularization_path, successive_halving
 
 # Constants
 DATA_PATH = "diabetes.csv"  # Update if your dataset is in a different location
-PLOTS_DIR = "plots"
+# Search spaces for budgeted tuning (Logistic Regression's is tuning.DEFAULT_CS x l1/l2)
+RANDOM_FOREST_SPACE = {'max_depth': [None, 4, 6, 8, 12], 'min_samples_leaf': [1, 2, 4, 8],
+                       'max_features': ['sqrt', 0.5, None]}
+SVM_SPACE = {'C': [0.1, 0.3, 1, 3, 10, 30, 100], 'gamma': ['scale', 0.003, 0.01, 0.03, 0.1, 0.3]}
 
 
 def load_data(path):
@@ -35,9 +57,9 @@ def load_data(path):
     Args:
         path (str): Path to the CSV file.
     Returns:
-        pd.DataFrame: Loaded dataset.
+        pd.DataFrame: Loaded dataset, in the compact dtypes of dataset.DTYPES.
     """
-    return pd.read_csv(path)
+    return pd.read_csv(path, dtype=DTYPES)
 
 
 def explore_data(df):
@@ -56,62 +78,38 @@ def explore_data(df):
     print(df.isnull().sum())
 
 
-def clean_data(df):
-    """
-    Clean the dataset by handling missing or zero values in certain columns.
-    Args:
-        df (pd.DataFrame): The dataset.
-    Returns:
-        pd.DataFrame: Cleaned dataset.
-    """
-    # In the UCI Diabetes dataset, zeros in some columns are invalid and should be treated as missing
-    cols_with_zero_invalid = [
-        'Glucose', 'BloodPressure', 'SkinThickness', 'Insulin', 'BMI'
-    ]
-    for col in cols_with_zero_invalid:
-        df[col] = df[col].replace(0, np.nan)
-        median = df[col].median()
-        df[col].fillna(median, inplace=True)
-    return df
-
-
-def perform_eda(df):
+def perform_eda(df, renderer=None, summary=None):
     """
     Perform exploratory data analysis and save plots to disk.
+    Histograms, correlations and outcome counts are computed here in one pass over the data;
+    the renderer only ever sees those summaries (and the pairplot sample), never the full dataset.
     Args:
         df (pd.DataFrame): The dataset.
+        renderer (PlotRenderer): Renders (or skips) the plots; one is started and waited for here if not given.
+        summary (dict): Precomputed 'histograms', 'correlation' and 'outcome_counts' (from dataset.scan_dataset),
+            used instead of computing them from df, which is then only a sample of the data.
     """
-    if not os.path.exists(PLOTS_DIR):
-        os.makedirs(PLOTS_DIR)
+    if renderer is None:
+        with PlotRenderer() as renderer:
+            return perform_eda(df, renderer, summary)
+    if renderer.mode == "none":
+        return
 
     # Histogram for each feature
-    df.hist(bins=20, figsize=(15, 10))
-    plt.suptitle('Feature Distributions')
-    plt.tight_layout(rect=[0, 0.03, 1, 0.95])
-    plt.savefig(os.path.join(PLOTS_DIR, 'feature_distributions.png'))
-    plt.close()
+    histograms = summary['histograms'] if summary else feature_histograms(df)
+    renderer.submit(render_histograms, histograms, path=plot_path('feature_distributions.png'))
 
     # Correlation heatmap
-    plt.figure(figsize=(10, 8))
-    sns.heatmap(df.corr(), annot=True, cmap='coolwarm')
-    plt.title('Correlation Heatmap')
-    plt.tight_layout()
-    plt.savefig(os.path.join(PLOTS_DIR, 'correlation_heatmap.png'))
-    plt.close()
-
-    # Outcome countplot
-    plt.figure(figsize=(6, 4))
-    sns.countplot(x='Outcome', data=df)
-    plt.title('Outcome Distribution')
-    plt.tight_layout()
-    plt.savefig(os.path.join(PLOTS_DIR, 'outcome_distribution.png'))
-    plt.close()
-
-    # Pairplot (sampled for speed)
-    sns.pairplot(df.sample(min(200, len(df))), hue='Outcome')
-    plt.suptitle('Pairplot of Features', y=1.02)
-    plt.savefig(os.path.join(PLOTS_DIR, 'pairplot.png'))
-    plt.close()
+    corr = summary['correlation'] if summary else correlation_matrix(df)
+    renderer.submit(render_heatmap, corr, path=plot_path('correlation_heatmap.png'))
+
+    # Outcome counts
+    labels, counts = summary['outcome_counts'] if summary else np.unique(df['Outcome'].to_numpy(), return_counts=True)
+    renderer.submit(render_outcome_counts, labels, counts, path=plot_path('outcome_distribution.png'))
+
+    # Pairplot (sampled for speed; a fixed sample, so an unchanged dataset reuses the cached plot)
+    sample = df.sample(min(PAIRPLOT_SAMPLE, len(df)), random_state=42)
+    renderer.submit(render_pairplot, sample, path=plot_path('pairplot.png'), minimal=False)
 
 
 def scale_features(X_train, X_test):
@@ -121,82 +119,343 @@ def scale_features(X_train, X_test):
         X_train (pd.DataFrame): Training features.
         X_test (pd.DataFrame): Test features.
     Returns:
-        tuple: Scaled training and test features.
+        tuple: Scaled training and test features, and the fitted scaler.
     """
     scaler = StandardScaler()
     X_train_scaled = scaler.fit_transform(X_train)
     X_test_scaled = scaler.transform(X_test)
-    return X_train_scaled, X_test_scaled
+    return X_train_scaled, X_test_scaled, scaler
 
 
-def train_and_evaluate_models(X_train, X_test, y_train, y_test):
+def resolve_jobs(n_jobs):
     """
-    Train and evaluate multiple models.
+    Turn a --jobs value into a worker count.
     Args:
-        X_train, X_test, y_train, y_test: Train/test splits.
+        n_jobs (int): Number of workers; -1 (or any value below 1) means one per CPU core.
+    Returns:
+        int: Number of workers, at least 1.
+    """
+    if n_jobs is None or n_jobs < 1:
+        return os.cpu_count() or 1
+    return n_jobs
+
+
+def build_models(n_jobs=1):
     """
-    models = {
+    Create the candidate models, each with a fixed random_state.
+    Args:
+        n_jobs (int): Cores the Random Forest may use for its trees.
+    Returns:
+        dict: Model name -> unfitted estimator.
+    """
+    return {
         'Logistic Regression': LogisticRegression(max_iter=1000, random_state=42),
-        'Random Forest': RandomForestClassifier(random_state=42),
+        'Random Forest': RandomForestClassifier(random_state=42, n_jobs=n_jobs),
         'SVM': SVC(random_state=42)
     }
+
+
+def fit_model(name, model, X_train, y_train):
+    """
+    Fit one model; runs in a worker process in parallel mode.
+    Args:
+        name (str): Model name.
+        model: Unfitted estimator.
+        X_train, y_train: Training split.
+    Returns:
+        tuple: (name, fitted estimator).
+    """
+    return name, model.fit(X_train, y_train)
+
+
+def evaluate_model(name, model, X_test, y_test):
+    """
+    Compute a fitted model's test metrics.
+    Args:
+        name (str): Model name.
+        model: Fitted estimator.
+        X_test, y_test: Test split.
+    Returns:
+        dict: Accuracy, confusion matrix and classification report.
+    """
+    y_pred = model.predict(X_test)
+    acc = accuracy_score(y_test, y_pred)
+    cm = confusion_matrix(y_test, y_pred)
+    cr = classification_report(y_test, y_pred)
+    return {'accuracy': acc, 'confusion_matrix': cm, 'classification_report': cr}
+
+
+def print_results(name, results):
+    """
+    Print the metrics evaluate_model computed.
+    Args:
+        name (str): Model name.
+        results (dict): evaluate_model output.
+    """
+    print(f"\n{name} Results:")
+    print(f"Accuracy: {results['accuracy']:.4f}")
+    print("Confusion Matrix:\n", results['confusion_matrix'])
+    print("Classification Report:\n", results['classification_report'])
+
+
+def evaluate(name, model, X_test, y_test, cache, renderer):
+    """
+    Evaluate a fitted model (through the cache), print its metrics and queue its confusion matrix plot.
+    Args:
+        name (str): Model name.
+        model: Fitted estimator.
+        X_test, y_test: Test split.
+        cache (StageCache): Cache for the 'evaluate' stage.
+        renderer (PlotRenderer): Renders the confusion matrix.
+    Returns:
+        dict: evaluate_model output.
+    """
+    results =cache.run('evaluate', evaluate_model, name, model, X_test, y_test)
+    print_results(name, results)
+    # Save confusion matrix plot
+    renderer.submit(render_confusion_matrix, name, results['confusion_matrix'], path=confusion_matrix_path(name))
+    return results
+
+
+def tune_model(name, X_train, y_train, seconds=None, max_fits=None, n_jobs=1):
+    """
+    Tune one of the build_models candidates within a time and fit budget.
+    Logistic Regression walks a warm-started regularization path over the grid's values of C and stops
+    once accuracy stops improving; the Random Forest is successively halved on its number of trees and
+    the SVM on training rows.
+    Args:
+        name (str): Model name, as in build_models.
+        X_train (np.ndarray): Scaled training features.
+        y_train (pd.Series): Training labels.
+        seconds (float): Wall-clock budget.
+        max_fits (int): Fit budget.
+        n_jobs (int): Cores to spread each candidate's cross-validation folds over, at most one per CPU core.
+    Returns:
+        dict: Search result from tuning.regularization_path or tuning.successive_halving.
+    """
+    # More fold workers than cores only adds worker start-up time to every evaluation
+    n_jobs = min(n_jobs, os.cpu_count() or 1)
+    if name == 'Logistic Regression':
+        return regularization_path(X_train, y_train, seconds=seconds, max_fits=max_fits)
+    if name == 'Random Forest':
+        return successive_halving(RandomForestClassifier(random_state=42), RANDOM_FOREST_SPACE, X_train, y_train,
+                                  'n_estimators', min_resource=12, max_resource=100, n_candidates=18,
+                                  seconds=seconds, max_fits=max_fits, n_jobs=n_jobs)
+    if name == 'SVM':
+        # A third of the space on 150 rows, then the best third of those on all of them
+        return successive_halving(SVC(random_state=42), SVM_SPACE, X_train, y_train, 'n_samples', min_resource=150,
+                                  n_candidates=14, seconds=seconds, max_fits=max_fits, n_jobs=n_jobs)
+    raise ValueError(f"No search defined for {name}")
+
+
+def print_tuning(name, search):
+    """
+    Print a search's best score and how it improved with wall time.
+    Args:
+        name (str): Model name.
+        search (dict): tune_model output.
+    """
+    print(f"\n{name}: best cross-validated accuracy {search['score']:.4f} with {search['params']}")
+    print(f"{search['fits']} fits in {search['elapsed']:.2f}s")
+    if search['stopped']:
+        print(f"Search cut short: {search['stopped']}; raise --tune-seconds or --tune-fits for a full search")
+    print("  seconds   fits  best accuracy  step")
+    for elapsed, fits, score, step in search['trace']:
+        print(f"  {elapsed:7.2f}  {fits:5d}  {score:13.4f}  {step}")
+
+
+def train_and_evaluate_models(X_train, X_test, y_train, y_test, n_jobs=1, cache=None, renderer=None, tune=False,
+                              tune_seconds=None, tune_fits=None):
+    """
+    Train and evaluate multiple models.
+    Args:
+        X_train, X_test, y_train, y_test: Train/test splits.
+        n_jobs (int): Worker processes; above 1, the models are fitted concurrently
+            and each is evaluated as soon as its fit finishes.
+        cache (StageCache): Reuses models fitted on the same data by earlier runs if given.
+        renderer (PlotRenderer): Renders the confusion matrices; one is started and waited for here if not given.
+        tune (bool): Also tune every model with tune_model and evaluate the result as 'Tuned <name>'.
+        tune_seconds (float): Wall-clock budget for tuning, shared by the models in turn: each gets an equal share
+            of what is left, so time one model does not use goes to the next.
+        tune_fits (int): Fit budget for tuning, shared the same way.
+    Returns:
+        dict: Model name -> evaluation results plus the fitted 'model', in the same order whatever the worker count.
+    """
+    cache = cache or StageCache(enabled=False)
+    if renderer is None:
+        with PlotRenderer(cache=cache) as renderer:
+            return train_and_evaluate_models(X_train, X_test, y_train, y_test, n_jobs, cache, renderer, tune,
+                                             tune_seconds, tune_fits)
+    n_jobs = resolve_jobs(n_jobs)
+    models = build_models()
+    keys = {name: cache.key('fit', fit_model, (name, model, X_train, y_train)) for name, model in models.items()}
     results = {}
-    for name, model in models.items():
-        print(f"\nTraining {name}...")
-        model.fit(X_train, y_train)
-        y_pred = model.predict(X_test)
-        acc = accuracy_score(y_test, y_pred)
-        cm = confusion_matrix(y_test, y_pred)
-        cr = classification_report(y_test, y_pred)
-        results[name] = {'accuracy': acc, 'confusion_matrix': cm, 'classification_report': cr}
-        print(f"Accuracy: {acc:.4f}")
-        print("Confusion Matrix:\n", cm)
-        print("Classification Report:\n", cr)
-        # Save confusion matrix plot
-        plt.figure(figsize=(5, 4))
-        sns.heatmap(cm, annot=True, fmt='d', cmap='Blues')
-        plt.title(f'{name} - Confusion Matrix')
-        plt.xlabel('Predicted')
-        plt.ylabel('Actual')
-        plt.tight_layout()
-        plt.savefig(os.path.join(PLOTS_DIR, f'{name.lower().replace(" ", "_")}_confusion_matrix.png'))
-        plt.close()
+    pending = []
+    for name in models:
+        found, fitted = cache.get('fit', keys[name])
+        if found:
+            results[name] = dict(evaluate(name, fitted[1], X_test, y_test, cache, renderer), model=fitted[1])
+        else:
+            pending.append(name)
+    workers = min(n_jobs, len(pending))
+    # Cores left over once every model has a worker go to the Random Forest's trees
+    models['Random Forest'].set_params(n_jobs=max(1, n_jobs - workers + 1))
+
+    if workers <= 1:
+        for name in pending:
+            print(f"\nTraining {name}...")
+            fitted = fit_model(name, models[name], X_train, y_train)
+            cache.put('fit', keys[name], fitted)
+            results[name] = dict(evaluate(name, fitted[1], X_test, y_test, cache, renderer), model=fitted[1])
+    else:
+        print(f"\nTraining {', '.join(pending)} in {workers} worker processes...")
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(fit_model, name, models[name], X_train, y_train) for name in pending]
+            for future in as_completed(futures):
+                fitted = future.result()
+                cache.put('fit', keys[fitted[0]], fitted)
+                results[fitted[0]] = dict(evaluate(fitted[0], fitted[1], X_test, y_test, cache, renderer),
+                                          model=fitted[1])
+    # Every model has a fixed random_state, so only the completion order varies between runs
+    results = {name: results[name] for name in models}
+
+    if tune:
+        seconds_left, fits_left = tune_seconds, tune_fits
+        cut_short = []
+        for i, name in enumerate(models):
+            # The search's own recorded cost is carried over, so a cached run passes the same shares on
+            remaining = len(models) - i
+            seconds = max(seconds_left, 0) / remaining if tune_seconds else None
+            max_fits = max(fits_left, 0) // remaining if tune_fits else None
+            print(f"\nTuning {name}...")
+            search = cache.run('tune', tune_model, name, X_train, y_train, seconds=seconds, max_fits=max_fits,
+                               n_jobs=n_jobs)
+            if tune_seconds:
+                seconds_left -= search['elapsed']
+            if tune_fits:
+                fits_left -= search['fits']
+            print_tuning(f'Tuned {name}', search)
+            if search['stopped']:
+                cut_short.append(name)
+            results[f'Tuned {name}'] = dict(evaluate(f'Tuned {name}', search['estimator'], X_test, y_test, cache,
+                                                     renderer),
+                                            model=search['estimator'])
+        if cut_short:
+            print(f"\nThe tuning budget cut the search short for {', '.join(cut_short)}")
     return results
 
 
-def tune_logistic_regression(X_train, y_train):
+def grid_search_logistic_regression(X_train, y_train, n_jobs=1):
     """
-    Tune Logistic Regression using GridSearchCV.
+    Run the Logistic Regression grid search.
     Args:
         X_train (np.ndarray): Scaled training features.
         y_train (pd.Series): Training labels.
+        n_jobs (int): Cores to run the grid's (candidate, fold) fits on.
     Returns:
-        Best estimator from GridSearchCV.
+        GridSearchCV: The fitted search.
     """
     param_grid = {
         'C': [0.01, 0.1, 1, 10, 100],
         'penalty': ['l1', 'l2'],
         'solver': ['liblinear']
     }
-    grid = GridSearchCV(LogisticRegression(max_iter=1000, random_state=42), param_grid, cv=5, scoring='accuracy')
-    grid.fit(X_train, y_train)
+    grid = GridSearchCV(LogisticRegression(max_iter=1000, random_state=42), param_grid, cv=5, scoring='accuracy',
+                        n_jobs=resolve_jobs(n_jobs))
+    return grid.fit(X_train, y_train)
+
+
+def tune_logistic_regression(X_train, y_train, n_jobs=1, cache=None):
+    """
+    Tune Logistic Regression using GridSearchCV.
+    Args:
+        X_train (np.ndarray): Scaled training features.
+        y_train (pd.Series): Training labels.
+        n_jobs (int): Cores to run the grid's (candidate, fold) fits on.
+        cache (StageCache): Reuses an earlier search over the same data if given.
+    Returns:
+        Best estimator from GridSearchCV.
+    """
+    cache = cache or StageCache(enabled=False)
+    grid = cache.run('grid_search', grid_search_logistic_regression, X_train, y_train, n_jobs=n_jobs)
     print("\nBest parameters for Logistic Regression:", grid.best_params_)
     print("Best cross-validated accuracy:", grid.best_score_)
+    print("Fits:", len(grid.cv_results_['params']) * grid.n_splits_)
     return grid.best_estimator_
 
 
-def main():
-    # 1. Load data
-    df = load_data(DATA_PATH)
-
-    # 2. Explore data
-    explore_data(df)
-
-    # 3. Clean data
-    df = clean_data(df)
-
-    # 4. EDA
-    perform_eda(df)
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Diabetes prediction on the UCI dataset")
+    parser.add_argument("--data", default=DATA_PATH, help="CSV to model (default: %(default)s)")
+    parser.add_argument("--chunksize", type=int, metavar="ROWS",
+                        help="stream the data ROWS rows at a time instead of loading it whole; "
+                             "the models then train on a random sample of at most --max-rows rows")
+    parser.add_argument("--max-rows", type=int, default=DEFAULT_MAX_ROWS,
+                        help="largest sample --chunksize keeps for modelling; SVM training time grows with "
+                             "its square (default: %(default)s)")
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="worker processes for model fitting and grid search; -1 uses every core (default: %(default)s)")
+    parser.add_argument("--force", nargs="*", metavar="STAGE",
+                        help="recompute cached stages: all of them, or just those named "
+                             "(load, clean, scan, plots, scale, fit, evaluate, tune, grid_search)")
+    parser.add_argument("--tuning", choices=["budgeted", "grid"], default="budgeted",
+                        help="budgeted: tune every model within --tune-seconds/--tune-fits; "
+                             "grid: exhaustive grid search of Logistic Regression only (default: %(default)s)")
+    parser.add_argument("--tune-seconds", type=float, default=60,
+                        help="wall-clock budget of budgeted tuning, shared by the models in turn; time one model "
+                             "leaves unused goes to the next (default: %(default)s)")
+    parser.add_argument("--tune-fits", type=int, help="fit budget of budgeted tuning, shared the same way")
+    parser.add_argument("--save-model", metavar="PATH",
+                        help="write the exported model, its scaler and the imputation medians to PATH for score.py")
+    parser.add_argument("--export-model", default="Tuned Logistic Regression",
+                        choices=["Tuned Logistic Regression", "Tuned Random Forest", "Logistic Regression",
+                                 "Random Forest"],
+                        help="model --save-model exports (default: %(default)s)")
+    parser.add_argument("--plots", choices=PLOT_MODES, default="all",
+                        help="plots to render: all, minimal (everything but the pairplot) or none (default: %(default)s)")
+    parser.add_argument("--no-plots", dest="plots", action="store_const", const="none", help="same as --plots=none")
+    parser.add_argument("--plot-jobs", type=int, default=DEFAULT_PLOT_JOBS,
+                        help="worker processes rendering plots in the background, besides --jobs (default: %(default)s)")
+    parser.add_argument("--no-cache", action="store_true", help="neither read nor write the stage cache")
+    parser.add_argument("--cache-dir", default=CACHE_DIR, help="stage cache directory (default: %(default)s)")
+    parser.add_argument("--cache-size", type=float, default=DEFAULT_MAX_MB,
+                        help="MB kept in the stage cache before the least recently used entries go (default: %(default)s)")
+    args = parser.parse_args(argv)
+    if args.export_model == "Tuned Random Forest" and args.tuning == "grid":
+        parser.error("--tuning grid only tunes Logistic Regression")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    force = True if args.force == [] else (args.force or ())
+    cache = StageCache(args.cache_dir, args.cache_size, force=force, enabled=not args.no_cache)
+
+    digest = file_digest(args.data)
+    if args.chunksize:
+        # 1-3. Stream the file: medians and EDA statistics over every row, a cleaned sample to model on
+        columnar_path = None if args.no_cache else os.path.join(args.cache_dir, f"{digest[:24]}.parquet")
+        scan = cache.run('scan', scan_dataset, args.data, args.chunksize, args.max_rows, bins=HISTOGRAM_BINS,
+                         columnar_path=columnar_path, digest=digest)
+        df, medians, summary = scan['sample'], scan['medians'], scan
+        print(f"\nScanned {scan['rows']:,} rows in chunks of {args.chunksize:,}; modelling a sample of {len(df):,}")
+        explore_data(df)
+    else:
+        # 1. Load data
+        df = cache.run('load', load_data, args.data, extra=digest)
+
+        # 2. Explore data
+        explore_data(df)
+
+        # 3. Clean data
+        medians = imputation_medians(df)
+        df = cache.run('clean', clean_data, df, medians)
+        summary = None
+
+    # 4. EDA (rendered in the background while the models train)
+    renderer = PlotRenderer(args.plots, args.plot_jobs, cache)
+    perform_eda(df, renderer, summary)
 
     # 5. Split data
     X = df.drop('Outcome', axis=1)
@@ -204,30 +463,30 @@ def main():
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
 
     # 6. Scale features
-    X_train_scaled, X_test_scaled = scale_features(X_train, X_test)
+    X_train_scaled, X_test_scaled, scaler = cache.run('scale', scale_features, X_train, X_test)
 
     # 7. Train and evaluate models
-    results = train_and_evaluate_models(X_train_scaled, X_test_scaled, y_train, y_test)
-
-    # 8. Hyperparameter tuning for Logistic Regression
-    best_lr = tune_logistic_regression(X_train_scaled, y_train)
-    y_pred = best_lr.predict(X_test_scaled)
-    acc = accuracy_score(y_test, y_pred)
-    cm = confusion_matrix(y_test, y_pred)
-    cr = classification_report(y_test, y_pred)
-    print("\nTuned Logistic Regression Results:")
-    print(f"Accuracy: {acc:.4f}")
-    print("Confusion Matrix:\n", cm)
-    print("Classification Report:\n", cr)
-    # Save confusion matrix plot
-    plt.figure(figsize=(5, 4))
-    sns.heatmap(cm, annot=True, fmt='d', cmap='Blues')
-    plt.title('Tuned Logistic Regression - Confusion Matrix')
-    plt.xlabel('Predicted')
-    plt.ylabel('Actual')
-    plt.tight_layout()
-    plt.savefig(os.path.join(PLOTS_DIR, 'tuned_logistic_regression_confusion_matrix.png'))
-    plt.close()
+    # (budgeted tuning of every model happens here too)
+    results = train_and_evaluate_models(X_train_scaled, X_test_scaled, y_train, y_test, n_jobs=args.jobs, cache=cache,
+                                        renderer=renderer, tune=args.tuning == "budgeted",
+                                        tune_seconds=args.tune_seconds, tune_fits=args.tune_fits)
+
+    # 8. Exhaustive hyperparameter tuning for Logistic Regression
+    if args.tuning == "grid":
+        best_lr = tune_logistic_regression(X_train_scaled, y_train, n_jobs=args.jobs, cache=cache)
+        tuned = evaluate('Tuned Logistic Regression', best_lr, X_test_scaled, y_test, cache, renderer)
+        results['Tuned Logistic Regression'] = dict(tuned, model=best_lr)
+
+    # 9. Export a model with the preprocessing it was trained with
+    if args.save_model:
+        chosen = results[args.export_model]
+        metadata = {'name': args.export_model, 'accuracy': chosen['accuracy'], 'training_rows': len(X_train)}
+        pipeline = ScoringPipeline(list(X.columns), medians, scaler, chosen['model'], metadata,
+                                   zero_invalid=ZERO_INVALID_COLUMNS)
+        save_artifact(pipeline, args.save_model)
+        print(f"\nSaved {args.export_model} to {args.save_model}")
+    renderer.close()
+    print(f"\n{cache.summary()}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,120 @@
+"""
+Load generator for serve.py.
+
+    python loadgen.py [--url http://127.0.0.1:8000] [--concurrency 32] [--duration 10] [--rows 1]
+
+Each of --concurrency client threads keeps one connection open and sends
+/predict requests back to back, with --rows patients per request sampled from
+diabetes.csv, for --duration seconds. Prints the client-side latency
+percentiles and throughput, then the server's /stats.
+"""
+
+import argparse
+import csv
+import http.client
+import json
+import random
+import sys
+import threading
+import time
+from urllib.parse import urlparse
+
+DATA_PATH = "diabetes.csv"
+
+
+def load_instances(path, limit=1000):
+    """
+    Read patient rows to send, without the Outcome label.
+    Args:
+        path (str): CSV in the diabetes.csv layout.
+        limit (int): Rows to keep.
+    Returns:
+        list: Instances as {feature: value} dicts.
+    """
+    with open(path, newline='') as f:
+        rows = []
+        for row in csv.DictReader(f):
+            row.pop('Outcome', None)
+            rows.append({key: float(value) for key, value in row.items()})
+            if len(rows) >= limit:
+                break
+    return rows
+
+
+def percentile(ordered, q):
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+def client(url, instances, rows, deadline, seed, latencies, errors):
+    rng = random.Random(seed)
+    conn = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=30)
+    headers = {'Content-Type': 'application/json'}
+    while time.perf_counter() < deadline:
+        body = json.dumps({'instances': rng.sample(instances, rows)})
+        started = time.perf_counter()
+        try:
+            conn.request('POST', '/predict', body, headers)
+            response = conn.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            errors.append(1)
+            conn.close()
+            conn = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=30)
+            continue
+        if response.status != 200:
+            errors.append(response.status)
+            continue
+        latencies.append(time.perf_counter() - started)
+    conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark serve.py with concurrent clients")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--concurrency", type=int, default=32, help="client threads (default: %(default)s)")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds to run (default: %(default)s)")
+    parser.add_argument("--rows", type=int, default=1, help="patients per request (default: %(default)s)")
+    parser.add_argument("--data", default=DATA_PATH, help="CSV to sample patients from (default: %(default)s)")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    url = urlparse(args.url)
+    instances = load_instances(args.data)
+    latencies, errors = [], []  # list.append is atomic, so the threads share them without a lock
+    deadline = time.perf_counter() + args.duration
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(url, instances, args.rows, deadline, seed, latencies, errors))
+               for seed in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    ordered = sorted(latencies)
+    results = {
+        'concurrency': args.concurrency,
+        'rows_per_request': args.rows,
+        'requests': len(ordered),
+        'errors': len(errors),
+        'requests_per_s': round(len(ordered) / elapsed, 1),
+        'rows_per_s': round(len(ordered) * args.rows / elapsed, 1),
+    }
+    if ordered:
+        for q in (50, 90, 99):
+            results[f'p{q}_ms'] = round(percentile(ordered, q) * 1000, 3)
+        results['max_ms'] = round(ordered[-1] * 1000, 3)
+    conn = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=10)
+    conn.request('GET', '/stats')
+    results['server'] = json.loads(conn.getresponse().read())
+    conn.close()
+
+    print(json.dumps(results, indent=2))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+    return 0 if ordered else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
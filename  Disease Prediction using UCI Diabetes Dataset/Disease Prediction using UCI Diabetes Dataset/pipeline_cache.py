@@ -0,0 +1,291 @@
+"""
+Content-addressed cache for the stages of the diabetes pipeline.
+
+A stage is a plain function call. Its cache key hashes the source of the
+module defining the function and of every module of this project it imports
+(so constants and helpers count as the stage's code too), the installed
+library versions and a fingerprint of every argument
+(DataFrames and arrays by content, estimators by their parameters), so a
+stage reruns only when its code, its inputs or its parameters change, and
+everything downstream of a changed stage misses because its inputs changed.
+Results are pickled under CACHE_DIR together with any files the stage wrote
+(plots), which are put back on a hit. The least recently used entries are
+evicted once the cache grows past its size limit; Parquet copies of input
+files that dataset.scan_dataset keeps here count towards it too.
+"""
+
+import ast
+import hashlib
+import inspect
+import os
+import pickle
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.base import BaseEstimator
+
+CACHE_DIR = ".pipeline_cache"
+DEFAULT_MAX_MB = 1024
+# Keyword arguments that change how a stage runs but not what it returns
+EXECUTION_OPTIONS = ("n_jobs", "chunksize", "columnar_path")
+
+
+def file_digest(path):
+    """
+    Hash a file's contents.
+    Args:
+        path (str): File to hash.
+    Returns:
+        str: Hex SHA-256 digest.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def source_digest(path):
+    """
+    Hash a module's source together with every module next to it that it imports, directly or through others.
+    Args:
+        path (str): Python source file.
+    Returns:
+        str: Hex SHA-256 digest.
+    """
+    root = os.path.dirname(os.path.abspath(path))
+    seen, pending = set(), [os.path.abspath(path)]
+    while pending:
+        current = pending.pop()
+        if current in seen:
+            continue
+        seen.add(current)
+        with open(current, "rb") as f:
+            tree = ast.parse(f.read(), current)
+        # Imports anywhere in the file, including ones deferred into functions
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+                names = [node.module]
+            else:
+                continue
+            for name in names:
+                local = os.path.join(root, name.split(".")[0] + ".py")
+                if os.path.exists(local):
+                    pending.append(local)
+    digest = hashlib.sha256()
+    for current in sorted(seen):
+        digest.update(f"{os.path.basename(current)}:{file_digest(current)}".encode())
+    return digest.hexdigest()
+
+
+class StageCache:
+    """
+    Pickled stage results keyed by code, inputs and parameters, with LRU eviction.
+    Args:
+        cache_dir (str): Directory holding the entries.
+        max_mb (float): Size the cache is trimmed back to after each store.
+        force (iterable or bool): Stage names to recompute even when cached; True for all of them.
+        enabled (bool): False turns every lookup into a miss and stores nothing.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, max_mb=DEFAULT_MAX_MB, force=(), enabled=True):
+        self.cache_dir = cache_dir
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.force = force
+        self.enabled = enabled
+        self.hits = []
+        self.misses = []
+        # Fingerprints of values this cache produced, so downstream keys do not rehash them
+        self._produced = {}
+        # Source file -> source_digest, as the code does not change during a run
+        self._code = {}
+        if enabled:
+            os.makedirs(cache_dir, exist_ok=True)
+            self.evict()
+
+    def run(self, stage, fn, *args, outputs=(), extra=None, **kwargs):
+        """
+        Return fn(*args, **kwargs), from the cache when this call has been made before.
+        Args:
+            stage (str): Stage name, used in entry names, reports and --force.
+            fn (callable): Stage function.
+            outputs (iterable): Files fn writes, stored with the result and restored on a hit.
+            extra: Additional key material, e.g. the digest of a file fn reads.
+        Returns:
+            The stage result.
+        """
+        key = self.key(stage, fn, args, kwargs, extra)
+        found, value = self.get(stage, key)
+        if found:
+            return value
+        value = fn(*args, **kwargs)
+        self.put(stage, key, value, outputs)
+        return value
+
+    def key(self, stage, fn, args=(), kwargs=None, extra=None):
+        digest = hashlib.sha256()
+        for part in (stage, fn.__qualname__, self.code_digest(fn), sys.version, sklearn.__version__, pd.__version__,
+                     np.__version__):
+            digest.update(part.encode())
+        for value in args:
+            digest.update(self.fingerprint(value).encode())
+        for name, value in sorted((kwargs or {}).items()):
+            if name not in EXECUTION_OPTIONS:
+                digest.update(f"{name}={self.fingerprint(value)}".encode())
+        if extra is not None:
+            digest.update(self.fingerprint(extra).encode())
+        return digest.hexdigest()
+
+    def code_digest(self, fn):
+        """
+        Digest of the code a stage function runs: its module and the project modules that one imports.
+        Args:
+            fn (callable): Stage function.
+        Returns:
+            str: source_digest of fn's source file.
+        """
+        path = inspect.getsourcefile(fn)
+        if path not in self._code:
+            self._code[path] = source_digest(path)
+        return self._code[path]
+
+    def fingerprint(self, value):
+        """
+        Summarize a stage input as a string that changes whenever its content does.
+        Args:
+            value: Any stage argument.
+        Returns:
+            str: Fingerprint.
+        """
+        produced = self._produced.get(id(value))
+        if produced is not None and produced[0] is value:
+            return produced[1]
+        if isinstance(value, pd.DataFrame):
+            rows = pd.util.hash_pandas_object(value, index=True).values
+            return f"df:{list(value.columns)}:{list(map(str, value.dtypes))}:{_sha(rows.tobytes())}"
+        if isinstance(value, pd.Series):
+            rows = pd.util.hash_pandas_object(value, index=True).values
+            return f"series:{value.name}:{value.dtype}:{_sha(rows.tobytes())}"
+        if isinstance(value, np.ndarray):
+            return f"array:{value.dtype}:{value.shape}:{_sha(np.ascontiguousarray(value).tobytes())}"
+        if isinstance(value, BaseEstimator):
+            params = {k: v for k, v in value.get_params(deep=True).items() if not k.endswith(EXECUTION_OPTIONS)}
+            fitted = [k for k in vars(value) if k.endswith("_") and not k.startswith("_")]
+            state = _sha(pickle.dumps(value)) if fitted else "unfitted"
+            return f"{type(value).__name__}:{self.fingerprint(params)}:{state}"
+        if isinstance(value, dict):
+            return "{" + ",".join(f"{k!r}:{self.fingerprint(v)}" for k, v in sorted(value.items(), key=repr)) + "}"
+        if isinstance(value, (list, tuple)):
+            return "[" + ",".join(self.fingerprint(v) for v in value) + "]"
+        return repr(value)
+
+    def _path(self, stage, key):
+        return os.path.join(self.cache_dir, f"{stage}-{key[:24]}.pkl")
+
+    def _forced(self, stage):
+        return self.force is True or stage in (self.force or ())
+
+    def get(self, stage, key):
+        """
+        Look up a stage result.
+        Returns:
+            tuple: (found, value).
+        """
+        path = self._path(stage, key)
+        if not self.enabled or self._forced(stage) or not os.path.exists(path):
+            self.misses.append(stage)
+            return False, None
+        try:
+            with open(path, "rb") as f:
+                entry = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            self.misses.append(stage)
+            return False, None
+        os.utime(path)  # mtime is the LRU clock
+        for out_path, content in entry["files"].items():
+            _restore(out_path, content)
+        self.hits.append(stage)
+        self._remember(entry["value"], key)
+        return True, entry["value"]
+
+    def put(self, stage, key, value, outputs=()):
+        """
+        Store a stage result and the files it wrote, then evict down to the size limit.
+        """
+        self._remember(value, key)
+        if not self.enabled:
+            return
+        files = {}
+        for out_path in outputs:
+            with open(out_path, "rb") as f:
+                files[out_path] = f.read()
+        path = self._path(stage, key)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump({"stage": stage, "value": value, "files": files}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        self.evict(keep=path)
+
+    def _remember(self, value, key):
+        # Only values worth hashing; small shared objects like None must keep their plain repr.
+        # Tuples and dicts of results (e.g. scaled splits, a search result) are remembered element by element.
+        if isinstance(value, tuple):
+            for i, item in enumerate(value):
+                self._remember(item, f"{key}[{i}]")
+        elif isinstance(value, dict):
+            for name, item in value.items():
+                self._remember(item, f"{key}[{name!r}]")
+        elif isinstance(value, (pd.DataFrame, pd.Series, np.ndarray, BaseEstimator)):
+            self._produced[id(value)] = (value, key)
+
+    def evict(self, keep=None):
+        """
+        Delete least recently used entries until the cache fits in max_bytes.
+        Args:
+            keep (str): Entry path never to delete (the one just written).
+        Returns:
+            int: Number of entries removed.
+        """
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name.endswith((".pkl", ".parquet")):
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            os.remove(path)
+            total -= size
+            removed += 1
+        return removed
+
+    def summary(self):
+        return f"cache: {len(self.hits)} stages reused, {len(self.misses)} recomputed"
+
+
+def _sha(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _restore(path, content):
+    try:
+        with open(path, "rb") as f:
+            if f.read() == content:
+                return
+    except OSError:
+        pass
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(content)
@@ -0,0 +1,198 @@
+"""
+Plot rendering for the diabetes pipeline.
+
+Every figure is an independent job: a top-level function that takes small
+precomputed inputs (histogram counts, a correlation matrix, a confusion
+matrix) and writes one PNG with the non-interactive Agg backend. A
+PlotRenderer runs the jobs in a process pool while the pipeline carries on,
+and skips any job whose inputs hash to a cached entry, putting the stored
+file back instead. Only the pairplot still draws raw rows, from a fixed
+200-row sample; histograms and the heatmap are binned and correlated with
+NumPy up front, so their cost does not grow with the row count beyond one
+pass over the data.
+"""
+
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+
+matplotlib.use("Agg")
+
+import matplotlib.pyplot as plt  # noqa: E402 - after the backend is chosen
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+import seaborn as sns  # noqa: E402
+from matplotlib.figure import Figure  # noqa: E402
+
+# Set plot style (at import, so worker processes get it too)
+sns.set(style="whitegrid")
+
+PLOTS_DIR = "plots"
+PLOT_MODES = ("all", "minimal", "none")
+HISTOGRAM_BINS = 20
+PAIRPLOT_SAMPLE = 200
+# Plot workers, separate from the model-fitting ones; two keep the pairplot from holding up the rest
+DEFAULT_PLOT_JOBS = min(2, os.cpu_count() or 1)
+
+
+def plot_path(name):
+    return os.path.join(PLOTS_DIR, name)
+
+
+def confusion_matrix_path(name):
+    return plot_path(f'{name.lower().replace(" ", "_")}_confusion_matrix.png')
+
+
+def feature_histograms(df, bins=HISTOGRAM_BINS):
+    """
+    Bin every column the way DataFrame.hist would.
+    Args:
+        df (pd.DataFrame): Numeric dataset.
+        bins (int): Equal-width bins per column.
+    Returns:
+        dict: Column -> (counts, bin edges).
+    """
+    return {col: np.histogram(df[col].to_numpy(), bins=bins) for col in df.columns}
+
+
+def correlation_matrix(df):
+    """
+    Pearson correlation of every pair of columns, as DataFrame.corr computes it for data without missing values.
+    Args:
+        df (pd.DataFrame): Numeric dataset.
+    Returns:
+        pd.DataFrame: Correlation matrix labelled by column.
+    """
+    corr = np.corrcoef(df.to_numpy(dtype=np.float64), rowvar=False)
+    return pd.DataFrame(corr, index=df.columns, columns=df.columns)
+
+
+def render_histograms(histograms, path):
+    cols = math.ceil(math.sqrt(len(histograms)))
+    rows = math.ceil(len(histograms) / cols)
+    fig = Figure(figsize=(15, 10))
+    axes = fig.subplots(rows, cols, squeeze=False).ravel()
+    for ax, (col, (counts, edges)) in zip(axes, histograms.items()):
+        # One weighted sample per bin draws the same bars as histogramming the raw column
+        ax.hist(edges[:-1], bins=edges, weights=counts)
+        ax.set_title(col)
+    for ax in axes[len(histograms):]:
+        ax.set_visible(False)
+    fig.suptitle('Feature Distributions')
+    fig.tight_layout(rect=[0, 0.03, 1, 0.95])
+    fig.savefig(path)
+
+
+def render_heatmap(corr, path):
+    fig = Figure(figsize=(10, 8))
+    ax = fig.subplots()
+    sns.heatmap(corr, annot=True, cmap='coolwarm', ax=ax)
+    ax.set_title('Correlation Heatmap')
+    fig.tight_layout()
+    fig.savefig(path)
+
+
+def render_outcome_counts(labels, counts, path):
+    fig = Figure(figsize=(6, 4))
+    ax = fig.subplots()
+    sns.barplot(x=labels, y=counts, ax=ax)
+    ax.set_xlabel('Outcome')
+    ax.set_ylabel('count')
+    ax.set_title('Outcome Distribution')
+    fig.tight_layout()
+    fig.savefig(path)
+
+
+def render_pairplot(sample, path):
+    # PairGrid builds its own figure through pyplot, so this one job does use (and close) pyplot state
+    grid = sns.pairplot(sample, hue='Outcome')
+    grid.figure.suptitle('Pairplot of Features', y=1.02)
+    grid.savefig(path)
+    plt.close(grid.figure)
+
+
+def render_confusion_matrix(name, cm, path):
+    fig = Figure(figsize=(5, 4))
+    ax = fig.subplots()
+    sns.heatmap(cm, annot=True, fmt='d', cmap='Blues', ax=ax)
+    ax.set_title(f'{name} - Confusion Matrix')
+    ax.set_xlabel('Predicted')
+    ax.set_ylabel('Actual')
+    fig.tight_layout()
+    fig.savefig(path)
+
+
+def render(fn, args, path):
+    fn(*args, path)
+    return path
+
+
+class PlotRenderer:
+    """
+    Renders plot jobs in worker processes, skipping those whose inputs are cached.
+    Args:
+        mode (str): 'all'; 'minimal' to skip the pairplot, by far the slowest figure; 'none' to render nothing.
+        n_jobs (int): Worker processes; DEFAULT_PLOT_JOBS if None. Even one worker renders in the background.
+        cache (StageCache): Where rendered files are stored and looked up, under the 'plots' stage.
+    """
+
+    def __init__(self, mode="all", n_jobs=None, cache=None):
+        if mode not in PLOT_MODES:
+            raise ValueError(f"Unknown plot mode {mode!r}; expected one of {', '.join(PLOT_MODES)}")
+        self.mode = mode
+        self.n_jobs = n_jobs or DEFAULT_PLOT_JOBS
+        self.cache = cache
+        self._pool = None
+        self._pending = []
+
+    def submit(self, fn, *args, path, minimal=True):
+        """
+        Render fn(*args, path) unless the mode excludes it or the same inputs were rendered before.
+        Args:
+            fn (callable): Top-level render function, so it can be sent to a worker.
+            path (str): PNG the job writes.
+            minimal (bool): Whether the job is part of --plots=minimal.
+        """
+        if self.mode == "none" or (self.mode == "minimal" and not minimal):
+            return
+        if self.cache is not None:
+            key = self.cache.key('plots', fn, args + (path,))
+            found, _ = self.cache.get('plots', key)
+            if found:
+                return
+        else:
+            key = None
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.n_jobs)
+        self._pending.append((key, self._pool.submit(render, fn, args, path)))
+
+    def close(self):
+        """
+        Wait for every queued job and cache what it wrote.
+        Returns:
+            int: Number of plots rendered in worker processes.
+        """
+        done = 0
+        try:
+            for key, future in self._pending:
+                self._store(key, future.result())
+                done += 1
+        finally:
+            self._pending = []
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+        return done
+
+    def _store(self, key, path):
+        if self.cache is not None:
+            self.cache.put('plots', key, None, outputs=[path])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
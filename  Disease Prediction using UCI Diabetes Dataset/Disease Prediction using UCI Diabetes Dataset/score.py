@@ -0,0 +1,89 @@
+"""
+Batch-score a CSV of patients with a model artifact from diabetes_prediction.py.
+
+    python score.py model.joblib patients.csv scored.csv [--chunksize 100000]
+
+The input is read chunksize rows at a time and each scored chunk is appended
+to the output straight away, so memory use stays flat however large the file.
+Chunks go to a temporary file next to the output, which replaces it only once
+every row is scored, so a failed run never leaves a partial result behind.
+Every input column is kept and `probability` and `prediction` are added
+(--scores-only writes just those two).
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+from artifact import load_artifact
+
+
+def score_csv(pipeline, input_path, output_path, chunksize=100000, threshold=0.5, scores_only=False, progress=None):
+    """
+    Score input_path chunk by chunk, then put the results at output_path (untouched if scoring fails).
+    Args:
+        pipeline (ScoringPipeline): Loaded artifact.
+        input_path (str): CSV with the feature columns.
+        output_path (str): CSV to write.
+        chunksize (int): Rows read and scored at a time.
+        threshold (float): Probability at or above which prediction is 1.
+        scores_only (bool): Write only the probability and prediction columns.
+        progress (callable): Called with (rows so far, seconds elapsed) after each chunk.
+    Returns:
+        int: Rows scored.
+    """
+    # Feature columns are parsed as floats directly; other columns are passed through untouched
+    dtypes = {col: 'float64' for col in pipeline.features}
+    started = time.perf_counter()
+    rows = 0
+    tmp_path = output_path + '.tmp'
+    try:
+        with open(tmp_path, 'w', newline='') as out:
+            for chunk in pd.read_csv(input_path, chunksize=chunksize, dtype=dtypes):
+                probability = pipeline.predict_proba(chunk)
+                scored = pd.DataFrame(index=chunk.index) if scores_only else chunk
+                scored['probability'] = probability
+                scored['prediction'] = (probability >= threshold).astype('int8')
+                scored.to_csv(out, header=rows == 0, index=False, float_format='%.6g')
+                rows += len(chunk)
+                if progress:
+                    progress(rows, time.perf_counter() - started)
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return rows
+
+
+def report(rows, elapsed):
+    rate = rows / elapsed if elapsed else 0
+    print(f"\r{rows:,} rows scored, {rate:,.0f} rows/sec", end='', file=sys.stderr, flush=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score a CSV of patients with a saved diabetes model")
+    parser.add_argument("model", help="artifact written by diabetes_prediction.py --save-model")
+    parser.add_argument("input", help="CSV with the feature columns (Outcome is not needed)")
+    parser.add_argument("output", help="CSV to write")
+    parser.add_argument("--chunksize", type=int, default=100000, help="rows per chunk (default: %(default)s)")
+    parser.add_argument("--threshold", type=float, default=0.5, help="probability cut-off for prediction (default: %(default)s)")
+    parser.add_argument("--scores-only", action="store_true", help="write only the probability and prediction columns")
+    args = parser.parse_args(argv)
+
+    pipeline = load_artifact(args.model)
+    print(f"Model: {pipeline.metadata.get('name', type(pipeline.model).__name__)}", file=sys.stderr)
+    try:
+        rows = score_csv(pipeline, args.input, args.output, args.chunksize, args.threshold, args.scores_only, report)
+    except ValueError as e:
+        print(f"\nScoring failed: {e}", file=sys.stderr)
+        return 1
+    print(f"\nWrote {rows:,} rows to {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
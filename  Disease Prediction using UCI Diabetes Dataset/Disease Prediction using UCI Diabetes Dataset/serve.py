@@ -0,0 +1,300 @@
+"""
+Local HTTP prediction server for a model artifact, with micro-batching.
+
+    python serve.py model.joblib [--port 8000] [--max-batch 64] [--max-wait-ms 5]
+
+POST /predict with {"instances": [{"Glucose": 148, ...}, ...]} (or a single
+object) returns {"probabilities": [...], "predictions": [...]}. null features
+are imputed with the training medians. Each request is validated, imputed and
+scaled on its own handler thread, so a malformed one is answered with 400
+before it can join a batch. Requests that arrive together are coalesced: a
+batcher thread waits at most --max-wait-ms after the first queued request, or
+until --max-batch rows are waiting, and scores them all with one vectorized
+call. Should that call fail, the batch is scored request by request, so only
+the request at fault gets the error. GET /stats reports latency
+percentiles and throughput; GET /health answers once the model is loaded.
+"""
+
+import argparse
+import json
+import queue
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from artifact import load_artifact
+
+LATENCY_WINDOW = 10000
+
+
+class Stats:
+    """
+    Request counters and a sliding window of latencies, shared by the handler threads.
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self.requests = 0
+        self.rows = 0
+        self.batches = 0
+        self.errors = 0
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._lock = threading.Lock()
+
+    def record_request(self, rows, seconds):
+        with self._lock:
+            self.requests += 1
+            self.rows += rows
+            self._latencies.append(seconds)
+
+    def record_batch(self):
+        with self._lock:
+            self.batches += 1
+
+    def record_error(self):
+        with self._lock:
+            self.errors += 1
+
+    def snapshot(self):
+        """
+        Summarize the counters.
+        Returns:
+            dict: Latency percentiles over the last LATENCY_WINDOW requests (ms) and lifetime throughput.
+        """
+        with self._lock:
+            latencies = np.array(self._latencies) * 1000
+            elapsed = time.time() - self.started
+            snapshot = {
+                'uptime_s': round(elapsed, 1),
+                'requests': self.requests,
+                'rows': self.rows,
+                'batches': self.batches,
+                'errors': self.errors,
+                'mean_batch_rows': round(self.rows / self.batches, 2) if self.batches else 0,
+                'requests_per_s': round(self.requests / elapsed, 1) if elapsed else 0,
+                'rows_per_s': round(self.rows / elapsed, 1) if elapsed else 0,
+            }
+        for name, q in (('p50_ms', 50), ('p90_ms', 90), ('p99_ms', 99)):
+            snapshot[name] = round(float(np.percentile(latencies, q)), 3) if len(latencies) else None
+        return snapshot
+
+
+class MicroBatcher:
+    """
+    Collects rows from concurrent requests and scores them together on one thread.
+    Args:
+        pipeline (ScoringPipeline): Loaded artifact.
+        max_batch (int): Rows after which a batch is scored without waiting further.
+        max_wait_ms (float): Longest a request waits for others to join its batch.
+        stats (Stats): Counters to update.
+    """
+
+    def __init__(self, pipeline, max_batch=64, max_wait_ms=5.0, stats=None):
+        self.pipeline = pipeline
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.stats = stats or Stats()
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, rows):
+        """
+        Queue rows for scoring.
+        Args:
+            rows (np.ndarray): One row per instance, as prepare_instances returns them.
+        Returns:
+            Future: Resolves to the rows' probabilities.
+        """
+        future = Future()
+        self._queue.put((rows, future))
+        return future
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = [first]
+            size = len(first[0])
+            deadline = time.perf_counter() + self.max_wait
+            while size < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._queue.put(None)  # finish this batch, then stop
+                    break
+                batch.append(item)
+                size += len(item[0])
+            self._score(batch)
+
+    def _score(self, batch):
+        try:
+            probabilities = self.pipeline.predict_proba_scaled(np.vstack([rows for rows, _ in batch]))
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0][1].set_exception(e)
+                return
+            # One bad request must not fail the others batched with it
+            for item in batch:
+                self._score([item])
+            return
+        self.stats.record_batch()
+        start = 0
+        for rows, future in batch:
+            future.set_result(probabilities[start:start + len(rows)])
+            start += len(rows)
+
+
+def parse_instances(body, features):
+    """
+    Turn a /predict request body into a float matrix in feature order.
+    Args:
+        body (bytes): JSON: {"instances": [...]}, a list of objects, or one object.
+        features (list): Feature names the model expects.
+    Returns:
+        np.ndarray: One raw row per instance; missing values (null) are NaN.
+    """
+    payload = json.loads(body)
+    if isinstance(payload, dict):
+        payload = payload.get('instances', [payload])
+    if not isinstance(payload, list) or not payload:
+        raise ValueError("expected a non-empty list of instances")
+    rows = np.empty((len(payload), len(features)), dtype=np.float64)
+    for i, instance in enumerate(payload):
+        if not isinstance(instance, dict):
+            raise ValueError(f"instance {i} is not an object")
+        try:
+            rows[i] = [np.nan if instance[col] is None else instance[col] for col in features]
+        except KeyError as e:
+            raise ValueError(f"instance {i} is missing {e.args[0]}") from None
+        except (TypeError, ValueError):
+            raise ValueError(f"instance {i} has a non-numeric feature") from None
+    return rows
+
+
+def prepare_instances(body, pipeline):
+    """
+    Parse a /predict request body, then impute and scale its rows ready for the batcher.
+    Args:
+        body (bytes): Request body, as parse_instances takes it.
+        pipeline (ScoringPipeline): Loaded artifact.
+    Returns:
+        np.ndarray: Scaled rows for pipeline.predict_proba_scaled.
+    """
+    rows = pipeline.transform_matrix(parse_instances(body, pipeline.features))
+    invalid = np.flatnonzero(~np.isfinite(rows).all(axis=1))
+    if len(invalid):
+        raise ValueError(f"instance {invalid[0]} has a non-finite feature")
+    return rows
+
+
+class PredictionHandler(BaseHTTPRequestHandler):
+    # Set on the class by make_server
+    batcher = None
+    threshold = 0.5
+    protocol_version = "HTTP/1.1"  # keep-alive, so load tests do not measure connection setup
+    disable_nagle_algorithm = True  # headers and body are separate writes; don't let them wait on a delayed ACK
+
+    def do_GET(self):
+        if self.path == '/health':
+            self._send(200, {'status': 'ok', 'model': self.batcher.pipeline.metadata.get('name')})
+        elif self.path == '/stats':
+            self._send(200, self.batcher.stats.snapshot())
+        else:
+            self._send(404, {'error': 'not found'})
+
+    def do_POST(self):
+        if self.path != '/predict':
+            self._send(404, {'error': 'not found'})
+            return
+        started = time.perf_counter()
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        try:
+            rows = prepare_instances(body, self.batcher.pipeline)
+        except ValueError as e:  # json.JSONDecodeError included
+            self.batcher.stats.record_error()
+            self._send(400, {'error': str(e)})
+            return
+        try:
+            probabilities = self.batcher.submit(rows).result()
+        except Exception as e:
+            self.batcher.stats.record_error()
+            self._send(500, {'error': str(e)})
+            return
+        self.batcher.stats.record_request(len(rows), time.perf_counter() - started)
+        self._send(200, {
+            'probabilities': probabilities.round(6).tolist(),
+            'predictions': (probabilities >= self.threshold).astype(int).tolist(),
+        })
+
+    def _send(self, status, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass  # one line per request would dominate the cost of serving it
+
+
+class PredictionServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128  # the default listen backlog of 5 drops connects from a burst of clients
+
+
+def make_server(pipeline, host='127.0.0.1', port=8000, max_batch=64, max_wait_ms=5.0, threshold=0.5):
+    """
+    Build (but do not start) a prediction server.
+    Returns:
+        tuple: (PredictionServer, MicroBatcher).
+    """
+    batcher = MicroBatcher(pipeline, max_batch, max_wait_ms)
+    handler = type('Handler', (PredictionHandler,), {'batcher': batcher, 'threshold': threshold})
+    return PredictionServer((host, port), handler), batcher
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve a saved diabetes model over HTTP with micro-batching")
+    parser.add_argument("model", help="artifact written by diabetes_prediction.py --save-model")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--max-batch", type=int, default=64, help="rows per scoring call at most (default: %(default)s)")
+    parser.add_argument("--max-wait-ms", type=float, default=5.0,
+                        help="how long a request may wait for others to batch with (default: %(default)s)")
+    parser.add_argument("--threshold", type=float, default=0.5, help="probability cut-off for predictions (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    pipeline = load_artifact(args.model)
+    server, batcher = make_server(pipeline, args.host, args.port, args.max_batch, args.max_wait_ms, args.threshold)
+    print(f"Serving {pipeline.metadata.get('name', 'model')} on http://{args.host}:{args.port} "
+          f"(batches of up to {args.max_batch} rows, {args.max_wait_ms} ms wait)", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        batcher.close()
+        print(json.dumps(batcher.stats.snapshot()), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,28 @@
+import os
+
+import pytest
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'diabetes.csv')
+
+
+@pytest.fixture(scope='session')
+def pipeline():
+    """
+    A ScoringPipeline trained on diabetes.csv the way diabetes_prediction.py --save-model builds one.
+    """
+    pd = pytest.importorskip('pandas')
+    pytest.importorskip('sklearn')
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.preprocessing import StandardScaler
+
+    from artifact import ScoringPipeline
+    from dataset import DTYPES, ZERO_INVALID_COLUMNS, clean_data, imputation_medians
+
+    df = pd.read_csv(DATA_PATH, dtype=DTYPES)
+    medians = imputation_medians(df)
+    df = clean_data(df, medians)
+    X = df.drop('Outcome', axis=1)
+    scaler = StandardScaler().fit(X)
+    model = LogisticRegression(max_iter=1000).fit(scaler.transform(X), df['Outcome'])
+    return ScoringPipeline(list(X.columns), medians, scaler, model, {'name': 'Logistic Regression'},
+                           zero_invalid=ZERO_INVALID_COLUMNS)
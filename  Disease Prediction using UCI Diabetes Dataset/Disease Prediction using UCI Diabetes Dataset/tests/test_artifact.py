@@ -0,0 +1,46 @@
+"""
+A saved artifact must score raw rows, blanks included, the way the training data was cleaned.
+"""
+
+import pytest
+
+np = pytest.importorskip('numpy')
+pd = pytest.importorskip('pandas')
+
+from artifact import ScoringPipeline, load_artifact, save_artifact  # noqa: E402
+from dataset import FEATURE_COLUMNS, ZERO_INVALID_COLUMNS, clean_data  # noqa: E402
+
+RAW = {
+    'Pregnancies': [6, np.nan, 0, 1],
+    'Glucose': [148, 85, 0, np.nan],
+    'BloodPressure': [72, 66, 40, 0],
+    'SkinThickness': [35, 29, 35, 0],
+    'Insulin': [0, 0, 168, 94],
+    'BMI': [33.6, np.nan, 43.1, 28.1],
+    'DiabetesPedigreeFunction': [0.627, 0.351, np.nan, 0.167],
+    'Age': [50, 31, 33, np.nan],
+}
+
+
+def test_every_feature_has_a_median(pipeline):
+    assert sorted(pipeline.medians) == sorted(FEATURE_COLUMNS)
+    assert pipeline.zero_invalid == ZERO_INVALID_COLUMNS
+    with pytest.raises(ValueError, match='Age'):
+        medians = {col: value for col, value in pipeline.medians.items() if col != 'Age'}
+        ScoringPipeline(pipeline.features, medians, pipeline.scaler, pipeline.model)
+
+
+def test_saved_artifact_scores_rows_with_blanks(pipeline, tmp_path):
+    path = str(tmp_path / 'model.joblib')
+    save_artifact(pipeline, path)
+    loaded = load_artifact(path)
+    raw = pd.DataFrame(RAW)
+
+    probabilities = loaded.predict_proba(raw)
+    assert probabilities.shape == (4,) and np.isfinite(probabilities).all()
+    # Exactly what the model gives for the rows cleaned as training cleaned them
+    cleaned = clean_data(raw.astype('float32'), pipeline.medians)
+    expected = pipeline.model.predict_proba(pipeline.scaler.transform(cleaned[pipeline.features]))[:, 1]
+    np.testing.assert_allclose(probabilities, expected, rtol=1e-5)
+    # A zero is kept where it is a valid value
+    assert loaded.transform(raw)[2, 0] == pytest.approx((0 - pipeline.scaler.mean_[0]) / pipeline.scaler.scale_[0])
@@ -0,0 +1,148 @@
+"""
+Stage cache keys must change with the stage's code and inputs, and only with them.
+"""
+
+import importlib.util
+import os
+import sys
+import textwrap
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+pytest.importorskip("sklearn")
+from sklearn.linear_model import LogisticRegression  # noqa: E402
+
+from pipeline_cache import StageCache, source_digest  # noqa: E402
+
+STAGES = """
+    import os
+
+    import settings
+
+
+    def scale(values):
+        return values * settings.FACTOR
+
+
+    def report(values):
+        from formatting import describe
+        return describe(values)
+"""
+
+
+def write_module(directory, name, source):
+    path = os.path.join(directory, f"{name}.py")
+    with open(path, "w") as f:
+        f.write(textwrap.dedent(source))
+    return path
+
+
+def load_module(path, name):
+    """
+    Import a source file under a name of its own, so each version of it is a distinct module.
+    """
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    """
+    A stage module importing one sibling at the top and another inside a function, plus an unrelated module.
+    """
+    directory = str(tmp_path / "project")
+    os.makedirs(directory)
+    write_module(directory, "settings", "FACTOR = 2\n")
+    write_module(directory, "formatting", "def describe(values):\n    return f'{len(values)} values'\n")
+    write_module(directory, "unrelated", "NAME = 'not imported'\n")
+    path = write_module(directory, "stages", STAGES)
+    monkeypatch.syspath_prepend(directory)
+    yield directory, load_module(path, "stages_under_test")
+    for name in ("settings", "formatting"):
+        sys.modules.pop(name, None)
+
+
+def stage_key(project, stage="scale"):
+    """
+    The key a fresh cache gives the stage, as a new pipeline run would.
+    """
+    _, stages = project
+    cache = StageCache(enabled=False)
+    return cache.key(stage, getattr(stages, stage), (np.arange(5),))
+
+
+def test_unchanged_code_keeps_its_key(project):
+    assert stage_key(project) == stage_key(project)
+    assert stage_key(project) != stage_key(project, "report")
+
+
+@pytest.mark.parametrize("name, source", [
+    ("settings", "FACTOR = 3\n"),
+    ("formatting", "def describe(values):\n    return f'{len(values)} rows'\n"),
+    ("stages", textwrap.dedent(STAGES) + "\nUNUSED = 1\n"),
+], ids=["imported-constant", "deferred-import", "own-module"])
+def test_code_changes_change_the_key(project, name, source):
+    directory, _ = project
+    before = stage_key(project)
+    digest = source_digest(os.path.join(directory, "stages.py"))
+    write_module(directory, name, source)
+    assert source_digest(os.path.join(directory, "stages.py")) != digest
+    assert stage_key(project) != before
+
+
+def test_unimported_modules_do_not_change_the_key(project):
+    directory, _ = project
+    before = stage_key(project)
+    write_module(directory, "unrelated", "NAME = 'edited'\n")
+    assert stage_key(project) == before
+
+
+def test_input_changes_change_the_key():
+    cache = StageCache(enabled=False)
+    frame = pd.DataFrame({"Glucose": [148.0, 85.0, 183.0], "Age": [50, 31, 32]})
+    key = cache.key("clean", pd.DataFrame.copy, (frame,))
+    assert cache.key("clean", pd.DataFrame.copy, (frame.copy(),)) == key
+    changed = frame.copy()
+    changed.loc[1, "Glucose"] = 86.0
+    assert cache.key("clean", pd.DataFrame.copy, (changed,)) != key
+    assert cache.key("clean", pd.DataFrame.copy, (frame.astype({"Age": "float32"}),)) != key
+
+    model = LogisticRegression(C=1.0)
+    assert cache.key("fit", LogisticRegression.fit, (model,)) == cache.key("fit", LogisticRegression.fit,
+                                                                           (LogisticRegression(C=1.0),))
+    assert cache.key("fit", LogisticRegression.fit, (model,)) != cache.key("fit", LogisticRegression.fit,
+                                                                           (LogisticRegression(C=0.5),))
+    # How a stage runs is not part of what it returns
+    assert cache.key("fit", LogisticRegression.fit, (model,), {"n_jobs": 4}) == cache.key(
+        "fit", LogisticRegression.fit, (model,), {"n_jobs": 1})
+
+
+def test_run_reuses_results_and_restores_outputs(project, tmp_path, monkeypatch):
+    _, stages = project
+    calls = []
+
+    def plot(values):
+        calls.append(values)
+        with open("plot.txt", "w") as f:
+            f.write(str(values.sum()))
+        return stages.scale(values)
+
+    monkeypatch.chdir(tmp_path)
+    cache_dir = str(tmp_path / "cache")
+    values = np.arange(5)
+    first = StageCache(cache_dir).run("plot", plot, values, outputs=["plot.txt"])
+    os.remove("plot.txt")
+
+    cache = StageCache(cache_dir)
+    assert np.array_equal(cache.run("plot", plot, values, outputs=["plot.txt"]), first)
+    assert (cache.hits, len(calls)) == (["plot"], 1)
+    with open("plot.txt") as f:
+        assert f.read() == "10"
+
+    StageCache(cache_dir, force=["plot"]).run("plot", plot, values, outputs=["plot.txt"])
+    StageCache(cache_dir).run("plot", plot, values + 1, outputs=["plot.txt"])
+    assert len(calls) == 3
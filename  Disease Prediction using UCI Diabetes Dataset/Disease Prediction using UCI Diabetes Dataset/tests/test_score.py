@@ -0,0 +1,33 @@
+"""
+score.py must write its output whole, or not at all.
+"""
+
+import os
+
+import pytest
+
+pd = pytest.importorskip('pandas')
+
+from score import score_csv  # noqa: E402
+
+HEADER = 'Pregnancies,Glucose,BloodPressure,SkinThickness,Insulin,BMI,DiabetesPedigreeFunction,Age\n'
+
+
+def test_scores_every_chunk(pipeline, tmp_path):
+    source, target = tmp_path / 'patients.csv', tmp_path / 'scored.csv'
+    source.write_text(HEADER + '6,148,72,35,0,33.6,0.627,50\n' * 5 + ',85,66,,0,26.6,,\n')
+    assert score_csv(pipeline, str(source), str(target), chunksize=2) == 6
+    scored = pd.read_csv(target)
+    assert len(scored) == 6 and scored['probability'].notna().all()
+    assert sorted(os.listdir(tmp_path)) == ['patients.csv', 'scored.csv']
+
+
+def test_failed_run_leaves_the_output_alone(pipeline, tmp_path):
+    source, target = tmp_path / 'patients.csv', tmp_path / 'scored.csv'
+    # The third chunk cannot be parsed, after two chunks were already written
+    source.write_text(HEADER + '6,148,72,35,0,33.6,0.627,50\n' * 4 + '1,eighty,66,29,0,26.6,0.351,31\n')
+    target.write_text('previous result\n')
+    with pytest.raises(ValueError):
+        score_csv(pipeline, str(source), str(target), chunksize=2)
+    assert target.read_text() == 'previous result\n'
+    assert sorted(os.listdir(tmp_path)) == ['patients.csv', 'scored.csv']
@@ -0,0 +1,71 @@
+"""
+A request the model cannot score must fail alone, not with the requests batched with it.
+"""
+
+import http.client
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+np = pytest.importorskip('numpy')
+pytest.importorskip('sklearn')
+
+from serve import MicroBatcher, make_server, prepare_instances  # noqa: E402
+
+PATIENT = {'Pregnancies': 6, 'Glucose': 148, 'BloodPressure': 72, 'SkinThickness': 35, 'Insulin': 0,
+           'BMI': 33.6, 'DiabetesPedigreeFunction': 0.627, 'Age': 50}
+
+
+def body(**changes):
+    return json.dumps({'instances': [dict(PATIENT, **changes)]}).encode()
+
+
+def test_prepare_instances_imputes_nulls_and_rejects_non_finite_values(pipeline):
+    blank = prepare_instances(body(Pregnancies=None, Age=None), pipeline)
+    filled = prepare_instances(body(Pregnancies=pipeline.medians['Pregnancies'], Age=pipeline.medians['Age']), pipeline)
+    np.testing.assert_array_equal(blank, filled)
+    with pytest.raises(ValueError, match='instance 0'):
+        prepare_instances(b'{"Glucose": 1e400}', pipeline)
+
+
+def test_failed_batch_is_scored_request_by_request(pipeline):
+    # A long wait and room for both, so the two requests are scored together
+    batcher = MicroBatcher(pipeline, max_batch=2, max_wait_ms=2000)
+    try:
+        good = prepare_instances(body(), pipeline)
+        bad = np.full_like(good, np.nan)  # what the batch saw before requests were imputed on their own
+        good_future, bad_future = batcher.submit(good), batcher.submit(bad)
+        np.testing.assert_allclose(good_future.result(timeout=10), pipeline.predict_proba_scaled(good))
+        with pytest.raises(ValueError):
+            bad_future.result(timeout=10)
+    finally:
+        batcher.close()
+
+
+def test_concurrent_requests_with_blanks_are_all_served(pipeline):
+    server, batcher = make_server(pipeline, port=0, max_batch=4, max_wait_ms=200)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    def post(payload):
+        conn = http.client.HTTPConnection(*server.server_address, timeout=10)
+        try:
+            conn.request('POST', '/predict', payload, {'Content-Type': 'application/json'})
+            response = conn.getresponse()
+            return response.status, json.loads(response.read())
+        finally:
+            conn.close()
+
+    try:
+        with ThreadPoolExecutor(3) as pool:
+            valid, blank, broken = pool.map(post, [body(), body(Pregnancies=None), body(Glucose='high')])
+        assert valid[0] == 200 and blank[0] == 200
+        assert broken == (400, {'error': 'instance 0 has a non-numeric feature'})
+        assert valid[1]['probabilities'] == [round(float(pipeline.predict_proba_scaled(
+            prepare_instances(body(), pipeline))[0]), 6)]
+    finally:
+        server.shutdown()
+        server.server_close()
+        batcher.close()
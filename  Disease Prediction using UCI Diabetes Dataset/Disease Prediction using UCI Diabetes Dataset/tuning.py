@@ -0,0 +1,210 @@
+"""
+Budgeted hyperparameter search for the diabetes models.
+
+Two strategies, both stopping early when their wall-clock or fit budget runs out:
+
+* regularization_path walks Logistic Regression along the grid search's
+  values of C in increasing order, one model per (penalty, fold) carried
+  from each C to the next. l2 paths use lbfgs with warm_start, so every
+  fit after the first starts next to its solution and takes a few
+  iterations at most. l1 paths keep liblinear, as the grid search does:
+  it cannot warm-start, but saga, which can, is several times slower per
+  fit. Accuracy flattens out past the best C, so each penalty's path stops
+  once it stops improving and never runs more fits than the grid.
+* successive_halving scores the estimator's defaults and a random sample of
+  other candidates on a small resource (trees, or training rows), keeps the
+  best 1/eta and gives the survivors eta times more, so most fits are cheap
+  and only a few get the full resource. A rung the budget interrupts has
+  still scored at least min_candidates of them.
+
+Each returns a dict with the refitted best estimator, its parameters and
+cross-validated accuracy, the number of fits, a trace of the best score
+against elapsed time and, when the budget cut the search short, where.
+tuning_bench.py compares both with the exhaustive grid and the untuned models.
+"""
+
+import math
+import time
+
+import numpy as np
+from sklearn.base import clone
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import ParameterSampler, StratifiedKFold, cross_val_score
+
+# The exhaustive grid's C values, so the path never costs more fits than the grid
+DEFAULT_CS = np.logspace(-2, 2, 5)
+PATH_SOLVERS = {'l1': 'liblinear', 'l2': 'lbfgs'}
+L1_RATIOS = {'l1': 1.0, 'l2': 0.0}
+
+
+class Budget:
+    """
+    Wall-clock and fit limits for one search; the clock starts when the budget is created.
+    Args:
+        seconds (float): Time after which no new fits start; None for no limit.
+        max_fits (int): Fits allowed; None for no limit.
+    """
+
+    def __init__(self, seconds=None, max_fits=None):
+        self.seconds = seconds
+        self.max_fits = max_fits
+        self.fits = 0
+        self.started = time.perf_counter()
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def spend(self, fits):
+        self.fits += fits
+
+    def exhausted(self):
+        return ((self.seconds is not None and self.elapsed() >= self.seconds)
+                or (self.max_fits is not None and self.fits >= self.max_fits))
+
+
+def path_model(penalty, **params):
+    """
+    Logistic Regression with an l1 or l2 penalty and its path solver (see PATH_SOLVERS).
+    scikit-learn 1.8 deprecated `penalty` in favour of l1_ratio; the penalty is passed the way this version expects.
+    """
+    if LogisticRegression().get_params().get('penalty', 'deprecated') == 'deprecated':
+        params['l1_ratio'] = L1_RATIOS[penalty]
+    else:
+        params['penalty'] = penalty
+    return LogisticRegression(solver=PATH_SOLVERS[penalty], max_iter=1000, random_state=42, **params)
+
+
+def _result(estimator, params, score, budget, trace, stopped):
+    return {'estimator': estimator, 'params': params, 'score': score, 'fits': budget.fits,
+            'elapsed': budget.elapsed(), 'trace': trace, 'complete': stopped is None, 'stopped': stopped}
+
+
+def regularization_path(X, y, Cs=DEFAULT_CS, penalties=('l1', 'l2'), cv=5, patience=1, seconds=None, max_fits=None):
+    """
+    Cross-validate Logistic Regression along a warm-started path of increasing C.
+    Args:
+        X (np.ndarray): Scaled training features.
+        y: Training labels.
+        Cs (iterable): Inverse regularization strengths; walked from strongest to weakest regularization.
+        penalties (iterable): 'l1' and/or 'l2'.
+        cv (int): Stratified folds.
+        patience (int): Values of C past a penalty's best one to try before that penalty's path stops;
+            None walks the whole path.
+        seconds (float): Wall-clock budget; the path stops at the first C reached after it runs out.
+        max_fits (int): Fit budget, checked the same way.
+    Returns:
+        dict: Best estimator (refitted on all of X), params, score, fits, elapsed seconds,
+            trace of (elapsed, fits, best score so far, step) after each C, whether the path ended
+            other than by running out of budget ('complete') and otherwise where it stopped ('stopped').
+    """
+    budget = Budget(seconds, max_fits)
+    X, y = np.asarray(X), np.asarray(y)
+    folds = list(StratifiedKFold(cv).split(X, y))
+    # One model per (penalty, fold); refitting it at the next C starts from the coefficients at this one
+    models = {(penalty, f): path_model(penalty, warm_start=True) for penalty in penalties for f in range(cv)}
+    best_score, best_params = -np.inf, None
+    # Each penalty's own best step; a penalty leaves the path once it has not improved for `patience` values of C
+    best_steps = {penalty: 0 for penalty in penalties}
+    penalty_best = {penalty: -np.inf for penalty in penalties}
+    active = list(penalties)
+    trace = []
+    stopped = None
+    Cs = sorted(Cs)
+    for i, C in enumerate(Cs):
+        for penalty in active:
+            score = float(np.mean([models[penalty, f].set_params(C=C).fit(X[train], y[train]).score(X[test], y[test])
+                                   for f, (train, test) in enumerate(folds)]))
+            budget.spend(cv)
+            if score > penalty_best[penalty]:
+                penalty_best[penalty], best_steps[penalty] = score, i
+            # Strictly better only, so ties go to the stronger regularization seen first
+            if score > best_score:
+                best_score, best_params = score, {'C': float(C), 'penalty': penalty}
+        trace.append((budget.elapsed(), budget.fits, best_score, f"C={C:.3g} ({', '.join(active)})"))
+        if patience is not None:
+            active = [penalty for penalty in active if i - best_steps[penalty] < patience]
+        if not active:
+            break
+        if budget.exhausted() and i < len(Cs) - 1:
+            stopped = f"the budget ran out at C={C:.3g}, {i + 1} of {len(Cs)} values into the path"
+            break
+    estimator = path_model(best_params['penalty'], C=best_params['C'])
+    return _result(estimator.fit(X, y), best_params, best_score, budget, trace, stopped)
+
+
+def successive_halving(estimator, param_space, X, y, resource, min_resource, max_resource=None, n_candidates=27,
+                       eta=3, cv=5, seconds=None, max_fits=None, n_jobs=1, random_state=42, min_candidates=None):
+    """
+    Successive halving over the estimator's defaults and randomly sampled candidates.
+    Args:
+        estimator: Unfitted estimator to tune.
+        param_space (dict): Parameter -> list of values to sample from.
+        X (np.ndarray): Training features.
+        y: Training labels.
+        resource (str): 'n_samples' to grow a (nested, shuffled) training subsample from rung to rung,
+            or an estimator parameter such as 'n_estimators'.
+        min_resource (int): Resource given to every candidate in the first rung; each later rung has eta times more,
+            and the last one max_resource.
+        max_resource (int): Resource of the last rung and of the final refit; all rows for 'n_samples' if None.
+        n_candidates (int): Candidates in the first rung, the estimator's own values for param_space first.
+        eta (int): Factor by which each rung shrinks the candidates and grows the resource.
+        cv (int): Cross-validation folds per evaluation.
+        seconds (float): Wall-clock budget; once spent, the best candidate of the last rung reached wins.
+        max_fits (int): Fit budget, checked the same way.
+        n_jobs (int): Cores to spread each evaluation's folds over.
+        random_state (int): Seed for the candidate sample and the row subsamples.
+        min_candidates (int): Candidates every rung scores before the budget may stop it (all of them if
+            fewer); eta if None, so a rung cut short still compares enough candidates to promote one.
+    Returns:
+        dict: Best estimator (refitted on all of X with max_resource), params, score on the last rung, fits,
+            elapsed seconds, trace of (elapsed, fits, best score in the rung, step) after each rung,
+            whether every rung ran ('complete') and otherwise where the budget stopped it ('stopped').
+    """
+    budget = Budget(seconds, max_fits)
+    X, y = np.asarray(X), np.asarray(y)
+    if max_resource is None:
+        max_resource = len(y)
+    rows = np.random.RandomState(random_state).permutation(len(y))
+    # The defaults compete too, so the search only returns something else if it cross-validates better
+    defaults = {name: value for name, value in estimator.get_params().items() if name in param_space}
+    sampled = [params for params in ParameterSampler(param_space, n_candidates, random_state=random_state)
+               if params != defaults]
+    candidates = [defaults] + sampled[:n_candidates - 1]
+    if min_candidates is None:
+        min_candidates = eta
+    min_resource = min(min_resource, max_resource)
+    n_rungs = 1 + round(math.log(max_resource / min_resource, eta))
+    schedule = [min_resource * eta ** rung for rung in range(n_rungs - 1)] + [max_resource]
+    trace = []
+    stopped = None
+    for rung, resource_value in enumerate(schedule):
+        scored = []
+        for params in candidates:
+            if budget.exhausted() and len(scored) >= min_candidates:
+                stopped = (f"the budget ran out in rung {rung + 1} of {n_rungs} ({resource}={resource_value}) "
+                           f"after {len(scored)} of {len(candidates)} candidates")
+                break
+            model = clone(estimator).set_params(**params)
+            if resource == 'n_samples':
+                Xr, yr = X[rows[:resource_value]], y[rows[:resource_value]]
+            else:
+                model.set_params(**{resource: resource_value})
+                Xr, yr = X, y
+            scored.append((cross_val_score(model, Xr, yr, cv=cv, n_jobs=n_jobs).mean(), params))
+            budget.spend(cv)
+        # Stable sort: ties keep the earlier (sampled or promoted) candidate first
+        scored.sort(key=lambda item: -item[0])
+        best_score, best_params = float(scored[0][0]), scored[0][1]
+        trace.append((budget.elapsed(), budget.fits, best_score, f"{len(scored)} x {resource}={resource_value}"))
+        survivors = math.ceil(len(scored) / eta)
+        if stopped or rung == n_rungs - 1 or survivors == 1:
+            break
+        if budget.exhausted():
+            stopped = f"the budget ran out after rung {rung + 1} of {n_rungs} ({resource}={resource_value})"
+            break
+        # Survivors go in rank order, so a rung cut short by the budget has scored the most promising first
+        candidates = [params for _, params in scored[:survivors]]
+    final = clone(estimator).set_params(**best_params)
+    if resource != 'n_samples':
+        final.set_params(**{resource: max_resource})
+    return _result(final.fit(X, y), best_params, best_score, budget, trace, stopped)
@@ -0,0 +1,140 @@
+"""
+Benchmark budgeted tuning against exhaustive grid search and the untuned models.
+
+    python tuning_bench.py [--data diabetes.csv] [--rows N] [--models lr,rf,svm] [--repeat 3] [--jobs 1]
+
+Each model is prepared the way diabetes_prediction.py prepares it (clean,
+80/20 stratified split, scale) and then fitted three ways: untuned, with
+an exhaustive GridSearchCV over the same search space, and with the budgeted
+search tune_model runs (without a budget, so both searches finish). The
+table reports the median wall time over --repeat runs, the fits, the
+cross-validated and test accuracy of each, and the search's speedup over
+the grid. --rows takes the first N rows of a larger file in the same layout.
+"""
+
+import argparse
+import json
+import sys
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.model_selection import GridSearchCV, cross_val_score, train_test_split
+
+from dataset import DTYPES, clean_data
+from diabetes_prediction import (DATA_PATH, RANDOM_FOREST_SPACE, SVM_SPACE, build_models,
+                                 grid_search_logistic_regression, resolve_jobs, scale_features, tune_model)
+
+MODELS = {'lr': 'Logistic Regression', 'rf': 'Random Forest', 'svm': 'SVM'}
+
+
+def prepare(path, rows=None):
+    """
+    Load, clean, split and scale a dataset as the pipeline does.
+    Args:
+        path (str): CSV in the diabetes.csv layout.
+        rows (int): Read only the first rows rows; all of them if None.
+    Returns:
+        tuple: X_train, X_test (scaled), y_train, y_test.
+    """
+    df = clean_data(pd.read_csv(path, dtype=DTYPES, nrows=rows))
+    X, y = df.drop('Outcome', axis=1), df['Outcome']
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+    X_train, X_test, _ = scale_features(X_train, X_test)
+    return X_train, X_test, y_train, y_test
+
+
+def exhaustive_search(name, X_train, y_train, n_jobs=1):
+    """
+    Grid search over the space the budgeted search samples from, at full resource.
+    Args:
+        name (str): Model name, as in build_models.
+        X_train (np.ndarray): Scaled training features.
+        y_train (pd.Series): Training labels.
+        n_jobs (int): Cores to spread the fits over.
+    Returns:
+        tuple: (fitted GridSearchCV, fits run).
+    """
+    if name == 'Logistic Regression':
+        grid = grid_search_logistic_regression(X_train, y_train, n_jobs=n_jobs)
+    else:
+        space = RANDOM_FOREST_SPACE if name == 'Random Forest' else SVM_SPACE
+        grid = GridSearchCV(clone(build_models()[name]), space, cv=5, scoring='accuracy', n_jobs=resolve_jobs(n_jobs))
+        grid.fit(X_train, y_train)
+    return grid, len(grid.cv_results_['params']) * grid.n_splits_
+
+
+def timed(fn, repeat):
+    """
+    Run fn repeat times.
+    Returns:
+        tuple: (median seconds, the last result).
+    """
+    seconds = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        seconds.append(time.perf_counter() - started)
+    return float(np.median(seconds)), result
+
+
+def bench_model(name, X_train, X_test, y_train, y_test, repeat=3, n_jobs=1):
+    """
+    Time and score one model untuned, by exhaustive grid search and by its budgeted search.
+    Returns:
+        dict: Method -> seconds, fits, cv_accuracy, test_accuracy (and params for the searches).
+    """
+    model = build_models()[name]
+    seconds, fitted = timed(lambda: clone(model).fit(X_train, y_train), repeat)
+    results = {'untuned': {
+        'seconds': seconds, 'fits': 1,
+        'cv_accuracy': float(cross_val_score(clone(model), X_train, y_train, cv=5).mean()),
+        'test_accuracy': float(fitted.score(X_test, y_test)),
+    }}
+    seconds, (grid, fits) = timed(lambda: exhaustive_search(name, X_train, y_train, n_jobs), repeat)
+    results['grid'] = {
+        'seconds': seconds, 'fits': fits, 'cv_accuracy': float(grid.best_score_),
+        'test_accuracy': float(grid.score(X_test, y_test)), 'params': grid.best_params_,
+    }
+    seconds, search = timed(lambda: tune_model(name, X_train, y_train, n_jobs=n_jobs), repeat)
+    results['budgeted'] = {
+        'seconds': seconds, 'fits': search['fits'], 'cv_accuracy': search['score'],
+        'test_accuracy': float(search['estimator'].score(X_test, y_test)), 'params': search['params'],
+    }
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare budgeted tuning with grid search and untuned models")
+    parser.add_argument("--data", default=DATA_PATH, help="CSV in the diabetes.csv layout (default: %(default)s)")
+    parser.add_argument("--rows", type=int, help="use only the first ROWS rows of --data")
+    parser.add_argument("--models", default="lr,rf,svm", help="comma separated: lr, rf, svm (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per method; the median time is reported "
+                                                               "(default: %(default)s)")
+    parser.add_argument("--jobs", type=int, default=1, help="cores for the searches (default: %(default)s)")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    warnings.filterwarnings('ignore')  # convergence warnings from the weakly regularized grid points
+    X_train, X_test, y_train, y_test = prepare(args.data, args.rows)
+    print(f"{len(X_train):,} training rows, {len(X_test):,} test rows", file=sys.stderr)
+    report = {}
+    print(f"{'model':20} {'method':9} {'seconds':>8} {'fits':>5} {'cv acc':>7} {'test acc':>8} {'speedup':>8}")
+    for key in args.models.split(','):
+        name = MODELS[key.strip()]
+        report[name] = results = bench_model(name, X_train, X_test, y_train, y_test, args.repeat, args.jobs)
+        for method, row in results.items():
+            speedup = results['grid']['seconds'] / row['seconds'] if method == 'budgeted' else None
+            print(f"{name:20} {method:9} {row['seconds']:8.3f} {row['fits']:5d} {row['cv_accuracy']:7.4f} "
+                  f"{row['test_accuracy']:8.4f} {f'{speedup:.1f}x' if speedup else '':>8}")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'rows': len(X_train) + len(X_test), 'repeat': args.repeat, 'jobs': args.jobs,
+                       'results': report}, f, indent=2, default=str)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,187 @@
+"""Move closed years out of the hot database into per-year read-only files.
+
+An archive holds one year's transactions with the same ids, its own daily_rollup
+and a full-text index, and is listed in the hot database's partitions table.
+The hot daily_rollup keeps the archived totals, so summaries and charts never
+open an archive; transaction lists ATTACH only the years they reach.
+"""
+import gzip
+import os
+import shutil
+import sqlite3
+import stat
+from datetime import date
+
+from db_handler import archive_file, read_only_uri
+
+
+class ArchiveError(Exception):
+    pass
+
+
+def _archive_name(db, year, compress):
+    stem = os.path.splitext(os.path.basename(db.db_name))[0]
+    directory = os.path.dirname(os.path.abspath(db.db_name))
+    suffix = ".db.gz" if compress else ".db"
+    name, n = f"{stem}-{year}{suffix}", 1
+    # A year archived again (after late entries) gets a new file, so readers never see a half-written one
+    while os.path.exists(os.path.join(directory, name)):
+        name, n = f"{stem}-{year}.{n}{suffix}", n + 1
+    return name
+
+
+def _create_archive_schema(conn):
+    conn.executescript('''
+        CREATE TABLE transactions (
+            id INTEGER PRIMARY KEY,
+            amount REAL NOT NULL,
+            type TEXT NOT NULL,
+            category_id INTEGER,
+            description TEXT,
+            date TEXT NOT NULL
+        );
+        CREATE INDEX idx_transactions_date ON transactions(date);
+        CREATE INDEX idx_transactions_category_date ON transactions(category_id, date);
+        CREATE TABLE daily_rollup (
+            day TEXT NOT NULL,
+            category_id INTEGER NOT NULL,
+            type TEXT NOT NULL,
+            total REAL NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (day, category_id, type)
+        ) WITHOUT ROWID;
+        CREATE VIRTUAL TABLE transactions_fts USING fts5(
+            description, category, tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        );
+    ''')
+
+
+def closed_years(db, before=None):
+    """Years before `before` (default: the current year) that still have rows in the hot table."""
+    before = before or date.today().year
+    cursor = db.conn.execute(
+        "SELECT DISTINCT CAST(substr(date, 1, 4) AS INTEGER) FROM transactions WHERE date < ? ORDER BY 1",
+        (f"{before}-01-01",))
+    return [row[0] for row in cursor.fetchall()]
+
+
+def archive_year(db, year, compress=False):
+    """Move every transaction dated in year into a read-only archive file. Returns the rows moved.
+
+    If the year was archived before, the new file holds the old archive's rows too
+    and replaces it.
+    """
+    first, last = f"{year}-01-01", f"{year}-12-31"
+    previous = db.conn.execute("SELECT path, compressed FROM partitions WHERE year = ?", (year,)).fetchone()
+    name = _archive_name(db, year, compress)
+    path = db.partition_path(name)
+    staging = path[:-3] + ".tmp" if compress else path + ".tmp"
+    if os.path.exists(staging):
+        os.remove(staging)
+    db.detach_archives()
+
+    # 1. Build the archive next to the hot database, from the hot rows plus any earlier archive
+    build = sqlite3.connect(staging)
+    try:
+        _create_archive_schema(build)
+        build.execute("ATTACH DATABASE ? AS hot", (read_only_uri(db.db_name),))
+        with build:
+            build.execute(
+                "INSERT INTO transactions SELECT id, amount, type, category_id, description, date "
+                "FROM hot.transactions WHERE date BETWEEN ? AND ?", (first, last))
+            if previous:
+                build.execute("ATTACH DATABASE ? AS old", (read_only_uri(archive_file(db.partition_path(previous[0]))),))
+                build.execute("INSERT OR IGNORE INTO transactions SELECT * FROM old.transactions")
+        if previous:
+            build.execute("DETACH DATABASE old")
+        with build:
+            build.execute('''
+                INSERT INTO daily_rollup (day, category_id, type, total, count)
+                SELECT date, IFNULL(category_id, 0), type, SUM(amount), COUNT(*)
+                FROM transactions GROUP BY date, IFNULL(category_id, 0), type
+            ''')
+            build.execute('''
+                INSERT INTO transactions_fts (rowid, description, category)
+                SELECT t.id, t.description, c.name FROM transactions t LEFT JOIN hot.categories c ON t.category_id = c.id
+            ''')
+        build.execute("DETACH DATABASE hot")
+        moved, first_day, last_day = build.execute("SELECT COUNT(*), MIN(date), MAX(date) FROM transactions").fetchone()
+        build.execute("PRAGMA optimize")
+    finally:
+        build.close()
+    if not moved:
+        os.remove(staging)
+        return 0
+    if compress:
+        with open(staging, "rb") as f, gzip.open(path, "wb") as out:
+            shutil.copyfileobj(f, out)
+        os.remove(staging)
+    else:
+        os.replace(staging, path)
+    os.chmod(path, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+
+    # 2. Swap the rows out of the hot database in one transaction
+    db.conn.execute("ATTACH DATABASE ? AS staged", (read_only_uri(archive_file(path)),))
+    try:
+        with db.conn:
+            db.conn.execute("DELETE FROM transactions WHERE id IN (SELECT id FROM staged.transactions)")
+            # The delete triggers took these rows out of the rollup; the archive's own totals go back in
+            db.conn.execute("DELETE FROM daily_rollup WHERE day BETWEEN ? AND ?", (first, last))
+            db.conn.execute('''
+                INSERT INTO daily_rollup (day, category_id, type, total, count)
+                SELECT day, category_id, type, total, count FROM staged.daily_rollup WHERE true
+                ON CONFLICT (day, category_id, type)
+                DO UPDATE SET total = total + excluded.total, count = count + excluded.count
+            ''')
+            # Rows dated in this year but added while the archive was built stay hot
+            db.conn.execute('''
+                INSERT INTO daily_rollup (day, category_id, type, total, count)
+                SELECT date, IFNULL(category_id, 0), type, SUM(amount), COUNT(*)
+                FROM transactions WHERE date BETWEEN ? AND ? GROUP BY date, IFNULL(category_id, 0), type
+                ON CONFLICT (day, category_id, type)
+                DO UPDATE SET total = total + excluded.total, count = count + excluded.count
+            ''', (first, last))
+            db.conn.execute(
+                "INSERT OR REPLACE INTO partitions (year, path, first_day, last_day, row_count, compressed) "
+                "VALUES (?, ?, ?, ?, ?, ?)", (year, name, first_day, last_day, moved, int(compress)))
+    finally:
+        db.conn.execute("DETACH DATABASE staged")
+    if previous:
+        _remove(db.partition_path(previous[0]))
+    db.invalidate()
+    return moved
+
+
+def restore_year(db, year):
+    """Move an archived year back into the hot database and delete its archive. Returns the rows restored."""
+    found = db.conn.execute("SELECT path FROM partitions WHERE year = ?", (year,)).fetchone()
+    if not found:
+        raise ArchiveError(f"{year} is not archived")
+    path = db.partition_path(found[0])
+    first, last = f"{year}-01-01", f"{year}-12-31"
+    db.detach_archives()
+    db.conn.execute("ATTACH DATABASE ? AS staged", (read_only_uri(archive_file(path)),))
+    try:
+        with db.conn:
+            cursor = db.conn.execute(
+                "INSERT INTO transactions (id, amount, type, category_id, description, date) "
+                "SELECT id, amount, type, category_id, description, date FROM staged.transactions")
+            restored = cursor.rowcount
+            # The insert triggers counted the rows on top of the archived totals; recount the year
+            db.conn.execute("DELETE FROM daily_rollup WHERE day BETWEEN ? AND ?", (first, last))
+            db.conn.execute('''
+                INSERT INTO daily_rollup (day, category_id, type, total, count)
+                SELECT date, IFNULL(category_id, 0), type, SUM(amount), COUNT(*)
+                FROM transactions WHERE date BETWEEN ? AND ? GROUP BY date, IFNULL(category_id, 0), type
+            ''', (first, last))
+            db.conn.execute("DELETE FROM partitions WHERE year = ?", (year,))
+    finally:
+        db.conn.execute("DETACH DATABASE staged")
+    _remove(path)
+    db.invalidate()
+    return restored
+
+
+def _remove(path):
+    os.chmod(path, stat.S_IRUSR | stat.S_IWUSR)
+    os.remove(path)
@@ -0,0 +1,104 @@
+from datetime import date
+
+# Days of headroom kept past the last transaction, so entries for the coming
+# months land in the tree without resizing it
+HEADROOM_DAYS = 366
+
+
+class FenwickTree:
+    """Prefix sums over a fixed number of slots with O(log n) point updates and queries."""
+
+    def __init__(self, values):
+        # O(n) build: every node passes its partial sum up to its parent once
+        self.size = len(values)
+        self._tree = [0] + list(values)
+        for i in range(1, self.size + 1):
+            parent = i + (i & -i)
+            if parent <= self.size:
+                self._tree[parent] += self._tree[i]
+
+    def add(self, index, delta):
+        if not 0 <= index < self.size:
+            raise IndexError(f"Slot {index} is outside the tree's {self.size} slots")
+        i = index + 1
+        while i <= self.size:
+            self._tree[i] += delta
+            i += i & -i
+
+    def prefix(self, index):
+        """Sum of slots 0..index inclusive; 0 for a negative index."""
+        total = 0
+        i = min(index, self.size - 1) + 1
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def range(self, first, last):
+        return self.prefix(last) - self.prefix(first - 1)
+
+
+class BalanceIndex:
+    """Net balance (income - expense) per calendar day, kept in a Fenwick tree.
+
+    Built once from daily_rollup and then kept current through
+    DatabaseHandler.subscribe(), so "balance as of X" and "net change over
+    A..B" cost O(log n) however many transactions there are.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.rebuild()
+        db.subscribe(self.apply)
+
+    def rebuild(self):
+        daily = self.db.get_daily_net()
+        days = [date.fromisoformat(day) for day, _ in daily]
+        if not days:
+            self._first = date.today().toordinal()
+            self._tree = FenwickTree([0] * HEADROOM_DAYS)
+            return
+        self._first = min(days).toordinal()
+        values = [0] * (max(days).toordinal() - self._first + 1 + HEADROOM_DAYS)
+        for day, net in daily:
+            values[date.fromisoformat(day).toordinal() - self._first] += net
+        self._tree = FenwickTree(values)
+
+    def apply(self, deltas):
+        """DatabaseHandler listener: add each (day, net change) to its slot."""
+        if deltas is None:
+            self.rebuild()
+            return
+        slots = [(self._slot(day), delta) for day, delta in deltas]
+        if any(slot < 0 or slot >= self._tree.size for slot, _ in slots):
+            # Outside the days the tree covers; the write is already committed, so rebuild around it
+            self.rebuild()
+            return
+        for slot, delta in slots:
+            self._tree.add(slot, delta)
+
+    def _slot(self, day):
+        return date.fromisoformat(day).toordinal() - self._first
+
+    def balance_as_of(self, day):
+        """Balance after every transaction dated on or before day."""
+        return self._tree.prefix(self._slot(day))
+
+    def balance_before(self, day):
+        return self._tree.prefix(self._slot(day) - 1)
+
+    def net_between(self, start, end):
+        """Net change over start..end inclusive."""
+        return self.balance_as_of(end) - self.balance_before(start)
+
+    def series(self, days):
+        """Return [(day, balance as of day)] for the given ISO days."""
+        return [(day, round(self.balance_as_of(day), 2)) for day in days]
+
+    def annotate(self, rows):
+        """Append the running balance after each (id, date, ...) transaction row.
+
+        Rows may be in any order; same-day transactions count in id order.
+        """
+        intraday = self.db.get_intraday_balances(row[1] for row in rows)
+        return [row + (round(self.balance_before(row[1]) + intraday.get(row[0], 0), 2),) for row in rows]
@@ -0,0 +1,5 @@
+"""Headless performance benchmarks for the expense tracker. Run from the app directory, e.g.
+
+    python -m benchmarks.storage
+    python -m benchmarks.startup
+"""
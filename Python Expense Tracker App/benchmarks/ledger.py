@@ -0,0 +1,48 @@
+"""Reproducible synthetic ledgers for benchmarking."""
+import os
+import random
+from datetime import date, timedelta
+
+from db_handler import DatabaseHandler
+
+WORDS = ("Uber", "Grocer", "Rent", "Salary", "Coffee", "Fuel", "Cinema", "Pharmacy", "Gym", "Books",
+         "Airline", "Hotel", "Refund", "Utilities", "Insurance", "Dividend")
+
+
+def parse_size(text):
+    """'10k' -> 10000, '1m' -> 1000000, '2500' -> 2500."""
+    text = text.strip().lower()
+    scale = {"k": 10 ** 3, "m": 10 ** 6}.get(text[-1:], 1)
+    return int(float(text.rstrip("km")) * scale)
+
+
+def generate_rows(count, categories=12, years=5, seed=42, end=date(2024, 12, 31)):
+    """Yield count (amount, type, category_id, description, date) tuples spread over the last years."""
+    rng = random.Random(seed)
+    days = years * 365
+    first = end - timedelta(days=days - 1)
+    for _ in range(count):
+        is_income = rng.random() < 0.2
+        yield (
+            round(rng.lognormvariate(4, 1), 2),
+            "Income" if is_income else "Expense",
+            rng.randint(1, categories),
+            f"{rng.choice(WORDS)} {rng.randint(1, 9999)}",
+            (first + timedelta(days=rng.randrange(days))).isoformat(),
+        )
+
+
+def build_ledger(path, count, categories=12, years=5, seed=42, profile="tuned"):
+    """Create (or reuse, if it already holds count rows) a ledger database at path."""
+    if os.path.exists(path):
+        db = DatabaseHandler(path, profile=profile)
+        if db.count_transactions() == count:
+            return db
+        db.close()
+        os.remove(path)
+    db = DatabaseHandler(path, profile=profile)
+    for i in range(1, categories + 1):
+        db.add_category(f"Category {i:02d}")
+    db.add_transactions(generate_rows(count, categories, years, seed), chunk_size=50000)
+    db.conn.execute("ANALYZE")
+    return db
@@ -0,0 +1,118 @@
+"""Measure how long the app takes to start.
+
+    python -m benchmarks.startup [--repeat 5] [--json startup.json]
+
+Two numbers are reported: the import time of main.py (from python -X importtime,
+with the slowest modules) and, when a display is available, the wall-clock time
+from launching the process to the first paint of the window, to the first page
+of table rows and to the first drawn charts.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Run in a child process so every measurement is a cold start
+PAINT_SCRIPT = """
+import json, sys, time
+sys.path.insert(0, sys.argv[2])
+started = float(sys.argv[1])
+marks = {"imported_ms": (time.time() - started) * 1000}
+import tkinter as tk
+from main import ExpenseTrackerApp
+
+root = tk.Tk()
+app = ExpenseTrackerApp(root)
+
+def mark(name):
+    marks.setdefault(name, (time.time() - started) * 1000)
+
+def wrap(obj, attr, name, done=False):
+    fn = getattr(obj, attr)
+    def wrapper(*args, **kwargs):
+        result = fn(*args, **kwargs)
+        root.update_idletasks()
+        mark(name)
+        if done:
+            root.after_idle(root.quit)
+        return result
+    setattr(obj, attr, wrapper)
+
+app.dashboard.tree.bind("<Expose>", lambda e: mark("first_paint_ms"), add="+")
+wrap(app.dashboard, "set_row_source", "table_rows_ms")
+wrap(app.charts, "render_bar_chart", "charts_ms", done=True)
+root.after(15000, root.quit)
+root.mainloop()
+print(json.dumps(marks))
+"""
+
+
+def import_times():
+    """Return (total ms, [(cumulative ms, module)]) for importing main, slowest first."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"],
+                            cwd=APP_DIR, capture_output=True, text=True)
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, self_us, cumulative_us, name = (part.strip() for part in line.replace("import time:", "|").split("|"))
+        modules.append((int(cumulative_us) / 1000, name))
+    total = next(ms for ms, name in modules if name == "main")
+    return total, sorted(modules, reverse=True)
+
+
+def first_paint(workdir):
+    started = time.time()
+    result = subprocess.run([sys.executable, "-c", PAINT_SCRIPT, repr(started), APP_DIR],
+                            cwd=workdir, capture_output=True, text=True)
+    if result.returncode:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "failed")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark app startup")
+    parser.add_argument("--repeat", type=int, default=5, help="cold starts per measurement (default: %(default)s)")
+    parser.add_argument("--top", type=int, default=10, help="slowest imports to list (default: %(default)s)")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    totals = []
+    for _ in range(args.repeat):
+        total, modules = import_times()
+        totals.append(total)
+    report = {"import_main_ms": statistics.median(totals), "slowest_imports": modules[:args.top]}
+    print(f"import main: {report['import_main_ms']:.1f} ms (median of {args.repeat})")
+    for ms, name in modules[:args.top]:
+        print(f"  {ms:8.1f} ms  {name.strip()}")
+
+    # The app creates expense_tracker.db in its working directory, so use a scratch one
+    with tempfile.TemporaryDirectory() as workdir:
+        runs = []
+        try:
+            for _ in range(args.repeat):
+                runs.append(first_paint(workdir))
+        except RuntimeError as e:
+            print(f"time to first paint: skipped ({e})", file=sys.stderr)
+        if runs:
+            report["startup_ms"] = {}
+            for mark in ("imported_ms", "first_paint_ms", "table_rows_ms", "charts_ms"):
+                samples = [run[mark] for run in runs if mark in run]
+                if samples:
+                    report["startup_ms"][mark] = statistics.median(samples)
+                    print(f"{mark[:-3]:>16}: {statistics.median(samples):8.1f} ms")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
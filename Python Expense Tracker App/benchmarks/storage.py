@@ -0,0 +1,111 @@
+"""Compare the legacy and tuned storage profiles.
+
+Measures single-row inserts (one commit each), chunked bulk inserts, filtered
+reads, and reads from a ReaderPool while a writer keeps committing.
+
+    python -m benchmarks.storage [--rows 20000] [--json storage.json]
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks.ledger import generate_rows
+from db_handler import DatabaseHandler, ReaderPool, STORAGE_PROFILES
+
+
+def run_profile(profile, rows, single_rows, seconds, workdir):
+    path = os.path.join(workdir, f"{profile}.db")
+    db = DatabaseHandler(path, profile=profile)
+    for i in range(10):
+        db.add_category(f"Category {i}")
+    result = {"profile": profile}
+
+    started = time.perf_counter()
+    for row in generate_rows(single_rows, 10, seed=1):
+        db.add_transaction(*row)
+    result["single_insert_rows_per_s"] = single_rows / (time.perf_counter() - started)
+
+    started = time.perf_counter()
+    db.add_transactions(generate_rows(rows, 10))
+    result["bulk_insert_rows_per_s"] = rows / (time.perf_counter() - started)
+
+    started = time.perf_counter()
+    queries = 0
+    while time.perf_counter() - started < seconds:
+        db.get_transactions_page(category_id=queries % 10 + 1, start_date="2021-01-01", end_date="2022-12-31")
+        db.get_summary(start_date="2021-01-01")
+        queries += 1
+    result["read_queries_per_s"] = queries / (time.perf_counter() - started)
+
+    # Concurrent readers against a committing writer
+    readers = ReaderPool(path, size=3, profile=profile)
+    stop = threading.Event()
+    counts = {"reads": 0, "locked": 0}
+
+    def read_loop():
+        while not stop.is_set():
+            try:
+                with readers.acquire() as reader:
+                    reader.get_summary(start_date="2020-01-01")
+                    reader.count_transactions(category_id=3)
+                counts["reads"] += 1
+            except sqlite3.OperationalError as e:
+                if "locked" not in str(e):
+                    raise
+                counts["locked"] += 1
+
+    threads = [threading.Thread(target=read_loop) for _ in range(3)]
+    for t in threads:
+        t.start()
+    started = time.perf_counter()
+    writes = 0
+    writer_locked = 0
+    rows_iter = generate_rows(10 ** 9, 10, seed=3)
+    while time.perf_counter() - started < seconds:
+        try:
+            db.add_transaction(*next(rows_iter))
+            writes += 1
+        except sqlite3.OperationalError as e:
+            if "locked" not in str(e):
+                raise
+            writer_locked += 1
+    elapsed = time.perf_counter() - started
+    stop.set()
+    for t in threads:
+        t.join()
+    readers.close()
+    db.close()
+    result["concurrent_reads_per_s"] = counts["reads"] / elapsed
+    result["concurrent_writes_per_s"] = writes / elapsed
+    result["locked_errors"] = counts["locked"] + writer_locked
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark SQLite storage profiles")
+    parser.add_argument("--rows", type=int, default=20000, help="rows for the bulk insert (default: %(default)s)")
+    parser.add_argument("--single-rows", type=int, default=500, help="rows inserted one commit at a time (default: %(default)s)")
+    parser.add_argument("--seconds", type=float, default=2.0, help="duration of each timed loop (default: %(default)s)")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        results = [run_profile(p, args.rows, args.single_rows, args.seconds, workdir) for p in STORAGE_PROFILES]
+
+    metrics = [k for k in results[0] if k != "profile"]
+    print(f"{'metric':28}" + "".join(f"{r['profile']:>14}" for r in results))
+    for metric in metrics:
+        print(f"{metric:28}" + "".join(f"{r[metric]:>14.1f}" for r in results))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
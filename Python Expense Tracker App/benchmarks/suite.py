@@ -0,0 +1,161 @@
+"""Time the ledger queries at several sizes and write a JSON report.
+
+    python -m benchmarks.suite --sizes 10k,1m --json report.json [--baseline old.json]
+
+Ledgers are cached in --workdir, so later runs (e.g. on another commit) reuse them.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+import columnar
+from benchmarks.ledger import build_ledger, parse_size
+from dashboard_service import DashboardService
+from exporter import export_transactions
+
+
+def percentiles(samples):
+    ordered = sorted(samples)
+
+    def pick(q):
+        return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+    return {
+        "n": len(ordered),
+        "min_ms": ordered[0] * 1000,
+        "p50_ms": pick(0.50) * 1000,
+        "p90_ms": pick(0.90) * 1000,
+        "p99_ms": pick(0.99) * 1000,
+        "max_ms": ordered[-1] * 1000,
+        "mean_ms": sum(ordered) / len(ordered) * 1000,
+    }
+
+
+def random_filter(rng, categories, years, end=date(2024, 12, 31)):
+    """A dashboard-like filter: sometimes a category, usually a range of a few weeks to a year."""
+    category_id = rng.randint(1, categories) if rng.random() < 0.5 else None
+    span = rng.choice((30, 90, 365))
+    start = end - timedelta(days=rng.randrange(years * 365 - span) + span)
+    return category_id, start.isoformat(), (start + timedelta(days=span)).isoformat()
+
+
+def time_op(fn, filters):
+    samples = []
+    for args in filters:
+        started = time.perf_counter()
+        fn(*args)
+        samples.append(time.perf_counter() - started)
+    return percentiles(samples)
+
+
+def bench_ledger(db, args, workdir):
+    rng = random.Random(args.seed)
+    filters = [random_filter(rng, args.categories, args.years) for _ in range(args.repeat)]
+    uncached = lambda *key: DashboardService(db).get(*key)
+    results = {
+        "get_transactions": time_op(db.get_transactions, filters),
+        "get_transactions_page": time_op(db.get_transactions_page, filters),
+        "count_transactions": time_op(db.count_transactions, filters),
+        "get_summary": time_op(db.get_summary, filters),
+        # The per-chart queries, next to the single pass dashboard_refresh makes
+        "get_category_totals": time_op(db.get_category_totals, filters),
+        "get_daily_totals": time_op(db.get_daily_totals, filters),
+        "dashboard_refresh": time_op(uncached, filters),
+    }
+    export_path = os.path.join(workdir, "export.csv")
+    results["export_csv"] = time_op(lambda *key: export_transactions(db, export_path, *key), filters[:max(1, args.repeat // 10)])
+    os.remove(export_path)
+
+    if columnar.load_numpy():
+        # The same questions answered by the in-memory engine (EXPENSE_TRACKER_ENGINE=numpy)
+        started = time.perf_counter()
+        ledger = columnar.ColumnarLedger.load(db)
+        results["columnar_load"] = percentiles([time.perf_counter() - started])
+        ledger.follow(db)
+        results["columnar_count"] = time_op(ledger.count_transactions, filters)
+        results["columnar_page"] = time_op(ledger.get_transactions_page, filters)
+        results["columnar_dashboard"] = time_op(ledger.get_dashboard, filters)
+        ledger.close()
+
+    # Writes last, and rolled back afterwards, so the cached ledger stays reusable
+    rows = [(12.5, "Expense", 1 + i % args.categories, "bench", f) for i, (_, f, _) in enumerate(filters)]
+    max_id = db.conn.execute("SELECT IFNULL(MAX(id), 0) FROM transactions").fetchone()[0]
+    results["add_transaction"] = time_op(db.add_transaction, rows)
+    with db.conn:
+        db.conn.execute("DELETE FROM transactions WHERE id > ?", (max_id,))
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report, baseline):
+    print(f"\n{'size':>8} {'operation':24} {'base p50':>10} {'p50':>10} {'change':>8}")
+    for size, ops in report["results"].items():
+        for op, stats in ops.items():
+            base = baseline.get("results", {}).get(size, {}).get(op)
+            if base:
+                change = (stats["p50_ms"] / base["p50_ms"] - 1) * 100 if base["p50_ms"] else 0
+                print(f"{size:>8} {op:24} {base['p50_ms']:10.3f} {stats['p50_ms']:10.3f} {change:+7.1f}%")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark ledger queries on synthetic data")
+    parser.add_argument("--sizes", default="10k", help="comma separated ledger sizes, e.g. 10k,1m,10m (default: %(default)s)")
+    parser.add_argument("--categories", type=int, default=12)
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=50, help="filters timed per operation (default: %(default)s)")
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "expense-tracker-bench"))
+    parser.add_argument("--json", help="write the report to this file")
+    parser.add_argument("--baseline", help="earlier report to compare p50 latencies against")
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.workdir, exist_ok=True)
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "params": {k: getattr(args, k) for k in ("categories", "years", "seed", "repeat")},
+        },
+        "results": {},
+    }
+    for size_text in args.sizes.split(","):
+        size = parse_size(size_text)
+        path = os.path.join(args.workdir, f"ledger-{size}-{args.categories}c-{args.years}y-{args.seed}.db")
+        started = time.perf_counter()
+        db = build_ledger(path, size, args.categories, args.years, args.seed)
+        print(f"ledger {size_text}: ready in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+        results = bench_ledger(db, args, args.workdir)
+        db.close()
+        report["results"][size_text] = results
+        print(f"\n{size_text} rows{'':12} {'p50 ms':>10} {'p90 ms':>10} {'p99 ms':>10}")
+        for op, stats in results.items():
+            print(f"  {op:24} {stats['p50_ms']:10.3f} {stats['p90_ms']:10.3f} {stats['p99_ms']:10.3f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(report, json.load(f))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
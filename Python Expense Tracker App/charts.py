@@ -1,44 +1,222 @@
-try:
-    import matplotlib.pyplot as plt  # type: ignore
-    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg  # type: ignore
-except ImportError:
-    plt = None
-    FigureCanvasTkAgg = None
-    print("Matplotlib is required for chart rendering. Please install it with 'pip install matplotlib'.")
+from collections import OrderedDict
+from datetime import date, timedelta
+
+from instrumentation import traced
+
+# matplotlib is imported on first use (see load_matplotlib), not at startup
+Figure = None
+FigureCanvasTkAgg = None
+_matplotlib_checked = False
+
+MAX_TICK_LABELS = 12
+
+
+@traced("load_matplotlib")
+def load_matplotlib():
+    """Import the matplotlib classes the charts need, once. Returns False if matplotlib is missing."""
+    global Figure, FigureCanvasTkAgg, _matplotlib_checked
+    if not _matplotlib_checked:
+        _matplotlib_checked = True
+        try:
+            from matplotlib.figure import Figure  # type: ignore
+            from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg  # type: ignore
+        except ImportError:
+            print("Matplotlib is required for chart rendering. Please install it with 'pip install matplotlib'.")
+    return Figure is not None and FigureCanvasTkAgg is not None
+
+
+def choose_bucket(first_day, last_day):
+    """Pick a bar width so a range of any length draws at most ~70 bars."""
+    span = (date.fromisoformat(last_day) - date.fromisoformat(first_day)).days
+    if span <= 62:
+        return "day"
+    if span <= 366:
+        return "week"
+    if span <= 6 * 366:
+        return "month"
+    return "year"
+
+
+def bucket_label(day, bucket):
+    if bucket == "day":
+        return day
+    if bucket == "week":
+        d = date.fromisoformat(day)
+        return (d - timedelta(days=d.weekday())).isoformat()
+    if bucket == "month":
+        return day[:7]
+    return day[:4]
+
+
+def bucket_series(data):
+    """Sum (day, income, expense) rows, sorted by day, into day/week/month/year buckets.
+
+    Returns (bucket, [(label, income, expense)]).
+    """
+    if not data:
+        return "day", []
+    bucket = choose_bucket(data[0][0], data[-1][0])
+    totals = OrderedDict()
+    for day, income, expense in data:
+        label = bucket_label(day, bucket)
+        inc, exp = totals.get(label, (0, 0))
+        totals[label] = (inc + (income or 0), exp + (expense or 0))
+    return bucket, [(label, inc, exp) for label, (inc, exp) in totals.items()]
+
 
 class ChartRenderer:
+    """Owns one figure and canvas per chart and redraws them in place on every refresh.
+
+    Figures are created through matplotlib.figure.Figure rather than pyplot, so
+    nothing accumulates in pyplot's global figure registry. matplotlib itself is
+    only imported by the first render.
+    """
+
+    def __init__(self, frame):
+        self.frame = frame
+        self._pie = None
+        self._bar = None
+        self._bars = None  # (income BarContainer, expense BarContainer)
+        self._bar_range = None  # (first day, last day) of the drawn series
+        self._bar_bucket = None
+        self._bar_index = {}  # bucket label -> bar position
+        self._bar_values = []  # [income, expense] per bar
+        self._balance = None
+        self._balance_line = None
+
+    def _chart(self, figsize):
+        fig = Figure(figsize=figsize)
+        ax = fig.add_subplot()
+        canvas = FigureCanvasTkAgg(fig, master=self.frame)
+        return fig, ax, canvas
+
     @staticmethod
-    def render_pie_chart(frame, data, title="Spending by Category"):
-        if plt is None or FigureCanvasTkAgg is None:
+    def _show(canvas, visible):
+        widget = canvas.get_tk_widget()
+        if visible and not widget.winfo_manager():
+            widget.pack(fill='both', expand=True)
+        elif not visible and widget.winfo_manager():
+            widget.pack_forget()
+
+    @traced("render_pie_chart")
+    def render_pie_chart(self, data, title="Spending by Category"):
+        if not load_matplotlib():
             return None
+        if self._pie is None:
+            self._pie = self._chart((4, 4))
+        fig, ax, canvas = self._pie
         # data: list of (category, amount)
+        self._show(canvas, bool(data))
+        if not data:
+            return canvas
         categories = [item[0] for item in data]
         amounts = [item[1] for item in data]
-        fig, ax = plt.subplots(figsize=(4, 4))
+        # Wedges change in number and angle every time, so they are rebuilt on the same axes
+        ax.clear()
         ax.pie(amounts, labels=categories, autopct='%1.1f%%', startangle=140)
         ax.set_title(title)
-        canvas = FigureCanvasTkAgg(fig, master=frame)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill='both', expand=True)
+        canvas.draw_idle()
         return canvas
 
-    @staticmethod
-    def render_bar_chart(frame, data, title="Income and Expense Over Time"):
-        if plt is None or FigureCanvasTkAgg is None:
+    @traced("render_bar_chart")
+    def render_bar_chart(self, data, title="Income and Expense Over Time"):
+        if not load_matplotlib():
             return None
-        # data: list of (date, income, expense)
-        dates = [item[0] for item in data]
-        incomes = [item[1] for item in data]
-        expenses = [item[2] for item in data]
-        fig, ax = plt.subplots(figsize=(6, 4))
-        ax.bar(dates, incomes, label='Income', color='green')
-        ax.bar(dates, expenses, label='Expense', color='red', bottom=incomes)
+        if self._bar is None:
+            self._bar = self._chart((6, 4))
+        fig, ax, canvas = self._bar
+        # data: list of (date, income, expense), binned so the bar count stays bounded
+        self._show(canvas, bool(data))
+        if not data:
+            return canvas
+        bucket, series = bucket_series(data)
+        labels = [item[0] for item in series]
+        incomes = [item[1] for item in series]
+        expenses = [item[2] for item in series]
+        if self._bars is not None and len(self._bars[0]) == len(series):
+            for rect, income in zip(self._bars[0], incomes):
+                rect.set_height(income)
+            for rect, income, expense in zip(self._bars[1], incomes, expenses):
+                rect.set_y(income)
+                rect.set_height(expense)
+        else:
+            if self._bars is not None:
+                for container in self._bars:
+                    container.remove()
+            positions = range(len(series))
+            self._bars = (
+                ax.bar(positions, incomes, label='Income', color='green'),
+                ax.bar(positions, expenses, label='Expense', color='red', bottom=incomes),
+            )
+            if ax.get_legend() is None:
+                ax.legend()
+        step = max(1, len(labels) // MAX_TICK_LABELS)
+        ax.set_xticks(range(0, len(labels), step))
+        ax.set_xticklabels(labels[::step], rotation=45, ha='right')
         ax.set_title(title)
-        ax.set_xlabel('Date')
+        ax.set_xlabel(bucket.capitalize())
         ax.set_ylabel('Amount')
-        ax.legend()
-        plt.xticks(rotation=45)
-        canvas = FigureCanvasTkAgg(fig, master=frame)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill='both', expand=True)
-        return canvas 
\ No newline at end of file
+        ax.relim()
+        ax.autoscale_view()
+        fig.tight_layout()
+        canvas.draw_idle()
+        self._bar_range = (data[0][0], data[-1][0])
+        self._bar_bucket = bucket
+        self._bar_index = {label: position for position, label in enumerate(labels)}
+        self._bar_values = [[income, expense] for income, expense in zip(incomes, expenses)]
+        return canvas
+
+    @traced("update_bar_chart")
+    def update_bar_chart(self, data, deltas):
+        """Add (day, income, expense) deltas to the bars they fall in, leaving the rest alone.
+
+        data is the full, already updated series. Returns False when the change
+        needs a full render_bar_chart instead (the range or the set of bars changed).
+        """
+        if self._bars is None or not data or self._bar_range != (data[0][0], data[-1][0]):
+            return False
+        positions = [self._bar_index.get(bucket_label(day, self._bar_bucket)) for day, _, _ in deltas]
+        if None in positions:
+            return False
+        for position, (_, income, expense) in zip(positions, deltas):
+            values = self._bar_values[position]
+            values[0] += income
+            values[1] += expense
+            self._bars[0][position].set_height(values[0])
+            self._bars[1][position].set_y(values[0])
+            self._bars[1][position].set_height(values[1])
+        fig, ax, canvas = self._bar
+        ax.relim()
+        ax.autoscale_view()
+        canvas.draw_idle()
+        return True
+
+    @traced("render_balance_chart")
+    def render_balance_chart(self, data, title="Balance Over Time"):
+        if not load_matplotlib():
+            return None
+        if self._balance is None:
+            self._balance = self._chart((6, 3))
+        fig, ax, canvas = self._balance
+        # data: list of (date, running balance)
+        self._show(canvas, bool(data))
+        if not data:
+            return canvas
+        labels = [item[0] for item in data]
+        balances = [item[1] for item in data]
+        positions = range(len(data))
+        if self._balance_line is None:
+            self._balance_line, = ax.plot(positions, balances, color='steelblue')
+            ax.axhline(0, color='grey', linewidth=0.8)
+        else:
+            self._balance_line.set_data(positions, balances)
+        step = max(1, len(labels) // MAX_TICK_LABELS)
+        ax.set_xticks(range(0, len(labels), step))
+        ax.set_xticklabels(labels[::step], rotation=45, ha='right')
+        ax.set_title(title)
+        ax.set_ylabel('Balance')
+        ax.relim()
+        ax.autoscale_view()
+        fig.tight_layout()
+        canvas.draw_idle()
+        return canvas
@@ -0,0 +1,259 @@
+"""In-memory columnar copy of the ledger, filtered and aggregated with NumPy.
+
+Every transaction (archived years included) is held as one element of a few
+compact arrays: int32 day numbers, a bool type column, int64 amounts in cents,
+int16 category codes and int32 codes into an interned description table.
+A dashboard filter is then a couple of vectorized comparisons, and the pie and
+bar series are np.bincount calls over the matching rows, with no SQL at all.
+
+The ledger follows the DatabaseHandler it was attached to: every write reports
+the ids it touched (DatabaseHandler.subscribe_rows) and those rows are re-read
+and patched in place. A change that cannot be described by ids marks the copy
+stale, and the caller loads a fresh one. NumPy is optional and only imported
+by load_numpy(), which must succeed before a ledger is built.
+"""
+import os
+
+from dashboard_service import DashboardData, _pie_rows
+
+np = None
+_numpy_checked = False
+
+# Compact once this share of the slots holds deleted rows
+MAX_DEAD_SHARE = 0.25
+
+
+def load_numpy():
+    """Import NumPy, once. Returns False if it is not installed."""
+    global np, _numpy_checked
+    if not _numpy_checked:
+        _numpy_checked = True
+        try:
+            import numpy as np  # type: ignore
+        except ImportError:
+            pass
+    return np is not None
+
+
+def requested(environ=os.environ):
+    """Whether EXPENSE_TRACKER_ENGINE asks for the in-memory engine."""
+    return environ.get("EXPENSE_TRACKER_ENGINE") == "numpy"
+
+
+def day_number(day):
+    """Days since 1970-01-01 for an ISO date."""
+    return int(np.datetime64(day, "D").astype(np.int64))
+
+
+def _intern(table, values, interned=None):
+    """Codes for values, adding unseen ones to table (value -> code) and to the interned list if given."""
+    codes = []
+    for value in values:
+        code = table.get(value)
+        if code is None:
+            code = table[value] = len(table)
+            if interned is not None:
+                interned.append(value)
+        codes.append(code)
+    return codes
+
+
+class ColumnarLedger:
+    def __init__(self):
+        self.db = None
+        self.stale = False
+        self.size = 0  # slots in use, deleted rows included
+        self._dead = 0
+        self._category_codes = {}  # category id (0 for none) -> code
+        self._description_codes = {}  # description -> code
+        self._descriptions = []
+        self._columns = {
+            "id": np.zeros(0, np.int64),
+            "day": np.zeros(0, np.int32),
+            "income": np.zeros(0, np.bool_),
+            "cents": np.zeros(0, np.int64),
+            "category": np.zeros(0, np.int16),
+            "description": np.zeros(0, np.int32),
+            # (day, id) as one int64, the order rows are listed in
+            "key": np.zeros(0, np.int64),
+            "live": np.zeros(0, np.bool_),
+        }
+        self._max_id = 0
+
+    @classmethod
+    def load(cls, db, batch_size=100000):
+        """Read every transaction into a new ledger. Only reads, so it can run on a ReaderPool connection."""
+        ledger = cls()
+        for rows in db.iter_transaction_rows(batch_size):
+            ledger._append(rows)
+        return ledger
+
+    def follow(self, db):
+        """Keep this ledger in step with writes made through db from now on.
+
+        db must not have been written to since load() read the rows.
+        """
+        self.db = db
+        db.subscribe_rows(self.apply)
+
+    def close(self):
+        if self.db is not None:
+            self.db.row_listeners.remove(self.apply)
+            self.db = None
+
+    def apply(self, ids):
+        """DatabaseHandler row listener: re-read the rows in ids, dropping those no longer there."""
+        if ids is None:
+            self.stale = True
+        if self.stale or not ids:
+            return
+        ids = list(ids)
+        if min(ids) > self._max_id:
+            self._append(self.db.get_transaction_rows(ids))  # new rows only, the common case
+            return
+        rows = self.db.get_transaction_rows(ids)
+        n = self.size
+        positions = np.flatnonzero(np.isin(self._columns["id"][:n], ids) & self._columns["live"][:n])
+        found = {row[0]: row for row in rows}
+        current = self._columns["id"][positions].tolist()
+        gone = [position for position, t_id in zip(positions, current) if t_id not in found]
+        self._columns["live"][gone] = False
+        self._dead += len(gone)
+        changed = [(position, found.pop(t_id)) for position, t_id in zip(positions, current) if t_id in found]
+        if changed:
+            self._write(np.array([position for position, _ in changed]), [row for _, row in changed])
+        if found:
+            self._append(list(found.values()))  # e.g. rows restored by undo
+        if self._dead > MAX_DEAD_SHARE * self.size:
+            self._compact()
+
+    def _encode(self, rows):
+        ids, days, types, categories, descriptions, amounts = zip(*rows)
+        ids = np.array(ids, np.int64)
+        days = np.array(days, "datetime64[D]").astype(np.int32)
+        return {
+            "id": ids,
+            "day": days,
+            "income": np.array([t_type == "Income" for t_type in types], np.bool_),
+            "cents": np.rint(np.array(amounts, np.float64) * 100).astype(np.int64),
+            "category": np.array(_intern(self._category_codes, [c or 0 for c in categories]), np.int16),
+            "description": np.array(_intern(self._description_codes, descriptions, self._descriptions), np.int32),
+            "key": (days.astype(np.int64) << 32) + ids,
+            "live": np.ones(len(rows), np.bool_),
+        }
+
+    def _write(self, positions, rows):
+        for name, values in self._encode(rows).items():
+            self._columns[name][positions] = values
+
+    def _append(self, rows):
+        if not rows:
+            return
+        needed = self.size + len(rows)
+        capacity = len(self._columns["id"])
+        if needed > capacity:
+            # Grow geometrically, so a run of single-row appends copies the columns O(log n) times
+            capacity = max(needed, capacity * 2, 1024)
+            for name, column in self._columns.items():
+                grown = np.zeros(capacity, column.dtype)
+                grown[:self.size] = column[:self.size]
+                self._columns[name] = grown
+        self._write(np.arange(self.size, needed), rows)
+        self.size = needed
+        self._max_id = max(self._max_id, max(row[0] for row in rows))
+
+    def _compact(self):
+        live = self._columns["live"][:self.size]
+        for name, column in self._columns.items():
+            self._columns[name] = column[:self.size][live]
+        self.size = len(self._columns["id"])
+        self._dead = 0
+
+    # Queries, mirroring DatabaseHandler and DashboardService
+    def _mask(self, category_id=None, start_date=None, end_date=None):
+        """Rows matching the filter as a bool array, or None for every live row."""
+        n = self.size
+        if not (category_id or start_date or end_date or self._dead):
+            return None
+        mask = self._columns["live"][:n].copy()
+        if category_id:
+            code = self._category_codes.get(category_id)
+            if code is None:
+                return np.zeros(n, np.bool_)
+            mask &= self._columns["category"][:n] == code
+        if start_date:
+            mask &= self._columns["day"][:n] >= day_number(start_date)
+        if end_date:
+            mask &= self._columns["day"][:n] <= day_number(end_date)
+        return mask
+
+    def _select(self, mask, *names):
+        columns = [self._columns[name][:self.size] for name in names]
+        return columns if mask is None else [column[mask] for column in columns]
+
+    def count_transactions(self, category_id=None, start_date=None, end_date=None):
+        mask = self._mask(category_id, start_date, end_date)
+        return self.size if mask is None else int(np.count_nonzero(mask))
+
+    def get_transactions_page(self, category_id=None, start_date=None, end_date=None, after=None, limit=200):
+        """Same rows and order as DatabaseHandler.get_transactions_page."""
+        mask = self._mask(category_id, start_date, end_date)
+        keys = self._columns["key"][:self.size]
+        if after:
+            before = keys < (day_number(after[0]) << 32) + after[1]
+            mask = before if mask is None else mask & before
+        if mask is None:
+            positions, candidates = None, keys
+        else:
+            positions = np.flatnonzero(mask)
+            candidates = keys[positions]
+        if len(candidates) > limit:
+            # Only the newest limit rows need sorting
+            top = np.argpartition(candidates, len(candidates) - limit)[-limit:]
+        else:
+            top = np.arange(len(candidates))
+        top = top[np.argsort(candidates[top])[::-1]]
+        positions = top if positions is None else positions[top]
+        names = self._category_names()
+        columns = self._columns
+        days = np.datetime_as_string(columns["day"][positions].astype("datetime64[D]")).tolist()
+        return [
+            (t_id, day, "Income" if income else "Expense", names[category], self._descriptions[description], cents / 100)
+            for t_id, day, income, category, description, cents in zip(
+                columns["id"][positions].tolist(), days, columns["income"][positions].tolist(),
+                columns["category"][positions].tolist(), columns["description"][positions].tolist(),
+                columns["cents"][positions].tolist())
+        ]
+
+    def get_dashboard(self, category_id=None, start_date=None, end_date=None):
+        """The DashboardData compute_dashboard() would give for the filter, from bincounts over the columns."""
+        mask = self._mask(category_id, start_date, end_date)
+        days, income, cents, categories = self._select(mask, "day", "income", "cents", "category")
+        if not len(days):
+            return DashboardData({"Income": 0, "Expense": 0}, [], [])
+        # One bincount per breakdown: slot 2k holds the expenses of day (or category) k, slot 2k+1 its income
+        first = int(days.min())
+        slots = (days - first) * 2 + income
+        length = 2 * (int(days.max()) - first + 1)
+        by_day = np.bincount(slots, weights=cents, minlength=length).reshape(-1, 2) / 100
+        active = np.flatnonzero(np.bincount(slots, minlength=length).reshape(-1, 2).any(axis=1))
+        labels = np.datetime_as_string((active + first).astype("datetime64[D]")).tolist()
+        bar = list(zip(labels, by_day[active, 1].tolist(), by_day[active, 0].tolist()))
+
+        slots = categories.astype(np.int32) * 2 + income
+        length = 2 * len(self._category_codes)
+        spent = np.bincount(slots, weights=cents, minlength=length)[0::2] / 100
+        names = self._category_names()
+        pie = {}
+        for code in np.flatnonzero(np.bincount(slots, minlength=length)[0::2]).tolist():
+            pie[names[code]] = pie.get(names[code], 0) + spent[code]
+        summary = {"Income": float(by_day[:, 1].sum()), "Expense": float(by_day[:, 0].sum())}
+        return DashboardData(summary, _pie_rows(pie), bar)
+
+    def _category_names(self):
+        """Category name per code; None for uncategorized rows, as the SQL LEFT JOIN gives."""
+        names = dict(self.db.get_categories())
+        by_code = [None] * len(self._category_codes)
+        for category_id, code in self._category_codes.items():
+            by_code[code] = names.get(category_id)
+        return by_code
@@ -0,0 +1,108 @@
+from collections import OrderedDict, namedtuple
+
+from db_handler import normalize_date
+
+# summary: {"Income": x, "Expense": y}; pie: [(category, expense)]; bar: [(day, income, expense)]
+DashboardData = namedtuple("DashboardData", ["summary", "pie", "bar"])
+
+
+def compute_dashboard(rollup_rows):
+    """Derive summary, pie and bar series from one pass over get_rollup_rows() output."""
+    summary = {"Income": 0, "Expense": 0}
+    pie = {}
+    bar = OrderedDict()
+    for day, category, t_type, total in rollup_rows:
+        summary[t_type] += total
+        income, expense = bar.get(day, (0, 0))
+        if t_type == "Income":
+            bar[day] = (income + total, expense)
+        else:
+            bar[day] = (income, expense + total)
+            pie[category] = pie.get(category, 0) + total
+    bar_rows = [(day, income, expense) for day, (income, expense) in bar.items()]
+    return DashboardData(summary, _pie_rows(pie), bar_rows)
+
+
+def _pie_rows(pie):
+    # Same order as GROUP BY name: uncategorized first, then alphabetical
+    return sorted(pie.items(), key=lambda item: (item[0] is not None, item[0] or ""))
+
+
+def matches_filter(key, category_id, day):
+    """Whether a transaction in category_id on day falls inside a cache_key() filter."""
+    filter_category, start_date, end_date = key
+    return ((filter_category is None or filter_category == category_id)
+            and (start_date is None or day >= start_date)
+            and (end_date is None or day <= end_date))
+
+
+def apply_transactions(data, rows):
+    """Return data with newly added (id, date, type, category, description, amount) rows folded in.
+
+    Gives the same result as recomputing from the rollup, without reading it again.
+    """
+    summary = dict(data.summary)
+    pie = dict(data.pie)
+    bar = {day: (income, expense) for day, income, expense in data.bar}
+    for _, day, t_type, category, _, amount in rows:
+        summary[t_type] += amount
+        income, expense = bar.get(day, (0, 0))
+        if t_type == "Income":
+            bar[day] = (income + amount, expense)
+        else:
+            bar[day] = (income, expense + amount)
+            pie[category] = pie.get(category, 0) + amount
+    bar_rows = [(day, income, expense) for day, (income, expense) in sorted(bar.items())]
+    return DashboardData(summary, _pie_rows(pie), bar_rows)
+
+
+class DashboardService:
+    """Serves dashboard aggregates, caching them per filter until the database is written to."""
+
+    def __init__(self, db, max_entries=32):
+        self.db = db
+        self.max_entries = max_entries
+        self._cache = OrderedDict()
+        self._generation = db.generation
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def cache_key(category_id, start_date, end_date):
+        return (
+            category_id or None,
+            normalize_date(start_date) if start_date else None,
+            normalize_date(end_date) if end_date else None,
+        )
+
+    def get(self, category_id=None, start_date=None, end_date=None):
+        key = self.cache_key(category_id, start_date, end_date)
+        data = self.lookup(key)
+        if data is None:
+            data = compute_dashboard(self.db.get_rollup_rows(*key))
+            self.store(key, data)
+        return data
+
+    def lookup(self, key):
+        """Return the cached DashboardData for a cache_key(), or None."""
+        if self._generation != self.db.generation:
+            self._cache.clear()
+            self._generation = self.db.generation
+        if key in self._cache:
+            self.hits += 1
+            self._cache.move_to_end(key)
+            return self._cache[key]
+        self.misses += 1
+        return None
+
+    def store(self, key, data, generation=None):
+        """Cache data computed elsewhere (e.g. on a worker connection) as of a write generation."""
+        if generation is not None and generation != self.db.generation:
+            return  # the database changed while it was being computed
+        if self._generation != self.db.generation:
+            self._cache.clear()
+            self._generation = self.db.generation
+        self._cache[key] = data
+        self._cache.move_to_end(key)
+        if len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
@@ -1,10 +1,198 @@
+import gzip
+import heapq
+import json
+import os
+import queue
+import re
+import shutil
 import sqlite3
-from datetime import datetime
+import tempfile
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import date as Date, datetime
+from itertools import islice
+
+from instrumentation import TracedConnection, tracer
+
+# Bumped whenever a migration is appended to DatabaseHandler.MIGRATIONS
+SCHEMA_VERSION = 5
+
+INSERT_TRANSACTION = '''
+    INSERT INTO transactions (amount, type, category_id, description, date)
+    VALUES (?, ?, ?, ?, ?)
+'''
+INSERT_IMPORTED = '''
+    INSERT INTO transactions (amount, type, category_id, description, date, import_batch)
+    VALUES (?, ?, ?, ?, ?, ?)
+'''
+TRANSACTION_COLUMNS = "id, amount, type, category_id, description, date, import_batch"
+# Columns update_transactions() may set
+EDITABLE_COLUMNS = ("amount", "type", "category_id", "description", "date")
+# Bulk operations kept in the undo journal
+UNDO_HISTORY = 20
+
+
+# Connection pragmas. "tuned" uses WAL so readers never block on (or block) the
+# writer; "legacy" keeps SQLite's defaults (rollback journal, synchronous=FULL).
+STORAGE_PROFILES = {
+    "legacy": {
+        "cached_statements": 128,
+        "pragmas": {},
+    },
+    "tuned": {
+        "cached_statements": 512,
+        "pragmas": {
+            "journal_mode": "WAL",
+            "synchronous": "NORMAL",
+            "cache_size": -65536,  # KiB, i.e. 64 MiB
+            "mmap_size": 268435456,
+            "temp_store": "MEMORY",
+            "busy_timeout": 5000,
+        },
+    },
+}
+DEFAULT_PROFILE = "tuned"
+
+# Archived years are ATTACHed on demand; SQLite allows at most 10 at a time
+MAX_ATTACHED = 8
+# Decompressed copies of .gz archives, reused across runs
+ARCHIVE_CACHE_DIR = os.path.join(tempfile.gettempdir(), "expense-tracker-archives")
+
+
+def connect(db_name, profile=DEFAULT_PROFILE, read_only=False):
+    settings = STORAGE_PROFILES[profile]
+    # Only pay for statement tracing when it was switched on before connecting
+    factory = TracedConnection if tracer.enabled else sqlite3.Connection
+    if read_only:
+        conn = sqlite3.connect(read_only_uri(db_name), uri=True, check_same_thread=False, factory=factory,
+                               cached_statements=settings["cached_statements"])
+    else:
+        # uri=True so archives can be ATTACHed read-only; a plain path still opens as before
+        conn = sqlite3.connect(db_name, uri=True, factory=factory, cached_statements=settings["cached_statements"])
+    if tracer.enabled:
+        conn.set_trace_callback(tracer.on_statement)
+    for name, value in settings["pragmas"].items():
+        if read_only and name == "journal_mode":
+            continue  # a persistent setting; the writer has already applied it
+        conn.execute(f"PRAGMA {name} = {value}")
+    return conn
+
+
+def read_only_uri(path):
+    from urllib.request import pathname2url  # slow to import (http, email), so only when needed
+    return f"file:{pathname2url(os.path.abspath(path))}?mode=ro"
+
+
+def archive_file(path):
+    """Return a path SQLite can open for an archive, decompressing .gz archives into a cache once."""
+    if not path.endswith(".gz"):
+        return path
+    stat = os.stat(path)
+    name = os.path.basename(path)[:-3]
+    cached = os.path.join(ARCHIVE_CACHE_DIR, f"{stat.st_mtime_ns}-{stat.st_size}-{name}")
+    if not os.path.exists(cached):
+        os.makedirs(ARCHIVE_CACHE_DIR, exist_ok=True)
+        fd, partial = tempfile.mkstemp(dir=ARCHIVE_CACHE_DIR, suffix=".part")
+        with os.fdopen(fd, "wb") as out, gzip.open(path, "rb") as f:
+            shutil.copyfileobj(f, out)
+        os.replace(partial, cached)
+    return cached
+
+
+def normalize_date(value):
+    """Return value as a canonical 'YYYY-MM-DD' string, raising ValueError if it is not a date.
+
+    Dates are stored in this form so that range filters can compare the raw
+    column (and use its indexes) instead of wrapping it in date().
+    """
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, Date):
+        return value.isoformat()
+    try:
+        return datetime.fromisoformat(str(value).strip()).date().isoformat()
+    except ValueError:
+        raise ValueError(f"Invalid date {value!r}, expected YYYY-MM-DD")
+
+
+def build_filters(category_id=None, start_date=None, end_date=None, alias="t", date_column="date"):
+    """Return (clauses, params) for the dashboard filter, written so SQLite can use the date indexes."""
+    prefix = f"{alias}." if alias else ""
+    clauses, params = [], []
+    if category_id:
+        clauses.append(f"{prefix}category_id = ?")
+        params.append(category_id)
+    if start_date:
+        clauses.append(f"{prefix}{date_column} >= ?")
+        params.append(normalize_date(start_date))
+    if end_date:
+        clauses.append(f"{prefix}{date_column} <= ?")
+        params.append(normalize_date(end_date))
+    return clauses, params
+
+
+def fts_query(text):
+    """Turn free text typed in the search box into a safe FTS5 prefix query, or None if it has no words."""
+    words = re.findall(r"\w+", text or "")
+    return " ".join(f'"{word}"*' for word in words) or None
+
+
+def search_filter(search, alias="t", schema="main"):
+    """Return (clauses, params) restricting alias to rows whose description/category match search."""
+    match = fts_query(search)
+    if not match:
+        return [], []
+    return [f"{alias}.id IN (SELECT rowid FROM {schema}.transactions_fts WHERE transactions_fts MATCH ?)"], [match]
+
+
+def signed_amount(t_type, amount):
+    return amount if t_type == "Income" else -amount
+
+
+def _where(clauses):
+    return " WHERE " + " AND ".join(clauses) if clauses else ""
+
 
 class DatabaseHandler:
-    def __init__(self, db_name="expense_tracker.db"):
-        self.conn = sqlite3.connect(db_name)
-        self.create_tables()
+    def __init__(self, db_name="expense_tracker.db", profile=DEFAULT_PROFILE, read_only=False):
+        self.db_name = db_name
+        self.profile = profile
+        self.read_only = read_only
+        self.conn = connect(db_name, profile, read_only)
+        # Incremented on every write so caches built on query results can tell they are stale
+        self.generation = 0
+        self.listeners = []
+        self.row_listeners = []
+        self._attached = OrderedDict()  # schema name -> archive path
+        if not read_only:
+            self.create_tables()
+            self.migrate()
+
+    def subscribe(self, listener):
+        """Call listener(deltas) after every write, with deltas a list of (day, change in net balance).
+
+        deltas is None when the change cannot be described that way (e.g. a rollup rebuild).
+        """
+        self.listeners.append(listener)
+
+    def subscribe_rows(self, listener):
+        """Call listener(ids) after every write, with ids the transactions added, changed or removed.
+
+        ids is None when the affected rows are not known (e.g. after archival).
+        """
+        self.row_listeners.append(listener)
+
+    def invalidate(self):
+        """Signal a change made outside the CRUD methods (e.g. archival), so caches start over."""
+        self._changed()
+
+    def _changed(self, deltas=None, ids=None):
+        self.generation += 1
+        for listener in self.listeners:
+            listener(deltas)
+        for listener in self.row_listeners:
+            listener(ids)
 
     def create_tables(self):
         cursor = self.conn.cursor()
@@ -25,14 +213,199 @@ class DatabaseHandler:
                 FOREIGN KEY (category_id) REFERENCES categories(id)
             )
         ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_transactions_date ON transactions(date)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_transactions_category_date ON transactions(category_id, date)")
+        self._create_rollup(cursor)
+        self._create_search_index(cursor)
+        # Closed years moved out to their own read-only files (see archive.py)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS partitions (
+                year INTEGER PRIMARY KEY,
+                path TEXT NOT NULL,
+                first_day TEXT NOT NULL,
+                last_day TEXT NOT NULL,
+                row_count INTEGER NOT NULL,
+                compressed INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
         self.conn.commit()
 
+    def _create_rollup(self, cursor):
+        # Per (day, category, type) totals kept exact by triggers, so dashboard
+        # aggregates cost O(days in range) rather than O(transactions).
+        # Uncategorized rows are stored under category_id 0.
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS daily_rollup (
+                day TEXT NOT NULL,
+                category_id INTEGER NOT NULL,
+                type TEXT NOT NULL,
+                total REAL NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (day, category_id, type)
+            ) WITHOUT ROWID
+        ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_daily_rollup_category_day ON daily_rollup(category_id, day)")
+        add_new = '''
+            INSERT INTO daily_rollup (day, category_id, type, total, count)
+            VALUES (NEW.date, IFNULL(NEW.category_id, 0), NEW.type, NEW.amount, 1)
+            ON CONFLICT (day, category_id, type) DO UPDATE SET total = total + excluded.total, count = count + 1;
+        '''
+        remove_old = '''
+            UPDATE daily_rollup SET total = total - OLD.amount, count = count - 1
+            WHERE day = OLD.date AND category_id = IFNULL(OLD.category_id, 0) AND type = OLD.type;
+            DELETE FROM daily_rollup
+            WHERE day = OLD.date AND category_id = IFNULL(OLD.category_id, 0) AND type = OLD.type AND count <= 0;
+        '''
+        cursor.execute(f"CREATE TRIGGER IF NOT EXISTS trg_rollup_insert AFTER INSERT ON transactions BEGIN {add_new} END")
+        cursor.execute(f"CREATE TRIGGER IF NOT EXISTS trg_rollup_delete AFTER DELETE ON transactions BEGIN {remove_old} END")
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_rollup_update
+            AFTER UPDATE OF amount, type, category_id, date ON transactions
+            BEGIN {remove_old} {add_new} END
+        ''')
+
+    def _create_search_index(self, cursor):
+        # External-content FTS5 index over description and category name. The
+        # content lives in transactions/categories (read back through the view),
+        # and triggers push every change into the index.
+        cursor.execute('''
+            CREATE VIEW IF NOT EXISTS transaction_search_source AS
+            SELECT t.id AS id, t.description AS description, c.name AS category
+            FROM transactions t LEFT JOIN categories c ON t.category_id = c.id
+        ''')
+        cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS transactions_fts USING fts5(
+                description, category,
+                content='transaction_search_source', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+            )
+        ''')
+        add_new = '''
+            INSERT INTO transactions_fts (rowid, description, category)
+            VALUES (NEW.id, NEW.description, (SELECT name FROM categories WHERE id = NEW.category_id));
+        '''
+        remove_old = '''
+            INSERT INTO transactions_fts (transactions_fts, rowid, description, category)
+            VALUES ('delete', OLD.id, OLD.description, (SELECT name FROM categories WHERE id = OLD.category_id));
+        '''
+        cursor.execute(f"CREATE TRIGGER IF NOT EXISTS trg_fts_insert AFTER INSERT ON transactions BEGIN {add_new} END")
+        cursor.execute(f"CREATE TRIGGER IF NOT EXISTS trg_fts_delete AFTER DELETE ON transactions BEGIN {remove_old} END")
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_fts_update AFTER UPDATE OF description, category_id ON transactions
+            BEGIN {remove_old} {add_new} END
+        ''')
+
+    def rebuild_search_index(self):
+        with self.conn:
+            self._fill_search_index()
+
+    def _fill_search_index(self):
+        self.conn.execute("INSERT INTO transactions_fts (transactions_fts) VALUES ('rebuild')")
+
+    def rebuild_rollup(self):
+        """Recompute daily_rollup from the transactions table, discarding any drift."""
+        with self.conn:
+            self._fill_rollup()
+        self._changed()
+        return self.conn.execute("SELECT COUNT(*) FROM daily_rollup").fetchone()[0]
+
+    # Schema migrations, applied in order and recorded in PRAGMA user_version
+    MIGRATIONS = [
+        (1, "_migrate_canonical_dates"),
+        (2, "_fill_rollup"),
+        (3, "_fill_search_index"),
+        (4, "_add_import_batches"),
+        (5, "_drop_type_date_index"),
+    ]
+
+    def migrate(self):
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        for target, step in self.MIGRATIONS:
+            if version < target:
+                with self.conn:
+                    getattr(self, step)()
+                    self.conn.execute(f"PRAGMA user_version = {target}")
+                version = target
+
+    def _migrate_canonical_dates(self):
+        cursor = self.conn.cursor()
+        # Anything SQLite itself understands (e.g. '2024-01-05 10:30:00') is rewritten in SQL
+        cursor.execute("UPDATE transactions SET date = date(date) WHERE date(date) IS NOT NULL AND date <> date(date)")
+        cursor.execute("SELECT id, date FROM transactions WHERE date(date) IS NULL")
+        for trans_id, value in cursor.fetchall():
+            try:
+                fixed = normalize_date(value)
+            except ValueError:
+                raise ValueError(f"Cannot migrate transaction {trans_id}: invalid date {value!r}")
+            self.conn.execute("UPDATE transactions SET date = ? WHERE id = ?", (fixed, trans_id))
+
+    def _add_import_batches(self):
+        # Imported rows remember their batch so a bad import can be removed in one go;
+        # bulk edits journal the rows they touch so they can be undone
+        self.conn.execute("ALTER TABLE transactions ADD COLUMN import_batch INTEGER")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_transactions_import_batch ON transactions(import_batch)")
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS import_batches (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                source TEXT NOT NULL,
+                imported_at TEXT NOT NULL,
+                row_count INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS undo_ops (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                action TEXT NOT NULL,
+                summary TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                row_count INTEGER NOT NULL
+            )
+        ''')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS undo_journal (
+                op_id INTEGER NOT NULL,
+                id INTEGER NOT NULL,
+                amount REAL NOT NULL,
+                type TEXT NOT NULL,
+                category_id INTEGER,
+                description TEXT,
+                date TEXT NOT NULL,
+                import_batch INTEGER,
+                PRIMARY KEY (op_id, id)
+            ) WITHOUT ROWID
+        ''')
+
+    def _drop_type_date_index(self):
+        # Income/expense totals are read from daily_rollup, so no query used (type, date)
+        self.conn.execute("DROP INDEX IF EXISTS idx_transactions_type_date")
+
+    def _fill_rollup(self):
+        self.conn.execute("DELETE FROM daily_rollup")
+        self.conn.execute('''
+            INSERT INTO daily_rollup (day, category_id, type, total, count)
+            SELECT date, IFNULL(category_id, 0), type, SUM(amount), COUNT(*)
+            FROM transactions GROUP BY date, IFNULL(category_id, 0), type
+        ''')
+        # Archived years keep their own rollup; fold it back in
+        for year, path, compressed in self.get_partitions():
+            archive = sqlite3.connect(read_only_uri(archive_file(self.partition_path(path))), uri=True)
+            try:
+                rows = archive.execute("SELECT day, category_id, type, total, count FROM daily_rollup").fetchall()
+            finally:
+                archive.close()
+            self.conn.executemany('''
+                INSERT INTO daily_rollup (day, category_id, type, total, count) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (day, category_id, type)
+                DO UPDATE SET total = total + excluded.total, count = count + excluded.count
+            ''', rows)
+
     # Category CRUD
     def add_category(self, name):
         cursor = self.conn.cursor()
         try:
             cursor.execute("INSERT INTO categories (name) VALUES (?)", (name,))
             self.conn.commit()
+            self._changed([], [])
         except sqlite3.IntegrityError:
             pass  # Category already exists
 
@@ -44,60 +417,545 @@ class DatabaseHandler:
     # Transaction CRUD
     def add_transaction(self, amount, t_type, category_id, description, date):
         cursor = self.conn.cursor()
-        cursor.execute('''
-            INSERT INTO transactions (amount, type, category_id, description, date)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (amount, t_type, category_id, description, date))
+        date = normalize_date(date)
+        cursor.execute(INSERT_TRANSACTION, (amount, t_type, category_id, description, date))
         self.conn.commit()
+        self._changed([(date, signed_amount(t_type, amount))], [cursor.lastrowid])
+        return cursor.lastrowid
+
+    def add_transactions(self, rows, chunk_size=5000, progress=None, import_batch=None):
+        """Bulk insert (amount, type, category_id, description, date) tuples.
+
+        Rows are consumed lazily and written with executemany, one transaction
+        per chunk, so an import costs one commit per chunk instead of per row.
+        progress, if given, is called with the running row count after each chunk.
+        Rows are tagged with import_batch (see start_import_batch) if given.
+        """
+        rows = ((amount, t_type, cat_id, desc, normalize_date(date), import_batch)
+                for amount, t_type, cat_id, desc, date in rows)
+        cursor = self.conn.cursor()
+        total = 0
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            with self.conn:
+                cursor.executemany(INSERT_IMPORTED, chunk)
+                # AUTOINCREMENT hands one writer consecutive ids
+                last_id = cursor.execute("SELECT MAX(id) FROM transactions").fetchone()[0]
+                if import_batch:
+                    cursor.execute("UPDATE import_batches SET row_count = row_count + ? WHERE id = ?", (len(chunk), import_batch))
+            self._changed([(date, signed_amount(t_type, amount)) for amount, t_type, _, _, date, _ in chunk],
+                          range(last_id - len(chunk) + 1, last_id + 1))
+            total += len(chunk)
+            if progress:
+                progress(total)
+        return total
 
-    def get_transactions(self, category_id=None, start_date=None, end_date=None):
+    def start_import_batch(self, source):
+        """Register an import and return its batch id, for add_transactions(import_batch=...)."""
         cursor = self.conn.cursor()
-        query = "SELECT t.id, t.date, t.type, c.name, t.description, t.amount FROM transactions t LEFT JOIN categories c ON t.category_id = c.id WHERE 1=1"
-        params = []
-        if category_id:
-            query += " AND t.category_id = ?"
-            params.append(category_id)
+        cursor.execute("INSERT INTO import_batches (source, imported_at) VALUES (?, datetime('now'))", (source,))
+        self.conn.commit()
+        return cursor.lastrowid
+
+    def discard_import_batch(self, batch):
+        """Remove an import's rows and the batch itself, e.g. after it failed part-way. Not recorded for undo."""
+        signed = "CASE WHEN type = 'Income' THEN amount ELSE -amount END"
+        cursor = self.conn.cursor()
+        with self.conn:
+            cursor.execute(f"SELECT date, -SUM({signed}) FROM transactions WHERE import_batch = ? GROUP BY date", (batch,))
+            deltas = cursor.fetchall()
+            ids = [row[0] for row in cursor.execute("SELECT id FROM transactions WHERE import_batch = ?", (batch,))]
+            cursor.execute("DELETE FROM transactions WHERE import_batch = ?", (batch,))
+            cursor.execute("DELETE FROM import_batches WHERE id = ?", (batch,))
+        self._changed(deltas, ids)
+        return len(ids)
+
+    def get_import_batches(self):
+        """Return [(id, source, imported_at, rows)], newest first; rows counts what is still in the hot table."""
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            SELECT b.id, b.source, b.imported_at,
+                (SELECT COUNT(*) FROM transactions t WHERE t.import_batch = b.id)
+            FROM import_batches b ORDER BY b.id DESC
+        """)
+        return cursor.fetchall()
+
+    # Set-based bulk operations. Each runs as a few statements in one transaction
+    # and journals the rows it touches, so undo() can put them back.
+    def _bulk_target(self, ids, category_id, start_date, end_date, import_batch, search):
+        clauses, params = build_filters(category_id, start_date, end_date)
+        if import_batch:
+            clauses.append("t.import_batch = ?")
+            params.append(import_batch)
+        search_clauses, search_params = search_filter(search)
+        clauses, params = clauses + search_clauses, params + search_params
+        if ids is not None:
+            # One JSON parameter however many ids there are
+            clauses.append("t.id IN (SELECT value FROM json_each(?))")
+            params.append(json.dumps(sorted(set(ids))))
+        if not clauses:
+            raise ValueError("Refusing a bulk change without ids or a filter")
+        return "SELECT t.id FROM transactions t" + _where(clauses), params
+
+    def count_bulk_rows(self, ids=None, category_id=None, start_date=None, end_date=None, import_batch=None, search=None):
+        """Rows update_transactions/delete_transactions would change for these arguments.
+
+        Archived years are never bulk-changed, so unlike count_transactions this counts the hot table only.
+        """
+        target, params = self._bulk_target(ids, category_id, start_date, end_date, import_batch, search)
+        return self.conn.execute(f"SELECT COUNT(*) FROM ({target})", params).fetchone()[0]
+
+    def _journal(self, action, summary, target, params):
+        cursor = self.conn.cursor()
+        cursor.execute("INSERT INTO undo_ops (action, summary, created_at, row_count) VALUES (?, ?, datetime('now'), 0)",
+                       (action, summary))
+        op_id = cursor.lastrowid
+        cursor.execute(f"""
+            INSERT INTO undo_journal (op_id, {TRANSACTION_COLUMNS})
+            SELECT ?, {TRANSACTION_COLUMNS} FROM transactions WHERE id IN ({target})
+        """, [op_id] + params)
+        count = cursor.rowcount
+        if not count:
+            # Nothing matched; leave no empty operation behind for undo() to find
+            cursor.execute("DELETE FROM undo_ops WHERE id = ?", (op_id,))
+            return None, 0
+        cursor.execute("UPDATE undo_ops SET row_count = ? WHERE id = ?", (count, op_id))
+        # Forget the oldest operations
+        cursor.execute("""
+            DELETE FROM undo_journal WHERE op_id IN (SELECT id FROM undo_ops ORDER BY id DESC LIMIT -1 OFFSET ?)
+        """, (UNDO_HISTORY,))
+        cursor.execute("DELETE FROM undo_ops WHERE id IN (SELECT id FROM undo_ops ORDER BY id DESC LIMIT -1 OFFSET ?)",
+                       (UNDO_HISTORY,))
+        return op_id, count
+
+    def _journal_ids(self, op_id):
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT id FROM undo_journal WHERE op_id = ?", (op_id,))
+        return [row[0] for row in cursor.fetchall()]
+
+    def _journal_deltas(self, op_id, changed):
+        # Net balance change per day: journaled (old) rows out, their current versions in
+        signed = "CASE WHEN type = 'Income' THEN amount ELSE -amount END"
+        cursor = self.conn.cursor()
+        cursor.execute(f"SELECT date, -SUM({signed}) FROM undo_journal WHERE op_id = ? GROUP BY date", (op_id,))
+        deltas = cursor.fetchall()
+        if changed:
+            cursor.execute(f"""
+                SELECT date, SUM({signed}) FROM transactions
+                WHERE id IN (SELECT id FROM undo_journal WHERE op_id = ?) GROUP BY date
+            """, (op_id,))
+            deltas += cursor.fetchall()
+        return deltas
+
+    def update_transactions(self, changes, ids=None, category_id=None, start_date=None, end_date=None,
+                            import_batch=None, search=None, summary=None):
+        """Apply changes, e.g. {"category_id": 3}, to every row in ids and/or matching the filter.
+
+        summary describes the change in the undo history. Returns (undo op id, rows changed),
+        or (None, 0) without touching the history when no row matches.
+        """
+        unknown = set(changes) - set(EDITABLE_COLUMNS)
+        if unknown or not changes:
+            raise ValueError(f"Cannot bulk-edit {', '.join(sorted(unknown)) or 'nothing'}")
+        changes = dict(changes)
+        if "date" in changes:
+            changes["date"] = normalize_date(changes["date"])
+        target, params = self._bulk_target(ids, category_id, start_date, end_date, import_batch, search)
+        assignments = ", ".join(f"{column} = ?" for column in changes)
+        with self.conn:
+            op_id, count = self._journal("update", summary or f"Edit {', '.join(changes)}", target, params)
+            if op_id is None:
+                return None, 0
+            self.conn.execute(f"UPDATE transactions SET {assignments} WHERE id IN (SELECT id FROM undo_journal WHERE op_id = ?)",
+                              list(changes.values()) + [op_id])
+            deltas = self._journal_deltas(op_id, True)
+        self._changed(deltas, self._journal_ids(op_id))
+        return op_id, count
+
+    def delete_transactions(self, ids=None, category_id=None, start_date=None, end_date=None,
+                            import_batch=None, search=None, summary=None):
+        """Delete every row in ids and/or matching the filter.
+
+        Returns (undo op id, rows deleted), or (None, 0) without touching the history when no row matches.
+        """
+        target, params = self._bulk_target(ids, category_id, start_date, end_date, import_batch, search)
+        with self.conn:
+            op_id, count = self._journal("delete", summary or "Delete", target, params)
+            if op_id is None:
+                return None, 0
+            self.conn.execute("DELETE FROM transactions WHERE id IN (SELECT id FROM undo_journal WHERE op_id = ?)", (op_id,))
+            deltas = self._journal_deltas(op_id, False)
+        self._changed(deltas, self._journal_ids(op_id))
+        return op_id, count
+
+    def get_undo_history(self):
+        """Return [(op id, action, summary, created_at, rows)], most recent first."""
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT id, action, summary, created_at, row_count FROM undo_ops ORDER BY id DESC")
+        return cursor.fetchall()
+
+    def undo(self):
+        """Revert the most recent bulk operation. Returns (its summary, rows restored), or None if there is none."""
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT id, action, summary FROM undo_ops ORDER BY id DESC LIMIT 1")
+        last = cursor.fetchone()
+        if last is None:
+            return None
+        op_id, action, summary = last
+        with self.conn:
+            # Balance changes are the journal's rows coming back, minus whatever is there now
+            signed = "CASE WHEN type = 'Income' THEN amount ELSE -amount END"
+            cursor.execute(f"""
+                SELECT date, -SUM({signed}) FROM transactions
+                WHERE id IN (SELECT id FROM undo_journal WHERE op_id = ?) GROUP BY date
+            """, (op_id,))
+            deltas = cursor.fetchall()
+            cursor.execute(f"SELECT date, SUM({signed}) FROM undo_journal WHERE op_id = ? GROUP BY date", (op_id,))
+            deltas += cursor.fetchall()
+            if action == "delete":
+                cursor.execute(f"""
+                    INSERT OR IGNORE INTO transactions ({TRANSACTION_COLUMNS})
+                    SELECT {TRANSACTION_COLUMNS} FROM undo_journal WHERE op_id = ?
+                """, (op_id,))
+            else:
+                cursor.execute(f"""
+                    UPDATE transactions SET (amount, type, category_id, description, date) = (
+                        SELECT j.amount, j.type, j.category_id, j.description, j.date
+                        FROM undo_journal j WHERE j.op_id = ? AND j.id = transactions.id
+                    ) WHERE id IN (SELECT id FROM undo_journal WHERE op_id = ?)
+                """, (op_id, op_id))
+            restored = cursor.rowcount
+            ids = self._journal_ids(op_id)
+            cursor.execute("DELETE FROM undo_journal WHERE op_id = ?", (op_id,))
+            cursor.execute("DELETE FROM undo_ops WHERE id = ?", (op_id,))
+        self._changed(deltas, ids)
+        return summary, restored
+
+    # Archived years
+    def partition_path(self, path):
+        # Registry paths are relative to the hot database, so the files can be moved together
+        return os.path.join(os.path.dirname(os.path.abspath(self.db_name)), path)
+
+    def get_partitions(self, start_date=None, end_date=None):
+        """Return [(year, path, compressed)] of archived years overlapping the range, newest first."""
+        cursor = self.conn.cursor()
+        clauses, params = [], []
         if start_date:
-            query += " AND date(t.date) >= date(?)"
-            params.append(start_date)
+            clauses.append("last_day >= ?")
+            params.append(normalize_date(start_date))
         if end_date:
-            query += " AND date(t.date) <= date(?)"
-            params.append(end_date)
-        query += " ORDER BY t.date DESC"
-        cursor.execute(query, params)
+            clauses.append("first_day <= ?")
+            params.append(normalize_date(end_date))
+        cursor.execute("SELECT year, path, compressed FROM main.partitions" + _where(clauses) + " ORDER BY year DESC", params)
         return cursor.fetchall()
 
+    def _attach(self, partition):
+        year, path, compressed = partition
+        schema = f"archive_{year}"
+        if self._attached.get(schema) == path:
+            self._attached.move_to_end(schema)
+            return schema
+        if schema in self._attached:
+            self._detach(schema)  # re-archived since it was attached
+        for old in list(self._attached)[:max(0, len(self._attached) - MAX_ATTACHED + 1)]:
+            self._detach(old)
+        self.conn.execute("ATTACH DATABASE ? AS " + schema, (read_only_uri(archive_file(self.partition_path(path))),))
+        self._attached[schema] = path
+        return schema
+
+    def _detach(self, schema):
+        try:
+            self.conn.execute("DETACH DATABASE " + schema)
+        except sqlite3.OperationalError:
+            return  # still being read; try again next time
+        del self._attached[schema]
+
+    def detach_archives(self):
+        for schema in list(self._attached):
+            self._detach(schema)
+
+    def _sources(self, start_date=None, end_date=None):
+        """Yield the schemas holding rows in range: main, then each overlapping archive (attached lazily)."""
+        yield "main"
+        for partition in self.get_partitions(start_date, end_date):
+            yield self._attach(partition)
+
+    def _segments(self, start_date=None, end_date=None):
+        """Split start..end into date ranges, newest first, each with the archived year covering it or None.
+
+        Archived years are disjoint, so reading the segments in order yields rows
+        in date order while only one archive is being read at a time. The hot
+        table is read in every segment, as it may hold rows for any date.
+        """
+        start_date = normalize_date(start_date) if start_date else None
+        upper = normalize_date(end_date) if end_date else None
+        for year, path, compressed in self.get_partitions(start_date, upper):
+            above = f"{year + 1}-01-01"
+            if upper is None or upper >= above:
+                yield above, upper, None
+            first = max(f"{year}-01-01", start_date) if start_date else f"{year}-01-01"
+            yield first, min(f"{year}-12-31", upper) if upper else f"{year}-12-31", (year, path, compressed)
+            upper = f"{year - 1}-12-31"
+        if upper is None or start_date is None or upper >= start_date:
+            yield start_date, upper, None
+
+    def _stream(self, columns, category_id=None, start_date=None, end_date=None, search=None, after=None):
+        """Yield (date, id, *columns) rows matching the filter newest first, from the hot table and the archives."""
+        upper = end_date
+        if after:
+            upper = min(normalize_date(end_date), after[0]) if end_date else after[0]
+        query = "SELECT t.date, t.id, " + columns + " FROM {}.transactions t LEFT JOIN main.categories c ON t.category_id = c.id"
+        for first, last, partition in self._segments(start_date, upper):
+            schemas = ["main"] + ([self._attach(partition)] if partition else [])
+            cursors = []
+            try:
+                for schema in schemas:
+                    clauses, params = build_filters(category_id, first, last)
+                    search_clauses, search_params = search_filter(search, schema=schema)
+                    clauses, params = clauses + search_clauses, params + search_params
+                    if after:
+                        clauses.append("(t.date, t.id) < (?, ?)")
+                        params.extend(after)
+                    cursor = self.conn.cursor()
+                    cursor.execute(query.format(schema) + _where(clauses) + " ORDER BY t.date DESC, t.id DESC", params)
+                    cursors.append(cursor)
+                if len(cursors) == 1:
+                    yield from cursors[0]
+                else:
+                    yield from heapq.merge(*cursors, key=lambda row: (row[0], row[1]), reverse=True)
+            finally:
+                for cursor in cursors:
+                    cursor.close()
+
+    def _fetch(self, columns, category_id, start_date, end_date, search=None, after=None, limit=None):
+        stream = self._stream(columns, category_id, start_date, end_date, search, after)
+        try:
+            return [row[2:] for row in islice(stream, limit)]
+        finally:
+            stream.close()
+
+    def get_transactions(self, category_id=None, start_date=None, end_date=None, search=None):
+        return self._fetch("t.id, t.date, t.type, c.name, t.description, t.amount", category_id, start_date, end_date, search)
+
+    def iter_transactions(self, category_id=None, start_date=None, end_date=None, batch_size=5000, search=None):
+        """Yield lists of (date, type, category, description, amount) rows, fetched batch_size at a time."""
+        stream = self._stream("t.type, c.name, t.description, t.amount", category_id, start_date, end_date, search)
+        try:
+            while True:
+                rows = [(row[0],) + row[2:] for row in islice(stream, batch_size)]
+                if not rows:
+                    break
+                yield rows
+        finally:
+            stream.close()
+
+    def iter_transaction_rows(self, batch_size=5000):
+        """Yield lists of raw (id, date, type, category_id, description, amount) rows for every transaction, newest first."""
+        stream = self._stream("t.type, t.category_id, t.description, t.amount")
+        try:
+            while True:
+                rows = [(row[1], row[0]) + row[2:] for row in islice(stream, batch_size)]
+                if not rows:
+                    break
+                yield rows
+        finally:
+            stream.close()
+
+    def get_transaction_rows(self, ids):
+        """Return the raw rows of those ids still in the hot table, in the iter_transaction_rows() layout."""
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            SELECT id, date, type, category_id, description, amount FROM transactions
+            WHERE id IN (SELECT value FROM json_each(?))
+        """, (json.dumps(list(ids)),))
+        return cursor.fetchall()
+
+    def get_transactions_page(self, category_id=None, start_date=None, end_date=None, after=None, limit=200, search=None):
+        """Return up to limit rows, newest first, continuing after the (date, id) of the last row seen.
+
+        Keyset pagination: each page is an index range scan, however deep into the ledger it is.
+        Archived years older than the cursor are not opened at all.
+        """
+        return self._fetch("t.id, t.date, t.type, c.name, t.description, t.amount",
+                           category_id, start_date, end_date, search, after, limit)
+
+    def search_transactions(self, search, category_id=None, start_date=None, end_date=None, limit=200):
+        """Return the limit best full-text matches for search within the filter, best first."""
+        match = fts_query(search)
+        if not match:
+            return []
+        clauses, params = build_filters(category_id, start_date, end_date)
+        results = []
+        for schema in self._sources(start_date, end_date):
+            query = f"""
+                SELECT f.rank, t.id, t.date, t.type, c.name, t.description, t.amount
+                FROM {schema}.transactions_fts f
+                JOIN {schema}.transactions t ON t.id = f.rowid
+                LEFT JOIN main.categories c ON t.category_id = c.id""" + _where(["transactions_fts MATCH ?"] + clauses)
+            cursor = self.conn.cursor()
+            cursor.execute(query + " ORDER BY f.rank, t.date DESC LIMIT ?", [match] + params + [limit])
+            results.extend(cursor.fetchall())
+        # Each archive ranks against its own index statistics; merge on rank, newest first on ties
+        results.sort(key=lambda row: row[2], reverse=True)
+        results.sort(key=lambda row: row[0])
+        return [row[1:] for row in results[:limit]]
+
+    def count_transactions(self, category_id=None, start_date=None, end_date=None, search=None):
+        cursor = self.conn.cursor()
+        if fts_query(search):
+            total = 0
+            for schema in self._sources(start_date, end_date):
+                clauses, params = build_filters(category_id, start_date, end_date)
+                search_clauses, search_params = search_filter(search, schema=schema)
+                cursor.execute(f"SELECT COUNT(*) FROM {schema}.transactions t" + _where(clauses + search_clauses),
+                               params + search_params)
+                total += cursor.fetchone()[0]
+            return total
+        # Row counts are kept per day in the rollup, so this avoids touching transactions
+        clauses, params = build_filters(category_id, start_date, end_date, alias=None, date_column="day")
+        cursor.execute("SELECT IFNULL(SUM(count), 0) FROM daily_rollup" + _where(clauses), params)
+        return cursor.fetchone()[0]
+
     def update_transaction(self, trans_id, amount, t_type, category_id, description, date):
         cursor = self.conn.cursor()
+        date = normalize_date(date)
+        deltas = self._balance_removed(cursor, trans_id)
         cursor.execute('''
             UPDATE transactions SET amount=?, type=?, category_id=?, description=?, date=? WHERE id=?
         ''', (amount, t_type, category_id, description, date, trans_id))
         self.conn.commit()
+        if cursor.rowcount:
+            deltas.append((date, signed_amount(t_type, amount)))
+        self._changed(deltas, [trans_id])
 
     def delete_transaction(self, trans_id):
         cursor = self.conn.cursor()
+        deltas = self._balance_removed(cursor, trans_id)
         cursor.execute("DELETE FROM transactions WHERE id=?", (trans_id,))
         self.conn.commit()
+        self._changed(deltas, [trans_id])
+
+    @staticmethod
+    def _balance_removed(cursor, trans_id):
+        cursor.execute("SELECT date, type, amount FROM transactions WHERE id=?", (trans_id,))
+        return [(date, -signed_amount(t_type, amount)) for date, t_type, amount in cursor.fetchall()]
 
+    # Aggregates, all served from daily_rollup
     def get_summary(self, category_id=None, start_date=None, end_date=None):
         cursor = self.conn.cursor()
-        query = "SELECT type, SUM(amount) FROM transactions WHERE 1=1"
-        params = []
-        if category_id:
-            query += " AND category_id = ?"
-            params.append(category_id)
-        if start_date:
-            query += " AND date(date) >= date(?)"
-            params.append(start_date)
-        if end_date:
-            query += " AND date(date) <= date(?)"
-            params.append(end_date)
-        query += " GROUP BY type"
+        clauses, params = build_filters(category_id, start_date, end_date, alias=None, date_column="day")
+        query = "SELECT type, SUM(total) FROM daily_rollup" + _where(clauses) + " GROUP BY type"
         cursor.execute(query, params)
         result = {"Income": 0, "Expense": 0}
         for row in cursor.fetchall():
             result[row[0]] = row[1] if row[1] else 0
         return result
 
+    def get_category_totals(self, category_id=None, start_date=None, end_date=None, t_type="Expense"):
+        """Return [(category name, total)] for one transaction type."""
+        cursor = self.conn.cursor()
+        clauses, params = build_filters(category_id, start_date, end_date, alias="r", date_column="day")
+        query = """
+            SELECT c.name, SUM(r.total) FROM daily_rollup r
+            LEFT JOIN categories c ON r.category_id = c.id""" + _where(["r.type = ?"] + clauses) + " GROUP BY c.name"
+        cursor.execute(query, [t_type] + params)
+        return cursor.fetchall()
+
+    def get_daily_totals(self, category_id=None, start_date=None, end_date=None):
+        """Return [(day, income, expense)] in date order."""
+        cursor = self.conn.cursor()
+        clauses, params = build_filters(category_id, start_date, end_date, alias=None, date_column="day")
+        query = """
+            SELECT day,
+                SUM(CASE WHEN type = 'Income' THEN total ELSE 0 END),
+                SUM(CASE WHEN type = 'Expense' THEN total ELSE 0 END)
+            FROM daily_rollup""" + _where(clauses) + " GROUP BY day ORDER BY day"
+        cursor.execute(query, params)
+        return cursor.fetchall()
+
+    def get_daily_net(self):
+        """Return [(day, income - expense)] over all transactions, in date order."""
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            SELECT day, SUM(CASE WHEN type = 'Income' THEN total ELSE -total END)
+            FROM daily_rollup GROUP BY day ORDER BY day
+        """)
+        return cursor.fetchall()
+
+    def get_intraday_balances(self, days):
+        """Return {transaction id: net of that day's transactions up to and including it} for the given days."""
+        days = sorted(set(days))
+        if not days:
+            return {}
+        cursor = self.conn.cursor()
+        rows = []
+        for schema in self._sources(days[0], days[-1]):
+            cursor.execute(f"""
+                SELECT date, id, CASE WHEN type = 'Income' THEN amount ELSE -amount END
+                FROM {schema}.transactions WHERE date IN ({", ".join("?" * len(days))})
+            """, days)
+            rows.extend(cursor.fetchall())
+        rows.sort()
+        balances, current_day, running = {}, None, 0
+        for day, t_id, net in rows:
+            if day != current_day:
+                current_day, running = day, 0
+            running += net
+            balances[t_id] = running
+        return balances
+
+    def get_rollup_rows(self, category_id=None, start_date=None, end_date=None):
+        """Return the raw [(day, category name, type, total)] rollup rows in range, ordered by day."""
+        cursor = self.conn.cursor()
+        clauses, params = build_filters(category_id, start_date, end_date, alias="r", date_column="day")
+        query = """
+            SELECT r.day, c.name, r.type, r.total FROM daily_rollup r
+            LEFT JOIN categories c ON r.category_id = c.id""" + _where(clauses) + " ORDER BY r.day"
+        cursor.execute(query, params)
+        return cursor.fetchall()
+
+    def close(self):
+        self.conn.close() 
+
+
+class ReaderPool:
+    """A small pool of read-only DatabaseHandlers, separate from the single writer.
+
+    With the WAL profile, readers see a consistent snapshot while the writer
+    commits, so dashboard queries and exports never hit 'database is locked'.
+    Connections are opened lazily, up to size.
+    """
+
+    def __init__(self, db_name, size=4, profile=DEFAULT_PROFILE):
+        self.db_name = db_name
+        self.size = size
+        self.profile = profile
+        self._idle = queue.LifoQueue()
+        self._opened = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def acquire(self):
+        try:
+            reader = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                grow = self._opened < self.size
+                self._opened += grow
+            if grow:
+                reader = DatabaseHandler(self.db_name, self.profile, read_only=True)
+            else:
+                reader = self._idle.get()
+        try:
+            yield reader
+        finally:
+            self._idle.put(reader)
+
     def close(self):
-        self.conn.close() 
\ No newline at end of file
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
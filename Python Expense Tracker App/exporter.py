@@ -0,0 +1,109 @@
+import csv
+import gzip
+from datetime import date
+
+try:
+    import pyarrow as pa  # type: ignore
+    import pyarrow.ipc  # type: ignore
+    import pyarrow.parquet as pq  # type: ignore
+except ImportError:
+    pa = None
+    pq = None
+
+CSV_HEADER = ["Date", "Type", "Category", "Description", "Amount"]
+FORMATS = {
+    ".csv": "csv",
+    ".csv.gz": "csv.gz",
+    ".parquet": "parquet",
+    ".arrow": "arrow",
+    ".feather": "arrow",
+}
+
+
+class ExportError(Exception):
+    pass
+
+
+def detect_format(path):
+    lower = path.lower()
+    for ext in sorted(FORMATS, key=len, reverse=True):
+        if lower.endswith(ext):
+            return FORMATS[ext]
+    raise ExportError(f"Unsupported export file type: {path}")
+
+
+def _write_csv(path, batches, opener):
+    with opener(path, 'wt', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(CSV_HEADER)
+        for rows in batches:
+            writer.writerows(rows)
+            yield len(rows)
+
+
+def _arrow_schema():
+    return pa.schema([
+        ("date", pa.date32()),
+        ("type", pa.string()),
+        ("category", pa.string()),
+        ("description", pa.string()),
+        ("amount", pa.float64()),
+    ])
+
+
+def _record_batch(rows, schema):
+    columns = list(zip(*rows))
+    arrays = [
+        pa.array([date.fromisoformat(d) for d in columns[0]], pa.date32()),
+        pa.array(columns[1], pa.string()),
+        pa.array(columns[2], pa.string()),
+        pa.array(columns[3], pa.string()),
+        pa.array(columns[4], pa.float64()),
+    ]
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def _write_arrow(path, batches, fmt):
+    schema = _arrow_schema()
+    if fmt == "parquet":
+        writer = pq.ParquetWriter(path, schema)
+        write = writer.write_batch
+    else:
+        writer = pa.ipc.new_file(path, schema)
+        write = writer.write_batch
+    try:
+        for rows in batches:
+            # Each fetchmany batch becomes one row group / record batch
+            write(_record_batch(rows, schema))
+            yield len(rows)
+    finally:
+        writer.close()
+
+
+def export_transactions(db, path, category_id=None, start_date=None, end_date=None,
+                        fmt=None, batch_size=5000, progress=None, search=None):
+    """Stream the filtered transactions to path and return the number of rows written.
+
+    Rows are pulled from the cursor batch_size at a time, so memory use does not
+    depend on the size of the export. fmt is one of csv, csv.gz, parquet or arrow
+    and is inferred from the file extension when omitted. search narrows the rows
+    to full-text matches, as in the dashboard search box.
+    """
+    fmt = fmt or detect_format(path)
+    if fmt in ("parquet", "arrow") and pa is None:
+        raise ExportError("pyarrow is required for Parquet/Arrow export. Please install it with 'pip install pyarrow'.")
+    batches = db.iter_transactions(category_id, start_date, end_date, batch_size=batch_size, search=search)
+    if fmt == "csv":
+        written = _write_csv(path, batches, open)
+    elif fmt == "csv.gz":
+        written = _write_csv(path, batches, gzip.open)
+    elif fmt in ("parquet", "arrow"):
+        written = _write_arrow(path, batches, fmt)
+    else:
+        raise ExportError(f"Unknown export format {fmt!r}")
+    total = 0
+    for count in written:
+        total += count
+        if progress:
+            progress(total)
+    return total
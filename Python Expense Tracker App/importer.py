@@ -0,0 +1,164 @@
+import csv
+import os
+import re
+from datetime import datetime
+
+CSV_COLUMNS = ["Date", "Type", "Category", "Description", "Amount"]
+DATE_FORMATS = ("%Y-%m-%d", "%Y/%m/%d", "%m/%d/%Y", "%m/%d/%y", "%d.%m.%Y", "%m-%d-%Y", "%m/%d'%y", "%m/%d'%Y")
+OFX_TAG = re.compile(r"<(/?)([A-Za-z0-9.]+)>([^<\r\n]*)")
+
+
+class StatementError(ValueError):
+    pass
+
+
+def parse_date(value):
+    value = value.strip().replace(" ", "")
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).strftime('%Y-%m-%d')
+        except ValueError:
+            continue
+    raise StatementError(f"Unrecognised date: {value!r}")
+
+
+def _signed_row(date, amount, category, description):
+    # Statement formats carry the direction in the sign of the amount
+    amount = float(str(amount).replace(",", ""))
+    t_type = "Income" if amount > 0 else "Expense"
+    return date, t_type, category, description, abs(amount)
+
+
+def read_csv(path):
+    """Yield (date, type, category, description, amount) rows from a CSV in the export layout."""
+    with open(path, newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        names = [h.strip().lower() for h in header]
+        first_line = 2
+        if set(c.lower() for c in CSV_COLUMNS) <= set(names):
+            index = [names.index(c.lower()) for c in CSV_COLUMNS]
+        else:
+            # No header row: the first line is data in export column order
+            index = list(range(len(CSV_COLUMNS)))
+            reader = _prepend(header, reader)
+            first_line = 1
+        for line_no, row in enumerate(reader, start=first_line):
+            if not any(cell.strip() for cell in row):
+                continue
+            try:
+                date, t_type, category, description, amount = (row[i].strip() for i in index)
+            except IndexError:
+                raise StatementError(f"{path}:{line_no}: expected {len(CSV_COLUMNS)} columns")
+            try:
+                if t_type not in ("Income", "Expense"):
+                    yield _signed_row(parse_date(date), amount, category, description)
+                else:
+                    yield parse_date(date), t_type, category, description, abs(float(amount.replace(",", "")))
+            except ValueError as e:
+                raise StatementError(f"{path}:{line_no}: {e}")
+
+
+def _prepend(first, rows):
+    yield first
+    yield from rows
+
+
+def read_ofx(path):
+    """Yield rows from the <STMTTRN> records of an OFX/QFX statement (SGML or XML flavour)."""
+    record = None
+    with open(path, errors='replace') as f:
+        for line in f:
+            for closing, tag, value in OFX_TAG.findall(line):
+                tag = tag.upper()
+                if tag == "STMTTRN":
+                    # SGML statements may omit the closing tag, so a new opening one ends the record too
+                    if record:
+                        yield _ofx_row(record)
+                    record = None if closing else {}
+                elif record is not None and not closing:
+                    record[tag] = value.strip()
+    if record:
+        yield _ofx_row(record)
+
+
+def _ofx_row(record):
+    try:
+        date = datetime.strptime(record["DTPOSTED"][:8], "%Y%m%d").strftime('%Y-%m-%d')
+        description = record.get("NAME") or record.get("MEMO") or ""
+        if record.get("NAME") and record.get("MEMO"):
+            description = f"{record['NAME']} {record['MEMO']}"
+        return _signed_row(date, record["TRNAMT"], "", description)
+    except (KeyError, ValueError) as e:
+        raise StatementError(f"Malformed OFX transaction {record!r}: {e}")
+
+
+def read_qif(path):
+    """Yield rows from a QIF bank/cash register export."""
+    record = {}
+    with open(path, errors='replace') as f:
+        for line in f:
+            line = line.rstrip("\r\n")
+            if not line or line.startswith("!"):
+                continue
+            code, value = line[0], line[1:].strip()
+            if code == "^":
+                if record:
+                    yield _qif_row(record)
+                record = {}
+            else:
+                record.setdefault(code, value)
+    if record:
+        yield _qif_row(record)
+
+
+def _qif_row(record):
+    try:
+        description = " ".join(v for v in (record.get("P"), record.get("M")) if v)
+        category = record.get("L", "").split(":")[0].strip("[]")
+        return _signed_row(parse_date(record["D"]), record.get("T") or record["U"], category, description)
+    except (KeyError, ValueError) as e:
+        raise StatementError(f"Malformed QIF transaction {record!r}: {e}")
+
+
+READERS = {".csv": read_csv, ".ofx": read_ofx, ".qfx": read_ofx, ".qif": read_qif}
+
+
+def read_statement(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in READERS:
+        raise StatementError(f"Unsupported file type {ext!r}; expected one of {', '.join(sorted(READERS))}")
+    return READERS[ext](path)
+
+
+def import_file(db, path, default_category="General", chunk_size=5000, progress=None):
+    """Stream a statement file into db. Returns the number of rows imported.
+
+    Category names are resolved to ids once per distinct name; unknown names are
+    created on first sight and blank ones fall back to default_category. The rows
+    are tagged with a new import batch, so the whole file can be removed again
+    with db.delete_transactions(import_batch=...). A file that fails part-way
+    (e.g. on a malformed row) takes the chunks already written back out, so it
+    is imported completely or not at all.
+    """
+    category_ids = {name: cat_id for cat_id, name in db.get_categories()}
+
+    def category_id(name):
+        name = name or default_category
+        if name not in category_ids:
+            db.add_category(name)
+            category_ids.update((n, c) for c, n in db.get_categories())
+        return category_ids[name]
+
+    rows = (
+        (amount, t_type, category_id(category), description, date)
+        for date, t_type, category, description, amount in read_statement(path)
+    )
+    batch = db.start_import_batch(os.path.basename(path))
+    try:
+        return db.add_transactions(rows, chunk_size=chunk_size, progress=progress, import_batch=batch)
+    except BaseException:
+        db.discard_import_batch(batch)
+        raise
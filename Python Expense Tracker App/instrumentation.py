@@ -0,0 +1,223 @@
+"""Opt-in tracing of SQL statements and UI refresh spans.
+
+Tracing is off unless tracer.enable() is called (or EXPENSE_TRACKER_TRACE is set,
+see configure_from_env) before the DatabaseHandlers are created. When off,
+connections are plain sqlite3 connections and @traced functions cost one
+attribute check per call.
+"""
+import functools
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+logger = logging.getLogger("expense_tracker.trace")
+
+
+class Tracer:
+    def __init__(self):
+        self.enabled = False
+        self.slow_ms = 50.0
+        self.log_path = None
+        self.records = deque(maxlen=1000)
+        # Records emitted so far; keeps counting once the deque starts dropping the oldest
+        self.sequence = 0
+        self._lock = threading.Lock()
+        self._log = None
+        self._local = threading.local()
+
+    def enable(self, log_path=None, slow_ms=50.0):
+        """Start recording; records are also appended to log_path as JSON lines if given."""
+        self.slow_ms = slow_ms
+        self.log_path = log_path
+        if log_path:
+            self._log = open(log_path, "a", buffering=1)
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+        if self._log:
+            self._log.close()
+            self._log = None
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.records)
+
+    def emit(self, record):
+        record["ts"] = time.time()
+        record["thread"] = threading.current_thread().name
+        with self._lock:
+            self.records.append(record)
+            self.sequence += 1
+            if self._log:
+                self._log.write(json.dumps(record, default=str) + "\n")
+
+    @contextmanager
+    def span(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.emit({"kind": "span", "name": name, "ms": (time.perf_counter() - started) * 1000})
+
+    # SQL side, fed by TracedConnection/TracedCursor
+    def on_statement(self, sql):
+        """set_trace_callback hook: collects every statement SQLite steps, trigger bodies included."""
+        pending = getattr(self._local, "statements", None)
+        if pending is not None:
+            pending.append(sql)
+
+    def begin_statement(self):
+        self._local.statements = []
+
+    def end_statement(self):
+        statements, self._local.statements = getattr(self._local, "statements", None) or [], None
+        return statements
+
+    def record_query(self, conn, sql, params, ms, rows, statements):
+        record = {"kind": "query", "sql": " ".join(sql.split()), "ms": ms, "rows": rows}
+        if len(statements) > 1:
+            # More than one traced statement per execute means triggers (e.g. the rollup) ran too
+            record["statements"] = len(statements)
+        if ms >= self.slow_ms:
+            record["slow"] = True
+            if sql.lstrip().upper().startswith(("SELECT", "WITH")):
+                record["plan"] = explain(conn, sql, params)
+            logger.warning("slow query (%.1f ms, %s rows): %s plan=%s", ms, rows, record["sql"], record.get("plan"))
+        self.emit(record)
+
+
+def explain(conn, sql, params):
+    try:
+        # A plain cursor, so the EXPLAIN itself is not traced
+        rows = sqlite3.Cursor(conn).execute("EXPLAIN QUERY PLAN " + sql, params or ()).fetchall()
+    except sqlite3.Error as e:
+        return [f"unavailable: {e}"]
+    return [row[-1] for row in rows]
+
+
+tracer = Tracer()
+
+
+def traced(name):
+    """Record calls of the decorated function as spans while tracing is enabled."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not tracer.enabled:
+                return fn(*args, **kwargs)
+            with tracer.span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+class TracedCursor(sqlite3.Cursor):
+    """Times each statement from execute() until its rows have been fetched."""
+
+    _record = None
+
+    def execute(self, sql, params=()):
+        self._finish()
+        tracer.begin_statement()
+        started = time.perf_counter()
+        try:
+            super().execute(sql, params)
+        finally:
+            self._record = [sql, params, time.perf_counter() - started, 0, tracer.end_statement()]
+        if self.description is None:
+            self._finish()  # no result set to fetch
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        self._finish()
+        tracer.begin_statement()
+        started = time.perf_counter()
+        try:
+            super().executemany(sql, seq_of_params)
+        finally:
+            self._record = [sql, None, time.perf_counter() - started, 0, tracer.end_statement()]
+        self._finish()
+        return self
+
+    def _fetch(self, fetch, *args):
+        started = time.perf_counter()
+        result = fetch(*args)
+        if self._record is not None:
+            self._record[2] += time.perf_counter() - started
+        return result
+
+    def fetchone(self):
+        row = self._fetch(super().fetchone)
+        if row is None:
+            self._finish()
+        elif self._record is not None:
+            self._record[3] += 1
+        return row
+
+    def fetchmany(self, size=None):
+        rows = self._fetch(super().fetchmany, size or self.arraysize)
+        if self._record is not None:
+            self._record[3] += len(rows)
+        if not rows:
+            self._finish()
+        return rows
+
+    def fetchall(self):
+        rows = self._fetch(super().fetchall)
+        if self._record is not None:
+            self._record[3] += len(rows)
+        self._finish()
+        return rows
+
+    def __next__(self):
+        row = self.fetchone()
+        if row is None:
+            raise StopIteration
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        self._finish()
+
+    def _finish(self):
+        record, self._record = self._record, None
+        if record is None:
+            return
+        sql, params, elapsed, rows, statements = record
+        if self.description is None and self.rowcount >= 0:
+            rows = self.rowcount
+        tracer.record_query(self.connection, sql, params, elapsed * 1000, rows, statements)
+
+
+class TracedConnection(sqlite3.Connection):
+    def cursor(self, factory=TracedCursor):
+        return super().cursor(factory)
+
+    # The C shortcuts bypass cursor(), so route them through a traced cursor
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        return self.cursor().executemany(sql, seq_of_params)
+
+
+def configure_from_env(environ=os.environ):
+    """Enable tracing when EXPENSE_TRACKER_TRACE is set to a JSON-lines path (or to 1 for the default path).
+
+    EXPENSE_TRACKER_SLOW_MS sets the slow-query threshold (default 50).
+    """
+    target = environ.get("EXPENSE_TRACKER_TRACE")
+    if not target:
+        return False
+    path = "expense_tracker_trace.jsonl" if target == "1" else target
+    tracer.enable(path, float(environ.get("EXPENSE_TRACKER_SLOW_MS", 50)))
+    return True
@@ -1,20 +1,59 @@
 import tkinter as tk
-from db_handler import DatabaseHandler
-from ui import InputForm, Dashboard
+import columnar
+from db_handler import DatabaseHandler, ReaderPool, normalize_date
+from balance_index import BalanceIndex
+from dashboard_service import DashboardService, apply_transactions, compute_dashboard, matches_filter
+from query_executor import QueryExecutor
+from ui import CategoryDialog, InputForm, Dashboard, DebugPanel
+from instrumentation import configure_from_env, traced, tracer
 from charts import ChartRenderer
-import csv
+from importer import import_file
 from tkinter import filedialog, messagebox
 
 class ExpenseTrackerApp:
+    # Larger bursts of writes are cheaper to show with one full reload
+    MAX_INCREMENTAL_ROWS = 100
+
     def __init__(self, root):
         self.root = root
         self.root.title("Expense Tracker")
         self.root.geometry("1000x700")
         self.root.minsize(800, 600)
         self.db = DatabaseHandler()
+        self.dashboard_data = DashboardService(self.db)
+        # Running balances, kept current by the writes made through self.db
+        self.balances = BalanceIndex(self.db)
         self._load_categories()
         self._build_ui()
+        # Reads run on read-only connections; self.db stays the single writer
+        self.readers = ReaderPool(self.db.db_name, size=2)
+        self.queries = QueryExecutor(self.root, self.readers, on_busy=self.dashboard.set_busy)
+        # Exports and imports get their own worker so a long one never holds up dashboard queries
+        self.exports = QueryExecutor(self.root, self.readers)
+        self._importing = False
+        # Optional in-memory copy of the ledger; the dashboard reads SQLite until it has loaded
+        self.ledger = None
+        self.loads = None
+        if columnar.requested():
+            if columnar.load_numpy():
+                self.loads = QueryExecutor(self.root, self.readers)
+                self._load_ledger()
+            else:
+                print("NumPy is required for the in-memory engine. Please install it with 'pip install numpy'.")
+        self.active_filter = (None, None, None)
+        self.active_search = ""
+        if tracer.enabled:
+            self.root.bind("<F12>", lambda event: DebugPanel(self.root))
+        self._chart_data = None
+        self._shown_data = None  # DashboardData on screen for active_filter
+        self._pending_writes = []
         self._refresh_dashboard()
+        # Date pickers are a nicety; load them once the window has been drawn
+        self.root.after_idle(self._finish_startup)
+
+    def _finish_startup(self):
+        self.input_form.enable_date_pickers()
+        self.dashboard.enable_date_pickers()
 
     def _load_categories(self):
         self.categories = [cat[1] for cat in self.db.get_categories()]
@@ -25,13 +64,60 @@ class ExpenseTrackerApp:
     def _build_ui(self):
         self.input_form = InputForm(self.root, self.categories, self._add_transaction, self._add_category)
         self.input_form.pack(fill="x", padx=10, pady=5)
-        self.dashboard = Dashboard(self.root, self.categories, self._apply_filter, self._export_csv)
+        self.dashboard = Dashboard(self.root, self.categories, self._apply_filter, self._export, self._import_file,
+                                   on_move=self._move_rows, on_delete=self._delete_rows, on_undo=self._undo)
+        self.root.bind("<Control-z>", lambda event: self._undo())
         self.dashboard.pack(fill="both", expand=True, padx=10, pady=5)
+        self.charts = ChartRenderer(self.dashboard.chart_frame)
 
     def _add_transaction(self, data):
         cat_id = self._get_category_id(data['category'])
-        self.db.add_transaction(data['amount'], data['type'], cat_id, data['description'], data['date'])
-        self._refresh_dashboard()
+        try:
+            t_id = self.db.add_transaction(data['amount'], data['type'], cat_id, data['description'], data['date'])
+        except ValueError as e:
+            messagebox.showerror("Invalid Input", str(e))
+            return
+        row = (t_id, normalize_date(data['date']), data['type'], data['category'], data['description'], data['amount'])
+        self._queue_write(cat_id, row)
+
+    def _queue_write(self, cat_id, row):
+        # Writes arriving in a burst are shown together, once, when Tk is next idle
+        if not self._pending_writes:
+            self.root.after_idle(self._flush_writes)
+        self._pending_writes.append((cat_id, row))
+
+    @traced("incremental_refresh")
+    def _flush_writes(self):
+        writes, self._pending_writes = self._pending_writes, []
+        key, search = self.active_filter, self.active_search
+        if search or self._shown_data is None or self.queries.busy or len(writes) > self.MAX_INCREMENTAL_ROWS:
+            # Ranked search results, or a reload already in flight: query again instead
+            self._load_dashboard(key, search)
+            return
+        rows = [row for cat_id, row in writes if matches_filter(key, cat_id, row[1])]
+        annotated = {row[0]: row for row in self.balances.annotate(rows)}
+        # Writes outside the filter are not shown, but still move the balance of every later row
+        for _, row in sorted(writes, key=lambda write: (write[1][1], write[1][0])):
+            if row[0] in annotated:
+                self.dashboard.insert_row(annotated[row[0]])
+            else:
+                self.dashboard.shift_balances(row)
+        if rows:
+            self._shown_data = apply_transactions(self._shown_data, rows)
+            self.dashboard_data.store(key, self._shown_data)
+            income = self._shown_data.summary.get("Income", 0)
+            expense = self._shown_data.summary.get("Expense", 0)
+            self.dashboard.update_summary(income, expense, income - expense)
+        if self._chart_data is not None:
+            self._chart_data = self._shown_data  # a full redraw is already scheduled
+            return
+        if rows:
+            self.charts.render_pie_chart(self._shown_data.pie)
+            deltas = [(day, amount if t_type == "Income" else 0, amount if t_type == "Expense" else 0)
+                      for _, day, t_type, _, _, amount in rows]
+            if not self.charts.update_bar_chart(self._shown_data.bar, deltas):
+                self.charts.render_bar_chart(self._shown_data.bar)
+        self.charts.render_balance_chart(self._balance_series(self._shown_data))
 
     def _add_category(self, name):
         self.db.add_category(name)
@@ -45,100 +131,247 @@ class ExpenseTrackerApp:
                 return cat[0]
         return None
 
-    def _apply_filter(self, category, from_date, to_date):
+    def _apply_filter(self, category, from_date, to_date, search=""):
         cat_id = None
         if category and category != "All":
             cat_id = self._get_category_id(category)
-        transactions = self.db.get_transactions(category_id=cat_id, start_date=from_date or None, end_date=to_date or None)
-        self.dashboard.update_table(transactions)
-        self._update_summary_and_charts(transactions, cat_id, from_date, to_date)
+        try:
+            cat_id, from_date, to_date = self.dashboard_data.cache_key(cat_id, from_date, to_date)
+        except ValueError as e:
+            messagebox.showerror("Invalid Filter", str(e))
+            return
+        self._load_dashboard((cat_id, from_date, to_date), search)
+
+    def _load_ledger(self):
+        generation = self.db.generation
+
+        def loaded(ledger):
+            if generation != self.db.generation:
+                self._load_ledger()  # written to while loading; the copy may have missed it
+                return
+            if self.ledger is not None:
+                self.ledger.close()
+            ledger.follow(self.db)
+            self.ledger = ledger
+
+        self.loads.submit("ledger", columnar.ColumnarLedger.load, loaded,
+                          lambda e: print(f"In-memory engine unavailable: {e}"))
+
+    def _row_source(self):
+        """The in-memory ledger when it is loaded and current, otherwise the database."""
+        ledger = self.ledger
+        if ledger is not None and ledger.stale:
+            self.ledger = None
+            ledger.close()
+            self._load_ledger()
+            return self.db
+        return ledger or self.db
+
+    def _load_dashboard(self, key, search):
+        self.active_filter = key
+        self.active_search = search
+        cached = self.dashboard_data.lookup(key)
+        generation = self.db.generation
+        source = self._row_source()
+        if source is not self.db and not search:
+            # Vectorized over the in-memory columns, fast enough to answer on the Tk thread
+            self.queries.cancel("dashboard")
+            total = source.count_transactions(*key)
+            first_page = source.get_transactions_page(*key, limit=self.dashboard.PAGE_SIZE)
+            self._show_dashboard(key, search, generation, total, first_page, cached or source.get_dashboard(*key))
+            return
+        page_size = self.dashboard.PAGE_SIZE
+
+        # Runs on the query worker with its own connection
+        def load(db):
+            total = db.count_transactions(*key, search=search)
+            if search:
+                first_page = db.search_transactions(search, *key, limit=page_size)
+            else:
+                first_page = db.get_transactions_page(*key, limit=page_size)
+            data = cached or compute_dashboard(db.get_rollup_rows(*key))
+            return total, first_page, data
+
+        show = lambda result: self._show_dashboard(key, search, generation, *result)
+        self.queries.submit("dashboard", load, show, lambda e: messagebox.showerror("Query Failed", str(e)))
+
+    @traced("dashboard_refresh")
+    def _show_dashboard(self, key, search, generation, total, first_page, data):
+        self.dashboard_data.store(key, data, generation)
+        self._shown_data = data
+        first_page = self.balances.annotate(first_page)
+        if search:
+            # Search results are ranked by relevance, so only the best page is shown
+            self.dashboard.update_table(first_page, total)
+        else:
+            # Later pages are short index range scans, so scrolling fetches them directly
+            fetch_page = lambda after, limit: self.balances.annotate(
+                self._row_source().get_transactions_page(*key, after, limit))
+            self.dashboard.set_row_source(fetch_page, total, first_page)
+        self._update_summary_and_charts(data)
 
     def _refresh_dashboard(self):
         self._apply_filter("All", None, None)
 
-    def _update_summary_and_charts(self, transactions, cat_id, from_date, to_date):
-        summary = self.db.get_summary(category_id=cat_id, start_date=from_date or None, end_date=to_date or None)
-        income = summary.get("Income", 0)
-        expense = summary.get("Expense", 0)
+    def _update_summary_and_charts(self, data):
+        # Summary, pie and bar series come from one cached pass over the rollup
+        income = data.summary.get("Income", 0)
+        expense = data.summary.get("Expense", 0)
         balance = income - expense
         self.dashboard.update_summary(income, expense, balance)
-        self.dashboard.clear_charts()
-        # Pie chart data
-        pie_data = self._get_pie_data(cat_id, from_date, to_date)
-        if pie_data:
-            ChartRenderer.render_pie_chart(self.dashboard.chart_frame, pie_data)
-        # Bar chart data
-        bar_data = self._get_bar_data(cat_id, from_date, to_date)
-        if bar_data:
-            ChartRenderer.render_bar_chart(self.dashboard.chart_frame, bar_data)
-
-    def _get_pie_data(self, cat_id, from_date, to_date):
-        # Get spending by category (only expenses)
-        cursor = self.db.conn.cursor()
-        query = """
-            SELECT c.name, SUM(t.amount) FROM transactions t
-            LEFT JOIN categories c ON t.category_id = c.id
-            WHERE t.type = 'Expense'"""
-        params = []
-        if cat_id:
-            query += " AND t.category_id = ?"
-            params.append(cat_id)
-        if from_date:
-            query += " AND date(t.date) >= date(?)"
-            params.append(from_date)
-        if to_date:
-            query += " AND date(t.date) <= date(?)"
-            params.append(to_date)
-        query += " GROUP BY c.name"
-        cursor.execute(query, params)
-        return cursor.fetchall()
-
-    def _get_bar_data(self, cat_id, from_date, to_date):
-        # Get income and expense totals by date
-        cursor = self.db.conn.cursor()
-        query = """
-            SELECT t.date,
-                SUM(CASE WHEN t.type = 'Income' THEN t.amount ELSE 0 END) as income,
-                SUM(CASE WHEN t.type = 'Expense' THEN t.amount ELSE 0 END) as expense
-            FROM transactions t
-        """
-        params = []
-        where = []
-        if cat_id:
-            where.append("t.category_id = ?")
-            params.append(cat_id)
-        if from_date:
-            where.append("date(t.date) >= date(?)")
-            params.append(from_date)
-        if to_date:
-            where.append("date(t.date) <= date(?)")
-            params.append(to_date)
-        if where:
-            query += " WHERE " + " AND ".join(where)
-        query += " GROUP BY t.date ORDER BY t.date"
-        cursor.execute(query, params)
-        return cursor.fetchall()
-
-    def _export_csv(self):
-        file_path = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV files", "*.csv")])
+        # Charts are drawn after the table has painted; only the latest data is drawn
+        if self._chart_data is None:
+            self.root.after_idle(self._render_charts)
+        self._chart_data = data
+
+    def _render_charts(self):
+        data, self._chart_data = self._chart_data, None
+        self.charts.render_pie_chart(data.pie)
+        self.charts.render_bar_chart(data.bar)
+        self.charts.render_balance_chart(self._balance_series(data))
+
+    def _balance_series(self, data):
+        # Account balance at the end of each day that has activity in the filtered view
+        return self.balances.series(day for day, _, _ in data.bar)
+
+    def _bulk_scope(self, verb):
+        """Rows a bulk action applies to: the selected ones or, once confirmed, all matching the filter."""
+        ids = self.dashboard.selected_ids()
+        if ids:
+            return {"ids": ids}
+        cat_id, from_date, to_date = self.active_filter
+        search = self.active_search or None
+        scope = {"category_id": cat_id, "start_date": from_date, "end_date": to_date, "search": search}
+        try:
+            count = self.db.count_bulk_rows(**scope)
+        except ValueError as e:  # no filter at all
+            messagebox.showerror("Bulk Change Failed", str(e))
+            return None
+        # The filter's total includes archived years, which bulk changes leave alone
+        archived = self.db.count_transactions(cat_id, from_date, to_date, search=search) - count
+        if not count:
+            if archived:
+                messagebox.showinfo("No Rows Selected", "Only archived transactions match the current filter; "
+                                                        "restore their year to change them.")
+            return None
+        note = f"\n\n{archived} matching transactions in archived years are not changed." if archived else ""
+        if not messagebox.askyesno("No Rows Selected", f"{verb} all {count} transactions matching the current filter?{note}"):
+            return None
+        return scope
+
+    def _run_bulk(self, operation, scope, **kwargs):
+        try:
+            operation(**scope, **kwargs)
+        except ValueError as e:
+            messagebox.showerror("Bulk Change Failed", str(e))
+            return
+        self._load_dashboard(self.active_filter, self.active_search)
+
+    def _move_rows(self):
+        scope = self._bulk_scope("Move")
+        if scope is None:
+            return
+        target = CategoryDialog(self.root, self.categories).result
+        if target:
+            self._run_bulk(self.db.update_transactions, scope, changes={"category_id": self._get_category_id(target)},
+                           summary=f"Move to {target}")
+
+    def _delete_rows(self):
+        scope = self._bulk_scope("Delete")
+        if scope is not None:
+            self._run_bulk(self.db.delete_transactions, scope)
+
+    def _undo(self):
+        if self.db.undo() is None:
+            messagebox.showinfo("Undo", "Nothing to undo.")
+            return
+        self._load_dashboard(self.active_filter, self.active_search)
+
+    def _export(self):
+        file_path = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[
+            ("CSV files", "*.csv"), ("Compressed CSV", "*.csv.gz"),
+            ("Parquet files", "*.parquet"), ("Arrow files", "*.arrow"),
+        ])
         if not file_path:
             return
-        transactions = self.db.get_transactions()
-        try:
-            with open(file_path, 'w', newline='') as f:
-                writer = csv.writer(f)
-                writer.writerow(["Date", "Type", "Category", "Description", "Amount"])
-                for t in transactions:
-                    writer.writerow(t[1:])
-            messagebox.showinfo("Export Successful", f"Data exported to {file_path}")
-        except Exception as e:
+        key = self.active_filter
+        search = self.active_search
+        status = self.dashboard.busy_var
+
+        from exporter import export_transactions  # pulls in pyarrow, so only on first export
+
+        # Runs on the export worker; progress is forwarded to the Tk thread
+        def run(db):
+            progress = lambda count: self.exports.notify(status.set, f"Exporting... {count} rows")
+            return export_transactions(db, file_path, *key, progress=progress, search=search)
+
+        def done(count):
+            status.set("")
+            messagebox.showinfo("Export Successful", f"Exported {count} transactions to {file_path}")
+
+        def failed(e):
+            status.set("")
             messagebox.showerror("Export Failed", str(e))
 
+        status.set("Exporting...")
+        self.exports.submit("export", run, done, failed)
+
+    def _import_file(self):
+        if self._importing:
+            messagebox.showinfo("Import", "An import is already running.")
+            return
+        file_path = filedialog.askopenfilename(filetypes=[
+            ("Statements", "*.csv *.ofx *.qfx *.qif"), ("CSV files", "*.csv"),
+            ("OFX files", "*.ofx *.qfx"), ("QIF files", "*.qif"),
+        ])
+        if not file_path:
+            return
+        status = self.dashboard.busy_var
+        db_name, profile = self.db.db_name, self.db.profile
+
+        # Runs on the export worker with a writer of its own, so the window stays responsive
+        def run(db):
+            writer = DatabaseHandler(db_name, profile)
+            try:
+                progress = lambda count: self.exports.notify(status.set, f"Importing... {count} rows")
+                return import_file(writer, file_path, progress=progress)
+            finally:
+                writer.close()
+
+        def finished():
+            self._importing = False
+            status.set("")
+            # The rows went in through another connection, so everything cached from self.db starts over
+            self.db.invalidate()
+            # New categories may have been created along the way
+            self._load_categories()
+            self.input_form.update_categories(self.categories)
+            self.dashboard.update_categories(self.categories)
+            self._load_dashboard(self.active_filter, self.active_search)
+
+        def done(count):
+            finished()
+            messagebox.showinfo("Import Successful", f"Imported {count} transactions from {file_path}")
+
+        def failed(e):
+            finished()
+            messagebox.showerror("Import Failed", str(e))
+
+        self._importing = True
+        status.set("Importing...")
+        self.exports.submit("import", run, done, failed)
+
     def run(self):
         self.root.mainloop()
+        self.queries.close()
+        self.exports.close()
+        if self.loads:
+            self.loads.close()
+        self.readers.close()
         self.db.close()
 
 if __name__ == "__main__":
+    configure_from_env()
     root = tk.Tk()
     app = ExpenseTrackerApp(root)
     app.run() 
\ No newline at end of file
@@ -0,0 +1,225 @@
+"""Headless maintenance commands for the expense tracker database.
+
+Usage:
+    python manage.py [--db expense_tracker.db] import statement.csv [more.ofx ...]
+    python manage.py [--db expense_tracker.db] export out.csv.gz [--category Food] [--from 2024-01-01] [--to 2024-12-31] [--search uber]
+    python manage.py [--db expense_tracker.db] rebuild-search
+    python manage.py [--db expense_tracker.db] archive [--before 2025] [--compress] [--vacuum]
+    python manage.py [--db expense_tracker.db] restore 2019
+    python manage.py [--db expense_tracker.db] partitions
+    python manage.py [--db expense_tracker.db] batches
+    python manage.py [--db expense_tracker.db] delete-batch 7
+    python manage.py [--db expense_tracker.db] recategorize --category Misc --to Food [--from 2024-01-01] [--to-date 2024-06-30]
+    python manage.py [--db expense_tracker.db] undo
+    python manage.py [--db expense_tracker.db] rebuild-rollup
+"""
+import argparse
+import os
+import sys
+import time
+
+from archive import ArchiveError, archive_year, closed_years, restore_year
+from db_handler import DatabaseHandler
+from importer import StatementError, import_file
+from instrumentation import tracer
+
+
+def cmd_import(db, args):
+    for path in args.files:
+        started = time.perf_counter()
+
+        def progress(count):
+            print(f"\r{path}: {count} rows", end="", file=sys.stderr, flush=True)
+
+        try:
+            count = import_file(db, path, default_category=args.category, chunk_size=args.chunk_size, progress=progress)
+        except (OSError, StatementError) as e:
+            print(f"\n{path}: import failed, no rows imported: {e}", file=sys.stderr)
+            return 1
+        elapsed = time.perf_counter() - started
+        print(f"\r{path}: imported {count} rows in {elapsed:.2f}s", file=sys.stderr)
+    return 0
+
+
+def cmd_export(db, args):
+    from exporter import ExportError, export_transactions  # pulls in pyarrow, so only for this command
+
+    category_id = None
+    if args.category:
+        category_id = dict((name, cat_id) for cat_id, name in db.get_categories()).get(args.category)
+        if category_id is None:
+            print(f"Unknown category: {args.category}", file=sys.stderr)
+            return 1
+    started = time.perf_counter()
+    progress = lambda count: print(f"\r{args.file}: {count} rows", end="", file=sys.stderr, flush=True)
+    try:
+        count = export_transactions(db, args.file, category_id, args.start, args.end, fmt=args.format,
+                                    progress=progress, search=args.search)
+    except (OSError, ValueError, ExportError) as e:
+        print(f"\n{args.file}: export failed: {e}", file=sys.stderr)
+        return 1
+    print(f"\r{args.file}: exported {count} rows in {time.perf_counter() - started:.2f}s", file=sys.stderr)
+    return 0
+
+
+def cmd_rebuild_rollup(db, args):
+    started = time.perf_counter()
+    rows = db.rebuild_rollup()
+    print(f"Rebuilt daily_rollup: {rows} rows in {time.perf_counter() - started:.2f}s", file=sys.stderr)
+    return 0
+
+
+def cmd_rebuild_search(db, args):
+    started = time.perf_counter()
+    db.rebuild_search_index()
+    print(f"Rebuilt transactions_fts in {time.perf_counter() - started:.2f}s", file=sys.stderr)
+    return 0
+
+
+def cmd_archive(db, args):
+    years = [args.year] if args.year else closed_years(db, args.before)
+    if not years:
+        print("Nothing to archive", file=sys.stderr)
+    for year in years:
+        started = time.perf_counter()
+        moved = archive_year(db, year, compress=args.compress)
+        print(f"{year}: archived {moved} rows in {time.perf_counter() - started:.2f}s", file=sys.stderr)
+    if args.vacuum:
+        db.conn.execute("VACUUM")
+    return 0
+
+
+def cmd_restore(db, args):
+    try:
+        restored = restore_year(db, args.year)
+    except ArchiveError as e:
+        print(e, file=sys.stderr)
+        return 1
+    print(f"{args.year}: restored {restored} rows", file=sys.stderr)
+    return 0
+
+
+def cmd_partitions(db, args):
+    rows = db.conn.execute("SELECT year, path, first_day, last_day, row_count, compressed FROM partitions ORDER BY year")
+    for year, path, first_day, last_day, count, compressed in rows:
+        size = os.path.getsize(db.partition_path(path))
+        print(f"{year}  {count:>9} rows  {first_day}..{last_day}  {size / 1024:>9.0f} KiB  {path}")
+    return 0
+
+
+def cmd_batches(db, args):
+    for batch_id, source, imported_at, count in db.get_import_batches():
+        print(f"{batch_id:>5}  {imported_at}  {count:>9} rows  {source}")
+    return 0
+
+
+def cmd_delete_batch(db, args):
+    if args.batch not in (batch_id for batch_id, _, _, _ in db.get_import_batches()):
+        print(f"Unknown import batch: {args.batch}", file=sys.stderr)
+        return 1
+    op_id, count = db.delete_transactions(import_batch=args.batch, summary=f"Delete import batch {args.batch}")
+    if not count:
+        print(f"Batch {args.batch} has no rows left to delete", file=sys.stderr)
+        return 1
+    print(f"Deleted {count} rows from batch {args.batch} (undo with: manage.py undo)", file=sys.stderr)
+    return 0
+
+
+def cmd_recategorize(db, args):
+    categories = dict((name, cat_id) for cat_id, name in db.get_categories())
+    for name in (args.category, args.to):
+        if name not in categories:
+            print(f"Unknown category: {name}", file=sys.stderr)
+            return 1
+    op_id, count = db.update_transactions({"category_id": categories[args.to]}, category_id=categories[args.category],
+                                          start_date=args.start, end_date=args.end, search=args.search,
+                                          summary=f"Move {args.category} to {args.to}")
+    print(f"Moved {count} rows from {args.category} to {args.to} (undo with: manage.py undo)", file=sys.stderr)
+    return 0
+
+
+def cmd_undo(db, args):
+    undone = db.undo()
+    if undone is None:
+        print("Nothing to undo", file=sys.stderr)
+        return 1
+    summary, count = undone
+    print(f"Undid '{summary}' ({count} rows)", file=sys.stderr)
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default="expense_tracker.db", help="database file (default: %(default)s)")
+    parser.add_argument("--trace", metavar="LOG", help="record SQL timings to this JSON-lines file")
+    parser.add_argument("--slow-ms", type=float, default=50.0, help="slow query threshold for --trace (default: %(default)s)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("import", help="bulk import CSV, OFX/QFX or QIF statements")
+    p.add_argument("files", nargs="+")
+    p.add_argument("--category", default="General", help="category for rows without one (default: %(default)s)")
+    p.add_argument("--chunk-size", type=int, default=5000, help="rows per transaction (default: %(default)s)")
+    p.set_defaults(func=cmd_import)
+
+    p = sub.add_parser("export", help="stream transactions to CSV, gzip CSV, Parquet or Arrow")
+    p.add_argument("file")
+    p.add_argument("--format", choices=["csv", "csv.gz", "parquet", "arrow"], help="default: from the file extension")
+    p.add_argument("--category")
+    p.add_argument("--from", dest="start", help="YYYY-MM-DD")
+    p.add_argument("--to", dest="end", help="YYYY-MM-DD")
+    p.add_argument("--search", help="only rows whose description or category match these words")
+    p.set_defaults(func=cmd_export)
+
+    p = sub.add_parser("rebuild-rollup", help="recompute the daily summary table from transactions")
+    p.set_defaults(func=cmd_rebuild_rollup)
+
+    p = sub.add_parser("archive", help="move closed years into per-year read-only files")
+    p.add_argument("--before", type=int, help="archive every year before this one (default: the current year)")
+    p.add_argument("--year", type=int, help="archive just this year")
+    p.add_argument("--compress", action="store_true", help="gzip the archives (decompressed into a cache when read)")
+    p.add_argument("--vacuum", action="store_true", help="shrink the hot database file afterwards")
+    p.set_defaults(func=cmd_archive)
+
+    p = sub.add_parser("restore", help="move an archived year back into the hot database")
+    p.add_argument("year", type=int)
+    p.set_defaults(func=cmd_restore)
+
+    p = sub.add_parser("partitions", help="list archived years")
+    p.set_defaults(func=cmd_partitions)
+
+    p = sub.add_parser("batches", help="list imports, newest first")
+    p.set_defaults(func=cmd_batches)
+
+    p = sub.add_parser("delete-batch", help="delete every row of one import")
+    p.add_argument("batch", type=int)
+    p.set_defaults(func=cmd_delete_batch)
+
+    p = sub.add_parser("recategorize", help="move rows from one category to another")
+    p.add_argument("--category", required=True, help="current category")
+    p.add_argument("--to", required=True, help="new category")
+    p.add_argument("--from", dest="start", help="YYYY-MM-DD")
+    p.add_argument("--to-date", dest="end", help="YYYY-MM-DD")
+    p.add_argument("--search", help="only rows whose description or category match these words")
+    p.set_defaults(func=cmd_recategorize)
+
+    p = sub.add_parser("undo", help="revert the last bulk edit or delete")
+    p.set_defaults(func=cmd_undo)
+
+    p = sub.add_parser("rebuild-search", help="rebuild the full-text index over descriptions and categories")
+    p.set_defaults(func=cmd_rebuild_search)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.trace:
+        tracer.enable(args.trace, args.slow_ms)
+    db = DatabaseHandler(args.db)
+    try:
+        return args.func(db, args)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
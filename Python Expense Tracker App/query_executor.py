@@ -0,0 +1,129 @@
+import queue
+import sqlite3
+import threading
+from collections import namedtuple
+
+Job = namedtuple("Job", ["channel", "ticket", "fn", "on_done", "on_error"])
+
+
+class QueryExecutor:
+    """Runs database work on a worker thread and hands results back to the Tk thread.
+
+    Each job borrows a read-only DatabaseHandler from a ReaderPool, so SQLite
+    never runs on the Tk thread and never contends with the writer.
+    Jobs are submitted on a named channel; a newer job on the same channel
+    supersedes an older one, which is skipped if still queued or interrupted
+    through Connection.interrupt() if already running. Results are delivered by
+    polling with root.after, because Tk may only be touched from its own thread.
+    """
+
+    def __init__(self, root, readers, poll_ms=15, on_busy=None):
+        self.root = root
+        self.readers = readers
+        self.poll_ms = poll_ms
+        self.on_busy = on_busy
+        self._jobs = queue.Queue()
+        self._results = queue.Queue()
+        self._latest = {}  # channel -> newest ticket
+        self._running = None  # job currently on the worker
+        self._pending = 0
+        self._ticket = 0
+        self._polling = False
+        self._db = None  # reader in use by the running job
+        self._thread = threading.Thread(target=self._work, name="query-executor", daemon=True)
+        self._thread.start()
+
+    def submit(self, channel, fn, on_done, on_error=None):
+        """Run fn(db) on the worker; on_done(result) or on_error(exc) is later called on the Tk thread."""
+        self._ticket += 1
+        self._latest[channel] = self._ticket
+        running, db = self._running, self._db
+        if running is not None and running.channel == channel and db is not None:
+            db.conn.interrupt()
+        self._jobs.put(Job(channel, self._ticket, fn, on_done, on_error))
+        self._set_pending(self._pending + 1)
+        if not self._polling:
+            self._polling = True
+            self.root.after(self.poll_ms, self._poll)
+        return self._ticket
+
+    def cancel(self, channel):
+        """Drop the pending or running job on channel, e.g. when its answer was found another way."""
+        self._ticket += 1
+        self._latest[channel] = self._ticket
+        running, db = self._running, self._db
+        if running is not None and running.channel == channel and db is not None:
+            db.conn.interrupt()
+
+    def notify(self, fn, *args):
+        """Schedule fn(*args) on the Tk thread; safe to call from inside a running job (e.g. for progress)."""
+        self._results.put((None, fn, args))
+
+    @property
+    def busy(self):
+        """True while submitted jobs have not been delivered yet."""
+        return self._pending > 0
+
+    def is_current(self, job):
+        return self._latest.get(job.channel) == job.ticket
+
+    def close(self):
+        self._jobs.put(None)
+        self._thread.join(timeout=5)
+
+    def _work(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                break
+            if not self.is_current(job):
+                self._results.put((job, None, None))
+                continue
+            result = error = None
+            try:
+                with self.readers.acquire() as db:
+                    self._db, self._running = db, job
+                    result = self._run(job, db)
+            except Exception as e:
+                error = e
+            finally:
+                self._running = self._db = None
+            self._results.put((job, result, error))
+
+    def _run(self, job, db):
+        while True:
+            try:
+                return job.fn(db)
+            except sqlite3.OperationalError as e:
+                # An interrupt aimed at a job that finished just in time can land on
+                # this one instead; retry unless this job really has been superseded
+                if "interrupted" in str(e) and self.is_current(job):
+                    continue
+                raise
+
+    def _poll(self):
+        while True:
+            try:
+                job, result, error = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if job is None:
+                result(*error)  # a notify() call, kept in order with results
+                continue
+            self._set_pending(self._pending - 1)
+            if not self.is_current(job):
+                continue  # superseded; its result would be stale
+            if error is None:
+                job.on_done(result)
+            elif job.on_error:
+                job.on_error(error)
+        if self._pending:
+            self.root.after(self.poll_ms, self._poll)
+        else:
+            self._polling = False
+
+    def _set_pending(self, pending):
+        was_busy = self._pending > 0
+        self._pending = pending
+        if self.on_busy and was_busy != (pending > 0):
+            self.on_busy(pending > 0)
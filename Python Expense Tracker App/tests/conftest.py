@@ -0,0 +1,25 @@
+import os
+import shutil
+
+import pytest
+
+from benchmarks.ledger import build_ledger
+from db_handler import DatabaseHandler
+
+
+@pytest.fixture(scope="module")
+def ledger_path(tmp_path_factory):
+    """A 20,000-row synthetic ledger (2020-2024, 12 categories), built once per test module."""
+    path = os.path.join(tmp_path_factory.mktemp("ledger"), "ledger.db")
+    build_ledger(path, 20000).close()
+    return path
+
+
+@pytest.fixture
+def ledger(ledger_path, tmp_path):
+    """A private copy of the synthetic ledger, open for writing."""
+    path = str(tmp_path / "ledger.db")
+    shutil.copy(ledger_path, path)
+    db = DatabaseHandler(path)
+    yield db
+    db.close()
@@ -0,0 +1,85 @@
+"""Archiving a year must not change what any query returns, and restoring it must give the rows back."""
+import os
+
+import pytest
+
+import db_handler
+from archive import ArchiveError, archive_year, closed_years, restore_year
+
+FILTERS = [
+    {},
+    {"category_id": 4},
+    {"start_date": "2021-06-01", "end_date": "2022-02-28"},
+    {"category_id": 7, "start_date": "2020-01-01", "end_date": "2021-12-31"},
+]
+
+
+def results(db):
+    """The answer to every query the app makes, over filters reaching into and around 2021."""
+    answers = []
+    for filters in FILTERS:
+        pages, after = [], None
+        while True:
+            page = db.get_transactions_page(after=after, limit=2000, **filters)
+            if not page:
+                break
+            pages.extend(page)
+            after = page[-1][1], page[-1][0]
+        answers.append((
+            pages,
+            db.count_transactions(**filters),
+            db.get_summary(**filters),
+            db.get_category_totals(**filters),
+            db.get_daily_totals(**filters),
+            db.get_transactions_page(search="coffee", limit=500, **filters),
+            sorted(db.search_transactions("rent", limit=10000, **filters)),
+        ))
+    return answers
+
+
+@pytest.fixture(autouse=True)
+def archive_cache(tmp_path, monkeypatch):
+    """Decompress .gz archives under the test's own directory."""
+    monkeypatch.setattr(db_handler, "ARCHIVE_CACHE_DIR", str(tmp_path / "cache"))
+
+
+@pytest.mark.parametrize("compress", [False, True], ids=["plain", "gzip"])
+def test_archive_and_restore_round_trip(ledger, compress):
+    rows = ledger.conn.execute("SELECT * FROM transactions ORDER BY id").fetchall()
+    before = results(ledger)
+    in_2021 = ledger.count_transactions(start_date="2021-01-01", end_date="2021-12-31")
+
+    assert archive_year(ledger, 2021, compress=compress) == in_2021
+    [(year, name, compressed)] = ledger.get_partitions()
+    assert (year, compressed) == (2021, int(compress))
+    assert name.endswith(".db.gz" if compress else ".db")
+    assert ledger.conn.execute("SELECT COUNT(*) FROM transactions WHERE date LIKE '2021-%'").fetchone()[0] == 0
+    assert closed_years(ledger, before=2023) == [2020, 2022]
+    assert results(ledger) == before
+
+    assert restore_year(ledger, 2021) == in_2021
+    assert ledger.get_partitions() == []
+    assert not os.path.exists(ledger.partition_path(name))
+    assert ledger.conn.execute("SELECT * FROM transactions ORDER BY id").fetchall() == rows
+    assert results(ledger) == before
+
+
+def test_archiving_a_year_again_keeps_both_sets_of_rows(ledger):
+    count, summary = ledger.count_transactions(), ledger.get_summary()
+    archive_year(ledger, 2021)
+    [(_, first, _)] = ledger.get_partitions()
+    # A late entry for the archived year lands in the hot table until the year is archived again
+    late = ledger.add_transaction(12.5, "Expense", 4, "Coffee late", "2021-11-30")
+    in_2021 = ledger.count_transactions(start_date="2021-01-01", end_date="2021-12-31")
+    assert archive_year(ledger, 2021) == in_2021
+    [(_, second, _)] = ledger.get_partitions()
+    assert second != first and not os.path.exists(ledger.partition_path(first))
+    assert ledger.count_transactions(start_date="2021-01-01", end_date="2021-12-31") == in_2021
+    assert ledger.get_transactions_page(start_date="2021-11-30", end_date="2021-11-30")[0][0] == late
+    assert ledger.count_transactions() == count + 1
+    assert ledger.get_summary() == pytest.approx({"Income": summary["Income"], "Expense": summary["Expense"] + 12.5})
+
+
+def test_restoring_a_year_that_is_not_archived_fails(ledger):
+    with pytest.raises(ArchiveError):
+        restore_year(ledger, 2021)
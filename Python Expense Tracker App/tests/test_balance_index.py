@@ -0,0 +1,73 @@
+"""Running balances must match a plain SUM over the ledger, whatever the writes do to the tree's range."""
+from datetime import date, timedelta
+
+import pytest
+
+from balance_index import HEADROOM_DAYS, BalanceIndex, FenwickTree
+from db_handler import DatabaseHandler
+
+
+def expected_balance(db, day):
+    return db.conn.execute("SELECT IFNULL(SUM(CASE WHEN type = 'Income' THEN amount ELSE -amount END), 0) "
+                           "FROM transactions WHERE date <= ?", (day,)).fetchone()[0]
+
+
+def check(db, index, days):
+    for day in days:
+        assert index.balance_as_of(day) == pytest.approx(expected_balance(db, day)), day
+
+
+def test_fenwick_prefix_sums():
+    values = [3, -1, 4, 1, -5, 9, 2, -6]
+    tree = FenwickTree(values)
+    assert [tree.prefix(i) for i in range(len(values))] == [sum(values[:i + 1]) for i in range(len(values))]
+    tree.add(2, 10)
+    values[2] += 10
+    assert tree.prefix(7) == sum(values)
+    assert tree.range(2, 5) == sum(values[2:6])
+    # Queries past either end clamp to the whole tree or nothing
+    assert tree.prefix(-1) == 0
+    assert tree.prefix(100) == sum(values)
+    for index in (-1, len(values)):
+        with pytest.raises(IndexError):
+            tree.add(index, 1)
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = DatabaseHandler(str(tmp_path / "expense_tracker.db"))
+    yield db
+    db.close()
+
+
+def test_balances_follow_writes_outside_the_tree(db):
+    index = BalanceIndex(db)
+    db.add_transaction(100.0, "Income", 1, "Opening", "2024-01-10")
+    db.add_transaction(30.0, "Expense", 1, "Shop", "2024-01-12")
+    index.rebuild()
+    first, size = index._first, index._tree.size
+    # Before the first slot, past the headroom, and a bulk move of both ends further out
+    db.add_transaction(50.0, "Expense", 1, "Old bill", "2019-06-01")
+    assert index._first < first
+    late = (date(2024, 1, 12) + timedelta(days=HEADROOM_DAYS + 30)).isoformat()
+    db.add_transaction(20.0, "Income", 1, "Far ahead", late)
+    assert index._tree.size > size
+    db.add_transaction(5.0, "Expense", 1, "Inside", "2024-01-11")
+    days = ["2019-05-31", "2019-06-01", "2024-01-10", "2024-01-11", "2024-01-12", late, "2031-01-01"]
+    check(db, index, days)
+
+    db.update_transactions({"date": "2015-01-01"}, start_date="2019-01-01", end_date="2019-12-31")
+    db.update_transactions({"date": "2030-12-31"}, search="ahead")
+    check(db, index, days + ["2015-01-01", "2030-12-31"])
+    db.delete_transactions(start_date="2015-01-01", end_date="2015-12-31")
+    db.undo()
+    db.undo()
+    check(db, index, days + ["2015-01-01", "2030-12-31"])
+    assert index.net_between("2024-01-11", "2024-01-12") == pytest.approx(-35.0)
+
+
+def test_empty_ledger_grows_around_first_write(db):
+    index = BalanceIndex(db)
+    assert index.balance_as_of("2000-01-01") == 0
+    db.add_transaction(12.5, "Income", 1, "Gift", "2001-02-03")
+    check(db, index, ["2001-02-02", "2001-02-03", date.today().isoformat()])
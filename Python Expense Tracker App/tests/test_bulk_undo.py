@@ -0,0 +1,71 @@
+"""Bulk edits and deletes must be undone exactly, rollup and search index included."""
+import pytest
+
+from archive import archive_year
+
+
+def snapshot(db):
+    """Every transaction and the rollup (totals to the cent), after checking the search index against them."""
+    # Raises if the index and its external content table disagree
+    db.conn.execute("INSERT INTO transactions_fts (transactions_fts, rank) VALUES ('integrity-check', 1)")
+    rows = db.conn.execute("SELECT * FROM transactions ORDER BY id").fetchall()
+    rollup = [(day, category_id, t_type, round(total, 2), count) for day, category_id, t_type, total, count in
+              db.conn.execute("SELECT day, category_id, type, total, count FROM daily_rollup "
+                              "WHERE count > 0 ORDER BY day, category_id, type")]
+    return rows, rollup
+
+
+@pytest.mark.parametrize("operation", [
+    lambda db: db.update_transactions({"category_id": 1}, category_id=3, start_date="2022-01-01", end_date="2022-12-31"),
+    lambda db: db.update_transactions({"amount": 1.0, "date": "2024-12-31"}, start_date="2021-03-01", end_date="2021-03-31"),
+    lambda db: db.delete_transactions(category_id=5),
+    lambda db: db.delete_transactions(ids=[1, 2, 3, 10000, 19999]),
+], ids=["recategorize", "amount-and-date", "delete-category", "delete-ids"])
+def test_undo_restores_everything(ledger, operation):
+    before = snapshot(ledger)
+    summary = ledger.get_summary()
+    op_id, count = operation(ledger)
+    assert count > 0
+    assert snapshot(ledger) != before
+    assert [row[0] for row in ledger.get_undo_history()] == [op_id]
+
+    _, restored = ledger.undo()
+    assert restored == count
+    assert snapshot(ledger) == before
+    assert ledger.get_summary() == pytest.approx(summary)
+    assert ledger.get_undo_history() == []
+    assert ledger.undo() is None
+
+
+def test_undo_reverts_most_recent_first(ledger):
+    before = snapshot(ledger)
+    ledger.update_transactions({"description": "renamed"}, category_id=2, summary="Rename")
+    edited = snapshot(ledger)
+    ledger.delete_transactions(search="renamed", summary="Delete renamed")
+    assert [row[2] for row in ledger.get_undo_history()] == ["Delete renamed", "Rename"]
+
+    assert ledger.undo()[0] == "Delete renamed"
+    assert snapshot(ledger) == edited
+    assert ledger.undo()[0] == "Rename"
+    assert snapshot(ledger) == before
+    assert ledger.count_transactions(search="renamed") == 0
+
+
+def test_operations_matching_nothing_are_not_journaled(ledger):
+    before = snapshot(ledger)
+    assert ledger.update_transactions({"category_id": 1}, category_id=999) == (None, 0)
+    assert ledger.delete_transactions(start_date="1999-01-01", end_date="1999-12-31") == (None, 0)
+    assert snapshot(ledger) == before
+    assert ledger.get_undo_history() == []
+
+
+def test_bulk_counts_leave_out_archived_years(ledger):
+    archive_year(ledger, 2021)
+    scope = {"category_id": 4, "start_date": "2021-06-01", "end_date": "2022-06-30"}
+    count = ledger.count_bulk_rows(**scope)
+    assert 0 < count < ledger.count_transactions(**scope)
+    assert count == ledger.count_transactions(category_id=4, start_date="2022-01-01", end_date="2022-06-30")
+    assert ledger.delete_transactions(**scope)[1] == count
+    assert ledger.count_bulk_rows(**scope) == 0
+    with pytest.raises(ValueError):
+        ledger.count_bulk_rows()
@@ -0,0 +1,91 @@
+"""The in-memory engine must answer exactly what the SQL queries do."""
+import pytest
+
+import db_handler
+from archive import archive_year
+from dashboard_service import compute_dashboard
+
+np = pytest.importorskip("numpy")
+import columnar  # noqa: E402
+
+FILTERS = [
+    {},
+    {"category_id": 4},
+    {"category_id": 99},
+    {"start_date": "2021-06-01", "end_date": "2022-02-28"},
+    {"category_id": 7, "start_date": "2020-01-01", "end_date": "2021-12-31"},
+    {"start_date": "2024-12-31"},
+]
+
+
+def rounded(data):
+    """DashboardData with every total to the cent; SQL sums floats, the ledger sums integer cents."""
+    return (
+        {t_type: round(total, 2) for t_type, total in data.summary.items()},
+        [(category, round(total, 2)) for category, total in data.pie],
+        [(day, round(income, 2), round(expense, 2)) for day, income, expense in data.bar],
+    )
+
+
+def assert_same_answers(db, ledger):
+    for filters in FILTERS:
+        assert ledger.count_transactions(**filters) == db.count_transactions(**filters)
+        after = None
+        for _ in range(3):
+            page = ledger.get_transactions_page(after=after, limit=500, **filters)
+            assert page == db.get_transactions_page(after=after, limit=500, **filters)
+            if not page:
+                break
+            after = page[-1][1], page[-1][0]
+        key = (filters.get("category_id"), filters.get("start_date"), filters.get("end_date"))
+        assert rounded(ledger.get_dashboard(**filters)) == rounded(compute_dashboard(db.get_rollup_rows(*key)))
+
+
+@pytest.fixture
+def columns(ledger):
+    assert columnar.load_numpy()
+    loaded = columnar.ColumnarLedger.load(ledger, batch_size=3000)
+    loaded.follow(ledger)
+    yield loaded
+    loaded.close()
+
+
+def test_loaded_ledger_matches_sql(ledger, columns):
+    assert columns.size == ledger.count_transactions()
+    assert_same_answers(ledger, columns)
+
+
+def test_followed_ledger_matches_sql_after_writes(ledger, columns):
+    category = ledger.add_category("Late additions")
+    ledger.add_transaction(10.0, "Expense", category, "New category", "2024-12-31")
+    ledger.add_transaction(99.99, "Income", None, "Uncategorized", "2021-07-04")
+    ledger.add_transactions([(1.25, "Expense", 4, f"Batch {i}", "2022-01-15") for i in range(50)])
+    ledger.update_transaction(100, 7.5, "Income", 7, "Edited", "2020-03-03")
+    ledger.delete_transaction(200)
+    assert_same_answers(ledger, columns)
+
+    ledger.update_transactions({"category_id": 4}, category_id=7, start_date="2021-01-01", end_date="2021-12-31")
+    # Eighteen months of deletes leave more than MAX_DEAD_SHARE dead slots, so the columns are compacted
+    ledger.delete_transactions(start_date="2022-01-01", end_date="2023-06-30")
+    assert columns._dead == 0
+    assert_same_answers(ledger, columns)
+
+    ledger.undo()
+    ledger.undo()
+    assert not columns.stale
+    assert_same_answers(ledger, columns)
+
+
+def test_ledger_reads_archived_years(ledger, tmp_path, monkeypatch):
+    monkeypatch.setattr(db_handler, "ARCHIVE_CACHE_DIR", str(tmp_path / "cache"))
+    assert columnar.load_numpy()
+    followed = columnar.ColumnarLedger.load(ledger)
+    followed.follow(ledger)
+    archive_year(ledger, 2020, compress=True)
+    # Archival cannot be described row by row, so the followed copy must be rebuilt
+    assert followed.stale
+    followed.close()
+    reloaded = columnar.ColumnarLedger.load(ledger)
+    reloaded.follow(ledger)
+    assert_same_answers(ledger, reloaded)
+    reloaded.close()
@@ -0,0 +1,67 @@
+"""Statements import in chunks, and a file with a bad row leaves nothing behind."""
+import pytest
+
+from db_handler import DatabaseHandler
+from importer import StatementError, import_file
+
+GOOD_ROWS = [
+    "2024-01-05,Income,Salary,January pay,1200.00",
+    "2024-01-06,Expense,Groceries,Market,42.50",
+    "01/07/2024,Expense,,Bus pass,30",
+    "2024-01-08,,Groceries,Refund,5.25",
+    "2024-01-09,,Dining,Cafe,-12.40",
+]
+
+
+def write_csv(path, rows):
+    path.write_text("Date,Type,Category,Description,Amount\n" + "\n".join(rows) + "\n")
+    return str(path)
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = DatabaseHandler(str(tmp_path / "expense_tracker.db"))
+    yield db
+    db.close()
+
+
+def test_import_csv(db, tmp_path):
+    path = write_csv(tmp_path / "statement.csv", GOOD_ROWS)
+    counts = []
+    assert import_file(db, path, chunk_size=2, progress=counts.append) == len(GOOD_ROWS)
+    assert counts == [2, 4, 5]
+    rows = sorted(db.conn.execute("SELECT t.date, t.type, c.name, t.description, t.amount FROM transactions t "
+                                  "JOIN categories c ON c.id = t.category_id"))
+    assert rows == [
+        ("2024-01-05", "Income", "Salary", "January pay", 1200.0),
+        ("2024-01-06", "Expense", "Groceries", "Market", 42.5),
+        ("2024-01-07", "Expense", "General", "Bus pass", 30.0),
+        ("2024-01-08", "Income", "Groceries", "Refund", 5.25),
+        ("2024-01-09", "Expense", "Dining", "Cafe", 12.4),
+    ]
+    [(batch, source, _, count)] = db.get_import_batches()
+    assert (source, count) == ("statement.csv", len(GOOD_ROWS))
+    assert db.get_summary() == {"Income": pytest.approx(1205.25), "Expense": pytest.approx(84.9)}
+
+
+@pytest.mark.parametrize("bad_row, message", [
+    ("2024-13-45,Expense,Groceries,Typo,1.00", "Unrecognised date"),
+    ("2024-01-10,Expense,Groceries,Typo,twelve", "could not convert"),
+    ("2024-01-10,Expense,Groceries", "expected 5 columns"),
+], ids=["date", "amount", "columns"])
+def test_bad_row_rolls_back_the_file(db, tmp_path, bad_row, message):
+    db.add_transaction(10.0, "Expense", 1, "Before the import", "2023-12-31")
+    before = (db.conn.execute("SELECT * FROM transactions ORDER BY id").fetchall(),
+              db.conn.execute("SELECT * FROM daily_rollup WHERE count > 0 ORDER BY day").fetchall(),
+              db.get_summary())
+    # The bad row comes after two chunks have already been committed
+    path = write_csv(tmp_path / "statement.csv", GOOD_ROWS + [bad_row])
+    with pytest.raises(StatementError, match=f"statement.csv:{len(GOOD_ROWS) + 2}: .*{message}"):
+        import_file(db, path, chunk_size=2)
+    after = (db.conn.execute("SELECT * FROM transactions ORDER BY id").fetchall(),
+             db.conn.execute("SELECT * FROM daily_rollup WHERE count > 0 ORDER BY day").fetchall(),
+             db.get_summary())
+    assert after == before
+    assert db.search_transactions("market") == []
+    assert db.get_import_batches() == []
+    assert db.get_undo_history() == []
@@ -0,0 +1,95 @@
+"""A database created by the original app must open as a current one."""
+import sqlite3
+
+import pytest
+
+from db_handler import SCHEMA_VERSION, DatabaseHandler
+
+BASELINE_SCHEMA = '''
+    CREATE TABLE categories (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT UNIQUE NOT NULL
+    );
+    CREATE TABLE transactions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        amount REAL NOT NULL,
+        type TEXT CHECK(type IN ('Income', 'Expense')) NOT NULL,
+        category_id INTEGER,
+        description TEXT,
+        date TEXT NOT NULL,
+        FOREIGN KEY (category_id) REFERENCES categories(id)
+    );
+'''
+
+BASELINE_ROWS = [
+    (1200.0, "Income", 1, "Salary", "2024-01-05 10:30:00"),
+    (42.5, "Expense", 2, "Weekly shop", "2024-01-05"),
+    (18.0, "Expense", 2, "Bakery", "2024-01-06 08:15:00"),
+    (9.99, "Expense", None, "Streaming", "2024-02-01"),
+]
+
+
+def baseline_database(path):
+    """Write a database the way the app did before migrations: no indexes, user_version 0, timestamps in date."""
+    conn = sqlite3.connect(path)
+    conn.executescript(BASELINE_SCHEMA)
+    conn.executemany("INSERT INTO categories (name) VALUES (?)", [("Salary",), ("Groceries",)])
+    conn.executemany("INSERT INTO transactions (amount, type, category_id, description, date) VALUES (?, ?, ?, ?, ?)",
+                     BASELINE_ROWS)
+    conn.commit()
+    conn.close()
+
+
+def test_baseline_database_is_migrated(tmp_path):
+    path = str(tmp_path / "expense_tracker.db")
+    baseline_database(path)
+    db = DatabaseHandler(path)
+    try:
+        assert db.conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+        assert [row[:2] for row in db.get_transactions()] == [
+            (4, "2024-02-01"), (3, "2024-01-06"), (2, "2024-01-05"), (1, "2024-01-05")]
+        assert db.get_summary() == {"Income": 1200.0, "Expense": pytest.approx(70.49)}
+        assert db.get_daily_totals() == [("2024-01-05", 1200.0, 42.5), ("2024-01-06", 0, 18.0), ("2024-02-01", 0, 9.99)]
+        assert db.get_summary(start_date="2024-01-06", end_date="2024-01-31") == {"Income": 0, "Expense": 18.0}
+        assert [row[0] for row in db.search_transactions("bakery")] == [3]
+        assert sorted(row[0] for row in db.search_transactions("groceries")) == [2, 3]
+        columns = [row[1] for row in db.conn.execute("PRAGMA table_info(transactions)")]
+        assert "import_batch" in columns
+        assert db.get_undo_history() == []
+    finally:
+        db.close()
+
+
+def test_migrated_database_reopens_unchanged(tmp_path):
+    path = str(tmp_path / "expense_tracker.db")
+    baseline_database(path)
+    DatabaseHandler(path).close()
+    db = DatabaseHandler(path)
+    try:
+        assert db.conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+        assert db.count_transactions() == len(BASELINE_ROWS)
+        assert db.conn.execute("SELECT SUM(count) FROM daily_rollup").fetchone()[0] == len(BASELINE_ROWS)
+        assert db.conn.execute("SELECT COUNT(*) FROM transactions_fts").fetchone()[0] == len(BASELINE_ROWS)
+        db.add_transaction(5.0, "Expense", 2, "Milk", "2024-02-02")
+        assert db.get_summary()["Expense"] == pytest.approx(75.49)
+    finally:
+        db.close()
+
+
+def test_unused_type_date_index_is_dropped(tmp_path):
+    path = str(tmp_path / "expense_tracker.db")
+    baseline_database(path)
+    DatabaseHandler(path).close()
+    # A database migrated before version 5 still has the (type, date) index
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE INDEX idx_transactions_type_date ON transactions(type, date)")
+    conn.execute("PRAGMA user_version = 4")
+    conn.commit()
+    conn.close()
+    db = DatabaseHandler(path)
+    try:
+        indexes = {row[1] for row in db.conn.execute("PRAGMA index_list(transactions)")}
+        assert "idx_transactions_type_date" not in indexes
+        assert {"idx_transactions_date", "idx_transactions_category_date", "idx_transactions_import_batch"} <= indexes
+    finally:
+        db.close()
@@ -0,0 +1,48 @@
+"""The transaction table's filters and pages must stay index range scans (see idx_transactions_*)."""
+import pytest
+
+from db_handler import DatabaseHandler, connect
+
+
+def query_plans(path, call):
+    """Run call(db) and return the EXPLAIN QUERY PLAN details of each transactions query it made."""
+    db = DatabaseHandler(path)
+    statements = []
+    # SQLite hands the trace callback each statement with its parameters bound in
+    db.conn.set_trace_callback(statements.append)
+    try:
+        call(db)
+    finally:
+        db.close()
+    conn = connect(path, read_only=True)
+    try:
+        return [[row[-1] for row in conn.execute("EXPLAIN QUERY PLAN " + sql)]
+                for sql in statements if sql.lstrip().upper().startswith("SELECT") and "transactions t" in sql]
+    finally:
+        conn.close()
+
+
+@pytest.mark.parametrize("call, index", [
+    (lambda db: db.get_transactions_page(start_date="2023-01-01", end_date="2023-03-31"), "idx_transactions_date"),
+    (lambda db: db.get_transactions_page(category_id=3), "idx_transactions_category_date"),
+    (lambda db: db.get_transactions_page(category_id=3, start_date="2023-01-01", end_date="2023-03-31"),
+     "idx_transactions_category_date"),
+    (lambda db: db.get_transactions_page(after=("2022-06-01", 5000)), "idx_transactions_date"),
+    (lambda db: db.get_transactions_page(category_id=3, after=("2022-06-01", 5000)), "idx_transactions_category_date"),
+], ids=["date-range", "category", "category-date-range", "keyset-page", "category-keyset-page"])
+def test_transaction_queries_use_indexes(ledger_path, call, index):
+    plans = query_plans(ledger_path, call)
+    assert plans
+    for plan in plans:
+        assert any(step.startswith(f"SEARCH t USING INDEX {index} ") for step in plan), plan
+        assert not any(step.startswith("SCAN") for step in plan), plan
+        # Rows come out of the index already in (date, id) order
+        assert not any("TEMP B-TREE" in step for step in plan), plan
+
+
+def test_import_batch_queries_use_index(ledger_path):
+    plans = query_plans(ledger_path, lambda db: db.count_bulk_rows(import_batch=1))
+    assert plans
+    for plan in plans:
+        assert any("USING COVERING INDEX idx_transactions_import_batch " in step for step in plan), plan
+        assert not any(step.startswith("SCAN t") for step in plan), plan
@@ -1,11 +1,43 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog
-try:
-    from tkcalendar import DateEntry  # type: ignore
-except ImportError:
-    DateEntry = None
-    print("tkcalendar is required for date picking. Please install it with 'pip install tkcalendar'.")
 from datetime import datetime
+from instrumentation import traced, tracer
+
+# tkcalendar is imported after the window is up (see enable_date_pickers); until
+# then date fields are plain entries bound to the same variables
+DateEntry = None
+_tkcalendar_checked = False
+
+
+def load_date_entry():
+    global DateEntry, _tkcalendar_checked
+    if not _tkcalendar_checked:
+        _tkcalendar_checked = True
+        try:
+            from tkcalendar import DateEntry  # type: ignore
+        except ImportError:
+            print("tkcalendar is required for date picking. Please install it with 'pip install tkcalendar'.")
+    return DateEntry
+
+
+def enable_date_pickers(entries):
+    """Replace plain date entries by tkcalendar DateEntry widgets in the same place; returns the new widgets."""
+    if not load_date_entry():
+        return entries
+    swapped = []
+    for entry in entries:
+        picker = DateEntry(entry.master, textvariable=entry.cget("textvariable"),
+                           date_pattern='yyyy-mm-dd', width=entry.cget("width"))
+        manager = entry.winfo_manager()
+        if manager == "grid":
+            picker.grid(**entry.grid_info())
+        else:
+            info = entry.pack_info()
+            info.pop("in", None)
+            picker.pack(after=entry, **info)
+        entry.destroy()
+        swapped.append(picker)
+    return swapped
 
 class InputForm(tk.LabelFrame):
     def __init__(self, master, categories, on_submit, on_add_category, **kwargs):
@@ -42,11 +74,8 @@ class InputForm(tk.LabelFrame):
         # Date
         tk.Label(self, text="Date:").grid(row=4, column=0, sticky="e")
         self.date_var = tk.StringVar(value=datetime.today().strftime('%Y-%m-%d'))
-        if DateEntry:
-            self.date_entry = DateEntry(self, textvariable=self.date_var, date_pattern='yyyy-mm-dd')
-            self.date_entry.grid(row=4, column=1, sticky="w")
-        else:
-            tk.Entry(self, textvariable=self.date_var).grid(row=4, column=1, sticky="w")
+        self.date_entry = tk.Entry(self, textvariable=self.date_var)
+        self.date_entry.grid(row=4, column=1, sticky="w")
 
         # Submit
         tk.Button(self, text="Add", command=self._submit).grid(row=5, column=0, columnspan=3, pady=5)
@@ -76,16 +105,47 @@ class InputForm(tk.LabelFrame):
         self.desc_var.set("")
         self.date_var.set(datetime.today().strftime('%Y-%m-%d'))
 
+    def enable_date_pickers(self):
+        self.date_entry, = enable_date_pickers([self.date_entry])
+
     def update_categories(self, categories):
         self.categories = categories
         self.category_cb['values'] = categories
 
 class Dashboard(tk.Frame):
-    def __init__(self, master, categories, on_filter, on_export, **kwargs):
+    PAGE_SIZE = 200
+    # Pooled rows kept below the visible ones, so a taller window is filled before the pool is resized
+    OVERSCAN_ROWS = 10
+    WHEEL_ROWS = 3
+    SEARCH_DELAY_MS = 250
+
+    def __init__(self, master, categories, on_filter, on_export, on_import=None,
+                 on_move=None, on_delete=None, on_undo=None, **kwargs):
         super().__init__(master, **kwargs)
         self.categories = categories
         self.on_filter = on_filter
         self.on_export = on_export
+        self.on_import = on_import
+        self.on_move = on_move
+        self.on_delete = on_delete
+        self.on_undo = on_undo
+        # Paged table state: rows are pulled from fetch_page as the user scrolls down
+        self._fetch_page = None
+        self._page_cursor = None
+        self._exhausted = True
+        self._loading = False
+        self._total = 0
+        self._rows = []  # every row fetched so far, newest first
+        # Only a window of _rows is in the Treeview: a fixed pool of items, refilled as the window moves
+        self._items = []
+        self._attached = 0  # the first _attached items are in the tree, in order
+        self._top = 0  # index in _rows of the row in the first item
+        # Selection and keyboard focus are kept as row indices/ids, since items are reused for other rows
+        self._selected = set()
+        self._anchor = None
+        self._cursor = None
+        self.row_ids = {}  # Treeview item -> transaction id
+        self._search_after = None
         self._build_dashboard()
 
     def _build_dashboard(self):
@@ -99,20 +159,22 @@ class Dashboard(tk.Frame):
         self.filter_cat_cb.pack(side="left", padx=2)
         tk.Label(filter_frame, text="From:").pack(side="left")
         self.filter_from_var = tk.StringVar()
-        if DateEntry:
-            self.filter_from_entry = DateEntry(filter_frame, textvariable=self.filter_from_var, date_pattern='yyyy-mm-dd', width=12)
-            self.filter_from_entry.pack(side="left", padx=2)
-        else:
-            tk.Entry(filter_frame, textvariable=self.filter_from_var, width=12).pack(side="left", padx=2)
+        self.filter_from_entry = tk.Entry(filter_frame, textvariable=self.filter_from_var, width=12)
+        self.filter_from_entry.pack(side="left", padx=2)
         tk.Label(filter_frame, text="To:").pack(side="left")
         self.filter_to_var = tk.StringVar()
-        if DateEntry:
-            self.filter_to_entry = DateEntry(filter_frame, textvariable=self.filter_to_var, date_pattern='yyyy-mm-dd', width=12)
-            self.filter_to_entry.pack(side="left", padx=2)
-        else:
-            tk.Entry(filter_frame, textvariable=self.filter_to_var, width=12).pack(side="left", padx=2)
+        self.filter_to_entry = tk.Entry(filter_frame, textvariable=self.filter_to_var, width=12)
+        self.filter_to_entry.pack(side="left", padx=2)
+        tk.Label(filter_frame, text="Search:").pack(side="left")
+        self.search_var = tk.StringVar()
+        search_entry = tk.Entry(filter_frame, textvariable=self.search_var, width=18)
+        search_entry.pack(side="left", padx=2)
+        search_entry.bind("<KeyRelease>", self._on_search_key)
+        search_entry.bind("<Return>", lambda e: self._apply_filter())
         tk.Button(filter_frame, text="Apply", command=self._apply_filter).pack(side="left", padx=2)
-        tk.Button(filter_frame, text="Export CSV", command=self.on_export).pack(side="right", padx=2)
+        tk.Button(filter_frame, text="Export...", command=self.on_export).pack(side="right", padx=2)
+        if self.on_import:
+            tk.Button(filter_frame, text="Import...", command=self.on_import).pack(side="right", padx=2)
 
         # Summary
         self.summary_var = tk.StringVar()
@@ -122,39 +184,336 @@ class Dashboard(tk.Frame):
         # Table
         table_frame = tk.Frame(self)
         table_frame.pack(fill="both", expand=True, padx=5, pady=5)
-        columns = ("Date", "Type", "Category", "Description", "Amount")
-        self.tree = ttk.Treeview(table_frame, columns=columns, show="headings")
+        columns = ("Date", "Type", "Category", "Description", "Amount", "Balance")
+        # Shift/Ctrl-click select several rows for the bulk actions below the table
+        self.tree = ttk.Treeview(table_frame, columns=columns, show="headings", selectmode="extended")
         for col in columns:
             self.tree.heading(col, text=col)
             self.tree.column(col, anchor="center")
-        vsb = ttk.Scrollbar(table_frame, orient="vertical", command=self.tree.yview)
-        self.tree.configure(yscrollcommand=vsb.set)
+        if self.on_delete:
+            self.tree.bind("<Delete>", lambda e: self.on_delete())
+        # The scrollbar moves the window over _rows; the tree itself never scrolls
+        self.vsb = ttk.Scrollbar(table_frame, orient="vertical", command=self._on_scrollbar)
+        self._row_height = int(ttk.Style(self).lookup("Treeview", "rowheight") or 20)
+        self.tree.bind("<Configure>", lambda e: self._resize_pool())
+        self.tree.bind("<ButtonPress-1>", self._on_click)
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.tree.bind(sequence, self._on_wheel)
+        self.tree.bind("<Up>", lambda e: self._move_cursor(-1, e))
+        self.tree.bind("<Down>", lambda e: self._move_cursor(1, e))
+        self.tree.bind("<Prior>", lambda e: self._move_cursor(-self._visible_rows(), e))
+        self.tree.bind("<Next>", lambda e: self._move_cursor(self._visible_rows(), e))
         self.tree.pack(side="left", fill="both", expand=True)
-        vsb.pack(side="right", fill="y")
+        self.vsb.pack(side="right", fill="y")
+        self._resize_pool()
+        status_frame = tk.Frame(self)
+        status_frame.pack(fill="x", padx=5)
+        self.count_var = tk.StringVar()
+        tk.Label(status_frame, textvariable=self.count_var, anchor="w").pack(side="left")
+        for text, command in (("Move to...", self.on_move), ("Delete", self.on_delete), ("Undo", self.on_undo)):
+            if command:
+                tk.Button(status_frame, text=text, command=command).pack(side="left", padx=2)
+        self.busy_var = tk.StringVar()
+        tk.Label(status_frame, textvariable=self.busy_var, fg="gray").pack(side="right")
 
         # Chart area
         self.chart_frame = tk.LabelFrame(self, text="Charts")
         self.chart_frame.pack(fill="both", expand=True, padx=5, pady=5)
 
+    def enable_date_pickers(self):
+        self.filter_from_entry, self.filter_to_entry = enable_date_pickers([self.filter_from_entry, self.filter_to_entry])
+
     def update_categories(self, categories):
         self.categories = categories
         self.filter_cat_cb['values'] = ["All"] + categories
 
-    def update_table(self, transactions):
-        for row in self.tree.get_children():
-            self.tree.delete(row)
-        for t in transactions:
-            self.tree.insert('', 'end', values=t[1:])
+    @traced("update_table")
+    def update_table(self, transactions, total=None):
+        self._fetch_page = None
+        self._exhausted = True
+        self._total = len(transactions) if total is None else total
+        self._reset_rows(list(transactions))
 
+    @traced("update_table")
+    def set_row_source(self, fetch_page, total, first_page=None):
+        """Show a paged result: fetch_page(after, limit) returns rows after the (date, id) cursor.
+
+        first_page may be supplied when it was already fetched elsewhere.
+        """
+        self._fetch_page = fetch_page
+        self._total = total
+        self._page_cursor = None
+        self._exhausted = False
+        self._reset_rows(self._next_page(first_page))
+
+    def _next_page(self, rows=None):
+        if rows is None:
+            rows = self._fetch_page(self._page_cursor, self.PAGE_SIZE)
+        if len(rows) < self.PAGE_SIZE:
+            self._exhausted = True
+        if rows:
+            self._page_cursor = (rows[-1][1], rows[-1][0])
+        return rows
+
+    def _reset_rows(self, rows):
+        self._rows = rows
+        self._top = 0
+        self._selected = set()
+        self._anchor = self._cursor = None
+        self._render()
+
+    def _visible_rows(self):
+        height = self.tree.winfo_height()
+        if height <= 1:  # not laid out yet
+            return int(self.tree.cget("height"))
+        return max(1, height // self._row_height)
+
+    def _resize_pool(self):
+        size = self._visible_rows() + self.OVERSCAN_ROWS
+        if size == len(self._items):
+            return
+        if size > len(self._items):
+            for _ in range(size - len(self._items)):
+                item = self.tree.insert('', 'end')
+                self.tree.detach(item)
+                self._items.append(item)
+        else:
+            self.tree.delete(*self._items[size:])
+            del self._items[size:]
+            self._attached = min(self._attached, size)
+        self._render()
+
+    def _render(self):
+        """Fill the pooled items with the rows from _top on and show which of them are selected."""
+        self._top = max(0, min(self._top, len(self._rows) - self._visible_rows()))
+        window = self._rows[self._top:self._top + len(self._items)]
+        self.row_ids = {}
+        for index, (item, row) in enumerate(zip(self._items, window)):
+            self.tree.item(item, values=row[1:])
+            if index >= self._attached:
+                self.tree.move(item, '', index)
+            self.row_ids[item] = row[0]
+        if self._attached > len(window):
+            # Items past the end of a shorter result are parked, not deleted
+            self.tree.detach(*self._items[len(window):self._attached])
+        self._attached = len(window)
+        self.tree.selection_set([item for item, row_id in self.row_ids.items() if row_id in self._selected])
+        if self._cursor is not None and 0 <= self._cursor - self._top < len(window):
+            self.tree.focus(self._items[self._cursor - self._top])
+        rows = max(len(self._rows), 1)
+        self.vsb.set(self._top / rows, min(1.0, (self._top + self._visible_rows()) / rows))
+        self._update_count()
+
+    def _scroll_to(self, top):
+        self._top = top
+        self._render()
+        # Fetch the next page before the window reaches the end of the rows loaded so far
+        near_end = len(self._rows) - (self._top + self._visible_rows()) < self.PAGE_SIZE // 2
+        if near_end and self._fetch_page and not self._exhausted and not self._loading:
+            self._loading = True
+            self.after_idle(self._load_more)
+
+    def _on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            self._scroll_to(round(float(amount) * len(self._rows)))
+        elif unit == "pages":
+            self._scroll_to(self._top + int(amount) * self._visible_rows())
+        else:
+            self._scroll_to(self._top + int(amount))
+
+    def _on_wheel(self, event):
+        up = event.num == 4 or getattr(event, "delta", 0) > 0
+        self._scroll_to(self._top + (-self.WHEEL_ROWS if up else self.WHEEL_ROWS))
+        return "break"
+
+    def _on_click(self, event):
+        if self.tree.identify_region(event.x, event.y) not in ("cell", "tree"):
+            return None  # headings and column separators keep their usual bindings
+        item = self.tree.identify_row(event.y)
+        if item not in self.row_ids:
+            return "break"
+        self.tree.focus_set()
+        self._select(self._top + self._items.index(item), event)
+        return "break"
+
+    def _move_cursor(self, step, event):
+        if not self._rows:
+            return "break"
+        index = 0 if self._cursor is None else max(0, min(self._cursor + step, len(self._rows) - 1))
+        visible = self._visible_rows()
+        if index < self._top:
+            self._scroll_to(index)
+        elif index >= self._top + visible:
+            self._scroll_to(index - visible + 1)
+        if event.state & 0x0004:  # Control moves the focus without changing the selection
+            self._cursor = index
+            self._render()
+        else:
+            self._select(index, event)
+        return "break"
+
+    def _select(self, index, event):
+        """Click/arrow-key selection over row indices: plain replaces, Shift extends from the anchor, Ctrl toggles."""
+        row_id = self._rows[index][0]
+        if event.state & 0x0004:  # Control
+            self._selected ^= {row_id}
+            self._anchor = index
+        elif event.state & 0x0001 and self._anchor is not None:  # Shift
+            first, last = sorted((self._anchor, index))
+            self._selected = {row[0] for row in self._rows[first:last + 1]}
+        else:
+            self._selected = {row_id}
+            self._anchor = index
+        self._cursor = index
+        self._render()
+
+    def insert_row(self, row):
+        """Show a newly added (id, date, ..., balance) row at its place in the newest-first order.
+
+        Rows added together must be inserted oldest first, so each one shifts
+        the running balance of the rows above it exactly once.
+        """
+        lo = self.shift_balances(row)
+        self._total += 1
+        if lo < len(self._rows) or self._exhausted:
+            # Otherwise it sorts into a page that is not loaded yet, and scrolling will fetch it
+            self._rows.insert(lo, row)
+            # Rows above the window push it down, so the rows on screen stay put
+            if lo < self._top:
+                self._top += 1
+            if self._anchor is not None and self._anchor >= lo:
+                self._anchor += 1
+            if self._cursor is not None and self._cursor >= lo:
+                self._cursor += 1
+        self._render()
+
+    def shift_balances(self, row):
+        """Add a newly added (id, date, type, category, description, amount) row to the Balance of the rows after it.
+
+        Also needed for rows the table does not show (e.g. outside the filter),
+        as they still move the running balance. Returns the row's position.
+        """
+        key = (row[1], row[0])
+        lo, hi = 0, len(self._rows)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if (self._rows[mid][1], self._rows[mid][0]) > key:
+                lo = mid + 1
+            else:
+                hi = mid
+        delta = row[5] if row[2] == "Income" else -row[5]
+        for index in range(lo):
+            shown = self._rows[index]
+            self._rows[index] = shown[:-1] + (round(shown[-1] + delta, 2),)
+        if lo > self._top:
+            self._render()
+        return lo
+
+    def selected_ids(self):
+        """Transaction ids of the selected rows, including any scrolled out of view."""
+        return [row[0] for row in self._rows if row[0] in self._selected]
+
+    def _update_count(self):
+        self.count_var.set(f"Showing {len(self._rows)} of {self._total} transactions")
+
+    @traced("load_more_rows")
+    def _load_more(self):
+        self._loading = False
+        if self._fetch_page and not self._exhausted:
+            self._rows.extend(self._next_page())
+            self._render()
+
+    @traced("update_summary")
     def update_summary(self, income, expense, balance):
         self.summary_var.set(f"Total Income: {income:.2f}   Total Expense: {expense:.2f}   Balance: {balance:.2f}")
 
-    def clear_charts(self):
-        for widget in self.chart_frame.winfo_children():
-            widget.destroy()
+    def set_busy(self, busy):
+        self.busy_var.set("Loading..." if busy else "")
+        self.tree.configure(cursor="watch" if busy else "")
+
+    def _on_search_key(self, event):
+        # Wait for a pause in typing so only the last keystroke runs a query
+        if self._search_after is not None:
+            self.after_cancel(self._search_after)
+        self._search_after = self.after(self.SEARCH_DELAY_MS, self._apply_filter)
 
     def _apply_filter(self):
+        if self._search_after is not None:
+            self.after_cancel(self._search_after)
+            self._search_after = None
         cat = self.filter_cat_var.get()
         from_date = self.filter_from_var.get()
         to_date = self.filter_to_var.get()
-        self.on_filter(cat, from_date, to_date) 
\ No newline at end of file
+        self.on_filter(cat, from_date, to_date, self.search_var.get().strip())
+
+
+class CategoryDialog(simpledialog.Dialog):
+    """Modal category picker; result is the chosen name, or None if cancelled."""
+
+    def __init__(self, master, categories, title="Move to Category"):
+        self.categories = categories
+        super().__init__(master, title)
+
+    def body(self, frame):
+        tk.Label(frame, text="Category:").grid(row=0, column=0, sticky="e")
+        self.category_var = tk.StringVar()
+        combo = ttk.Combobox(frame, textvariable=self.category_var, values=self.categories, state="readonly")
+        combo.grid(row=0, column=1, padx=5)
+        return combo
+
+    def apply(self):
+        self.result = self.category_var.get() or None
+
+
+class DebugPanel(tk.Toplevel):
+    """Live view of the tracer's most recent query and span records."""
+
+    REFRESH_MS = 500
+
+    def __init__(self, master, **kwargs):
+        super().__init__(master, **kwargs)
+        self.title("Debug: queries and spans")
+        self.geometry("900x400")
+        self.stats_var = tk.StringVar()
+        tk.Label(self, textvariable=self.stats_var, anchor="w").pack(fill="x", padx=5, pady=2)
+        frame = tk.Frame(self)
+        frame.pack(fill="both", expand=True, padx=5, pady=5)
+        columns = ("Kind", "ms", "Rows", "Thread", "Detail")
+        self.tree = ttk.Treeview(frame, columns=columns, show="headings")
+        for col, width in zip(columns, (60, 70, 60, 120, 560)):
+            self.tree.heading(col, text=col)
+            self.tree.column(col, width=width, anchor="w", stretch=(col == "Detail"))
+        self.tree.tag_configure("slow", foreground="red")
+        vsb = ttk.Scrollbar(frame, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=vsb.set)
+        self.tree.pack(side="left", fill="both", expand=True)
+        vsb.pack(side="right", fill="y")
+        self._shown = None  # tracer.sequence when the table was filled
+        self._after = None
+        self.bind("<Destroy>", self._on_destroy)
+        self._refresh()
+
+    def _on_destroy(self, event):
+        # <Destroy> also reaches the Toplevel for each child; stop polling once, for the window itself
+        if event.widget is self and self._after is not None:
+            self.after_cancel(self._after)
+            self._after = None
+
+    def _refresh(self):
+        sequence = tracer.sequence
+        if sequence != self._shown:
+            records = tracer.snapshot()
+            self.tree.delete(*self.tree.get_children())
+            for r in reversed(records[-300:]):
+                detail = r.get("sql") or r.get("name", "")
+                if r.get("plan"):
+                    detail += "  |  " + "; ".join(r["plan"])
+                self.tree.insert('', 'end', values=(r["kind"], f"{r['ms']:.2f}", r.get("rows", ""), r["thread"], detail),
+                                 tags=("slow",) if r.get("slow") else ())
+            self._shown = sequence
+            queries = [r for r in records if r["kind"] == "query"]
+            slow = sum(1 for r in queries if r.get("slow"))
+            sql_ms = sum(r["ms"] for r in queries)
+            self.stats_var.set(f"{len(queries)} queries ({sql_ms:.1f} ms total, {slow} slow)   "
+                               f"{len(records) - len(queries)} spans   log: {tracer.log_path or '-'}")
+        self._after = self.after(self.REFRESH_MS, self._refresh)